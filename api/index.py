@@ -7,16 +7,32 @@ from flask import Flask, jsonify, request
 from flask_cors import CORS
 import math
 import random
+import time
 from datetime import datetime, timedelta
 import sys
 import os
+import tempfile
 
 # Add services directory to path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'services'))
-from weather_service import get_weather, calculate_sunlight_factor, get_weather_icon_emoji
+from weather_service import get_weather, calculate_sunlight_factor, get_weather_icon_emoji, get_geocode_cache_stats, get_forecast_cache_stats, get_coalescing_stats, get_hourly_forecast, known_coordinates, get_lat_lon, refresh_locations, get_location_weather, get_location_forecast
+from iot_ingest import parse_request, valid_device
+from ring_buffer import RingBufferRegistry
+from telemetry_store import TelemetryStore
+from history_generator import generate_history, history_dicts
+from conditional import conditional
+from json_response import FastJSONProvider, columnar, wants_columnar, install_compression
+from downsample import downsample_indices, METHODS as DOWNSAMPLE_METHODS
+from snapshot_cache import SnapshotCache, snapshot_response
+from solar_prediction import predict, fallback_prediction, prediction_rows, MIN_HOURS, MAX_HOURS
+from battery_dispatch import plan_dispatch, dispatch_advice, plan_schedule, plan_summary, DISPATCH_HOURS, DISPATCH_STEP_MINUTES
+from sites import SITE_FIELDS, SITE_LOG_FIELDS, parse_site, site_reading
+import numpy as np
 
 app = Flask(__name__)
-CORS(app)
+app.json = FastJSONProvider(app)
+CORS(app, expose_headers=['ETag', 'Last-Modified'])
+install_compression(app)  # gzip/brotli for large responses
 LOCKED_CITY = 'Mumbai'
 
 # In-memory storage (replaces SQLite for serverless)
@@ -30,11 +46,13 @@ _storage = {
         'weather_api_key': None
     },
     'energy_logs': [],
-    'iot_data': {
-        'voltage': 0,
-        'timestamp': 0,
-        'history': []
-    },
+    'log_seq': 0,           # id of the newest log: ?since= cursor and conditional GET validator
+    'config_version': 1,
+    'sites': {},            # id -> site fields
+    'site_seq': 0,
+    'site_logs': {},        # site id -> readings, oldest first
+    'site_log_seq': 0,
+    'sites_sampled_at': 0,
     'initialized': False
 }
 
@@ -56,79 +74,34 @@ def update_config(data):
         _storage['config']['consumption_base'] = float(data['consumption_base'])
     if 'weather_api_key' in data:
         _storage['config']['weather_api_key'] = data['weather_api_key']
+    _storage['config_version'] += 1
     return _storage['config']
 
+def append_logs(logs):
+    """Store new logs with increasing ids, keeping only the last 1000 to prevent memory issues."""
+    for log in logs:
+        _storage['log_seq'] += 1
+        log['id'] = _storage['log_seq']
+        _storage['energy_logs'].append(log)
+    if len(_storage['energy_logs']) > 1000:
+        _storage['energy_logs'] = _storage['energy_logs'][-1000:]
+
 def seed_history_data():
     """Seed 30 days of hourly energy history (only once)."""
     if _storage['initialized'] or len(_storage['energy_logs']) > 0:
         return
     
     config = get_config()
-    current_time = datetime.now() - timedelta(days=30)
-    battery = 50.0
-    
-    for _ in range(30 * 24):
-        month = current_time.month
-        hour = current_time.hour
-        
-        # Simulate weather
-        is_monsoon = 6 <= month <= 9
-        base_temp = 30 - (5 if is_monsoon else 0) + (5 if 10 <= hour <= 15 else 0)
-        temp = base_temp + random.uniform(-2, 2)
-        
-        if is_monsoon and random.random() < 0.4:
-            weather = "Rain"
-            clouds = random.uniform(70, 100)
-        elif random.random() < 0.2:
-            weather = "Clouds"
-            clouds = random.uniform(30, 80)
-        else:
-            weather = "Clear"
-            clouds = random.uniform(0, 20)
-        
-        # Solar Gen
-        if 6 <= hour <= 18:
-            time_factor = math.sin(((hour - 6) / 12) * math.pi)
-            cloud_factor = 1.0 - (clouds / 100 * 0.7)
-            solar = config['solar_capacity'] * time_factor * cloud_factor * config['panel_efficiency']
-        else:
-            solar = 0.0
-        
-        total_gen = solar
-        
-        # Consumption
-        base_cons = config['consumption_base']
-        usage_factor = 1.5 if (7 <= hour <= 10 or 18 <= hour <= 21) else 0.8
-        consumption = base_cons * usage_factor * random.uniform(0.8, 1.2)
-        
-        # Battery Physics
-        net = total_gen - consumption
-        battery_change = (net / config['battery_size']) * 100
-        battery = max(0, min(100, battery + battery_change))
-        
-        log = {
-            'timestamp': current_time,
-            'solar_generation': round(solar, 2),
-            'total_generation': round(total_gen, 2),
-            'consumption': round(consumption, 2),
-            'battery_level': round(battery, 1),
-            'efficiency': round(config['panel_efficiency'] * 100 - max(0, (temp - 25) * 0.5), 1),
-            'temperature': round(temp, 1),
-            'weather_desc': weather
-        }
-        _storage['energy_logs'].append(log)
-        current_time += timedelta(hours=1)
+    latitude, longitude = known_coordinates(LOCKED_CITY)
+    history = generate_history(
+        config['solar_capacity'], config['panel_efficiency'],
+        config['consumption_base'], config['battery_size'],
+        days=30, resolution_minutes=60, latitude=latitude, longitude=longitude
+    )
+    append_logs(history_dicts(history))
     
     _storage['initialized'] = True
 
-optimization_tips = [
-    "Run heavy appliances between 11 AM - 2 PM for maximum solar usage",
-    "Battery is at optimal level. Store excess solar power",
-    "Weather forecast shows cloudy afternoon. Charge battery now",
-    "Peak efficiency detected. Great time for high-power tasks",
-    "Switch to battery power after sunset for better savings"
-]
-
 def calculate_current_state():
     """Calculates one realtime data point."""
     config = get_config()
@@ -176,19 +149,35 @@ def calculate_current_state():
         'weather_desc': weather_data['weather']
     }
     
-    # Keep only last 1000 logs to prevent memory issues
-    _storage['energy_logs'].append(new_log)
-    if len(_storage['energy_logs']) > 1000:
-        _storage['energy_logs'] = _storage['energy_logs'][-1000:]
+    append_logs([new_log])
     
     return new_log, weather_data, sunlight_factor
 
 # Initialize on first import
 seed_history_data()
 
-@app.route('/api/energy', methods=['GET'])
-def get_energy_data():
-    """Main API endpoint - Returns comprehensive energy system status"""
+# --- Conditional GET validators ---
+# Cheap data versions: a matching If-None-Match is answered with 304 before the
+# body is built (see services/conditional.py).
+HISTORY_RANGE_ARGS = ('start', 'end', 'days', 'points')
+
+def history_version():
+    logs = _storage['energy_logs']
+    version = _storage['log_seq']
+    if 'end' not in request.args and any(key in request.args for key in HISTORY_RANGE_ARGS):
+        # A range without ?end= ends now: its echoed start/end move every second
+        version = (version, int(time.time()))
+    return version, (logs[-1]['timestamp'] if logs else None)
+
+def report_version():
+    log_seq, ts = history_version()
+    return (log_seq, datetime.now().date().isoformat()), ts
+
+def config_version():
+    return _storage['config_version'], None
+
+def energy_payload():
+    """Takes a new sample and returns the comprehensive energy system status"""
     log, weather_data, sunlight_factor = calculate_current_state()
     config = get_config()
     
@@ -230,9 +219,37 @@ def get_energy_data():
         'city': weather_data['city'],
         'weather_icon': get_weather_icon_emoji(weather_data['icon'])
     }
-    return jsonify(data)
+    return data
+
+@app.route('/api/energy', methods=['GET'])
+def get_energy_data():
+    """Main API endpoint - Returns comprehensive energy system status"""
+    return jsonify(energy_payload())
+
+# --- Dashboard snapshot ---
+# Energy status plus the history buffer, built at most once per
+# DASHBOARD_SAMPLE_SECONDS (or config change) per warm instance and served to
+# every client as the same precompressed bytes.
+DASHBOARD_SAMPLE_SECONDS = int(os.environ.get('DASHBOARD_SAMPLE_SECONDS', 3))
+
+def dashboard_version():
+    return (_storage['config_version'], int(time.time() // DASHBOARD_SAMPLE_SECONDS))
+
+def build_dashboard():
+    return {
+        'energy': energy_payload(),
+        'history': history_delta_payload(columnar_format=True)
+    }
+
+dashboard_snapshot = SnapshotCache(dashboard_version, build_dashboard, app.json.dumps)
+
+@app.route('/api/dashboard', methods=['GET'])
+def get_dashboard_endpoint():
+    """Everything the overview page shows, in one shared pre-serialized response"""
+    return snapshot_response(dashboard_snapshot.get())
 
 @app.route('/api/config', methods=['GET'])
+@conditional(config_version)
 def get_config_endpoint():
     config = get_config()
     return jsonify({
@@ -269,23 +286,128 @@ def get_weather_endpoint():
     else:
         return jsonify({'success': False, 'error': weather_response.get('error'), 'weather': weather_response['data']}), 500
 
+@app.route('/api/weather/stats', methods=['GET'])
+def get_weather_stats_endpoint():
+    """Weather service cache counters (for monitoring upstream API usage)"""
+    return jsonify({
+        'success': True,
+        'geocode_cache': get_geocode_cache_stats(),
+        'forecast_cache': get_forecast_cache_stats(),
+        'single_flight': get_coalescing_stats(),
+        'dashboard': dashboard_snapshot.stats(),
+        'prediction': {hours: snapshot.stats() for hours, snapshot in prediction_snapshots.items()},
+        'optimization': optimization_snapshot.stats()
+    })
+
+HISTORY_FIELDS = ('timestamp', 'solar_generation', 'total_generation', 'consumption', 'battery', 'temperature', 'efficiency')
+HISTORY_BUFFER_ROWS = 50  # rows a dashboard keeps (and the legacy endpoint returns)
+MONTHLY_FIELDS = ('day', 'solar', 'consumption', 'total')
+
 @app.route('/api/history', methods=['GET'])
+@conditional(history_version)
 def get_history_endpoint():
-    logs = _storage['energy_logs'][-50:] if len(_storage['energy_logs']) > 50 else _storage['energy_logs']
-    history_data = []
-    for log in logs:
-        history_data.append({
-            'timestamp': log['timestamp'].strftime('%H:%M:%S'),
-            'solar_generation': log['solar_generation'],
-            'total_generation': log['total_generation'],
-            'consumption': log['consumption'],
-            'battery': log['battery_level'],
-            'temperature': log['temperature'],
-            'efficiency': log['efficiency']
-        })
-    return jsonify(history_data)
+    # ?since=<id or ISO ts>: only logs added after the cursor (dashboards poll with this)
+    if 'since' in request.args:
+        try:
+            since = history_cursor(request.args['since'])
+        except ValueError:
+            return jsonify({'success': False, 'error': 'since must be a row id or an ISO timestamp'}), 400
+        return jsonify(dict(history_delta_payload(since, wants_columnar(request.args)), success=True))
+    # ?start=&end=&days=&points= select a range; without them, the last 50 entries
+    if any(key in request.args for key in HISTORY_RANGE_ARGS):
+        return history_range_response(request.args)
+    return jsonify(format_history(_storage['energy_logs'][-HISTORY_BUFFER_ROWS:], wants_columnar(request.args)))
+
+def format_history(logs, columnar_format=False):
+    rows = [(
+        log['timestamp'].strftime('%H:%M:%S'),
+        log['solar_generation'],
+        log['total_generation'],
+        log['consumption'],
+        log['battery_level'],
+        log['temperature'],
+        log['efficiency']
+    ) for log in logs]
+    if columnar_format:
+        return columnar(rows, HISTORY_FIELDS)
+    return [dict(zip(HISTORY_FIELDS, row)) for row in rows]
+
+def history_cursor(value):
+    """?since= as a log id; an ISO timestamp maps to the id of the last log at or before it."""
+    if value.isdigit():
+        return int(value)
+    ts = datetime.fromisoformat(value)
+    older = [log['id'] for log in _storage['energy_logs'] if log['timestamp'] <= ts]
+    return older[-1] if older else 0
+
+def history_delta_payload(since=None, columnar_format=False):
+    """Logs added after cursor `since` (None: a snapshot); reset means replace the buffer instead of appending."""
+    logs = _storage['energy_logs']
+    if since is None:
+        newer, reset = logs[-HISTORY_BUFFER_ROWS:], True
+    else:
+        # Ids increase along the list, so scan back from the newest log
+        first = len(logs)
+        while first > 0 and logs[first - 1]['id'] > since:
+            first -= 1
+        newer = logs[first:]
+        reset = len(newer) > HISTORY_BUFFER_ROWS or since > _storage['log_seq']
+        if reset:
+            newer = logs[-HISTORY_BUFFER_ROWS:]
+    return {
+        'cursor': newer[-1]['id'] if newer else (since or 0),
+        'reset': reset,
+        'history': format_history(newer, columnar_format)
+    }
+
+HISTORY_MAX_DAYS = 31          # in-memory logs only cover the seeded month
+HISTORY_DEFAULT_POINTS = 500
+HISTORY_MAX_POINTS = 5000
+
+def history_range_response(args):
+    """Downsampled history for ?start=&end= (ISO) or ?days=, with full ISO timestamps"""
+    try:
+        end = datetime.fromisoformat(args['end']) if args.get('end') else datetime.now()
+        start = datetime.fromisoformat(args['start']) if args.get('start') else end - timedelta(days=int(args.get('days', 1)))
+    except ValueError:
+        return jsonify({'success': False, 'error': 'start/end must be ISO dates and days an integer'}), 400
+    if start >= end or end - start > timedelta(days=HISTORY_MAX_DAYS):
+        return jsonify({'success': False, 'error': f'start must be before end and the range at most {HISTORY_MAX_DAYS} days'}), 400
+    method = args.get('method', 'lttb')
+    if method not in DOWNSAMPLE_METHODS:
+        return jsonify({'success': False, 'error': f"method must be one of {', '.join(DOWNSAMPLE_METHODS)}"}), 400
+    points = max(3, min(args.get('points', HISTORY_DEFAULT_POINTS, type=int), HISTORY_MAX_POINTS))
+
+    logs = [log for log in _storage['energy_logs'] if start <= log['timestamp'] < end]
+    source_rows = len(logs)
+    if source_rows > points:
+        # Pick the points on total generation; every series uses the same rows
+        x = np.fromiter((log['timestamp'].timestamp() for log in logs), dtype=np.float64, count=source_rows)
+        y = np.fromiter((log['total_generation'] for log in logs), dtype=np.float64, count=source_rows)
+        logs = [logs[i] for i in downsample_indices(x, y, points, method).tolist()]
+    rows = [(
+        log['timestamp'].isoformat(timespec='seconds'),
+        log['solar_generation'],
+        log['total_generation'],
+        log['consumption'],
+        log['battery_level'],
+        log['temperature'],
+        log['efficiency']
+    ) for log in logs]
+
+    return jsonify({
+        'success': True,
+        'start': start.isoformat(timespec='seconds'),
+        'end': end.isoformat(timespec='seconds'),
+        'resolution': 'raw',
+        'method': method,
+        'source_rows': source_rows,
+        'points': len(rows),
+        'history': columnar(rows, HISTORY_FIELDS) if wants_columnar(args) else [dict(zip(HISTORY_FIELDS, row)) for row in rows]
+    })
 
 @app.route('/api/monthly', methods=['GET'])
+@conditional(report_version)
 def get_monthly_endpoint():
     end_date = datetime.now()
     start_date = end_date - timedelta(days=30)
@@ -302,78 +424,221 @@ def get_monthly_endpoint():
         daily_map[day_str]['cons'] += log['consumption']
         daily_map[day_str]['count'] += 1
     
-    monthly_data = []
+    rows = []
     for day in sorted(daily_map.keys()):
         d = daily_map[day]
         avg_solar = d['solar'] / d['count'] if d['count'] > 0 else 0
         avg_cons = d['cons'] / d['count'] if d['count'] > 0 else 0
         
-        monthly_data.append({
-            'day': datetime.strptime(day, '%Y-%m-%d').day,
-            'solar': round(avg_solar * 24, 2),
-            'consumption': round(avg_cons * 24, 2),
-            'total': round(avg_solar * 24, 2)
-        })
+        rows.append((
+            datetime.strptime(day, '%Y-%m-%d').day,
+            round(avg_solar * 24, 2),
+            round(avg_cons * 24, 2),
+            round(avg_solar * 24, 2)
+        ))
     
-    return jsonify(monthly_data)
+    if wants_columnar(request.args):
+        return jsonify(columnar(rows, MONTHLY_FIELDS))
+    return jsonify([dict(zip(MONTHLY_FIELDS, row)) for row in rows])
+
+# Battery dispatch plan, rebuilt when the forecast, config, time step or state of charge changes
+def dispatch_soc():
+    last_log = _storage['energy_logs'][-1] if _storage['energy_logs'] else None
+    return last_log['battery_level'] if last_log else 50.0
+
+def optimization_version():
+    forecast = get_hourly_forecast(LOCKED_CITY)
+    return (forecast.fetched_at if forecast else None, _storage['config_version'],
+            int(time.time()) // (DISPATCH_STEP_MINUTES * 60), round(dispatch_soc()))
+
+def build_optimization():
+    config = get_config()
+    hourly, _ = prediction_result(DISPATCH_HOURS + 1)
+    plan = plan_dispatch(hourly, config['consumption_base'], config['battery_size'], dispatch_soc(), time.time())
+    return dict(dispatch_advice(plan), summary=plan_summary(plan), schedule=plan_schedule(plan))
+
+optimization_snapshot = SnapshotCache(optimization_version, build_optimization, app.json.dumps)
 
 @app.route('/api/optimization', methods=['GET'])
 def get_optimization_endpoint():
-    hour = datetime.now().hour
-    
-    if 10 <= hour <= 14:
-        tip, priority = "Peak solar hours! Run heavy loads now.", "high"
-    elif 6 <= hour <= 10:
-        tip, priority = "Morning sun. Charge battery.", "medium"
-    elif 15 <= hour <= 18:
-        tip, priority = "Solar declining. Prepare for evening.", "medium"
-    else:
-        tip, priority = "Night time. Keep non-essential loads minimal.", "low"
-    
-    last_log = _storage['energy_logs'][-1] if _storage['energy_logs'] else None
-    bat = last_log['battery_level'] if last_log else 50
-    
-    bat_tip = "Battery optimal."
-    if bat > 90:
-        bat_tip = "Battery full. Store available solar for evening use."
-    elif bat < 30:
-        bat_tip = "Battery low. Conserve energy."
-
-    timeline = [
-        {'time': '06-10', 'period': 'Morning', 'solar': 'Rising', 'recommendation': 'Charge Battery', 'icon': '🌅'},
-        {'time': '10-14', 'period': 'Peak', 'solar': 'Max', 'recommendation': 'Heavy Loads', 'icon': '☀️'},
-        {'time': '14-18', 'period': 'Afternoon', 'solar': 'Declining', 'recommendation': 'Moderate Usage', 'icon': '🌤️'},
-        {'time': '18-22', 'period': 'Evening', 'solar': 'None', 'recommendation': 'Battery Power', 'icon': '🌙'},
-        {'time': '22-06', 'period': 'Night', 'solar': 'None', 'recommendation': 'Sleep Mode', 'icon': '🌃'},
-    ]
-    
-    return jsonify({
-        'current_tip': tip,
-        'priority': priority,
-        'battery_tip': bat_tip,
-        'timeline': timeline,
-        'tips': random.sample(optimization_tips, 3)
-    })
+    return snapshot_response(optimization_snapshot.get())
+
+# Solar prediction from the cached hourly forecast, rebuilt when the forecast is
+# refreshed, the config changes or the hour rolls over
+def prediction_version(hours):
+    forecast = get_hourly_forecast(LOCKED_CITY)
+    return (forecast.fetched_at if forecast else None, _storage['config_version'], int(time.time()) // 3600, hours)
+
+def prediction_result(hours):
+    """(predict() arrays for the next `hours`, whether they come from the weather forecast)"""
+    config = get_config()
+    forecast = get_hourly_forecast(LOCKED_CITY)
+    now = time.time()
+    if forecast is not None:
+        result = predict(forecast, config['solar_capacity'], config['panel_efficiency'], now, hours)
+        if len(result['time']):
+            return result, True
+    latitude, longitude = known_coordinates(LOCKED_CITY)
+    return fallback_prediction(config['solar_capacity'], config['panel_efficiency'], now, latitude, longitude, hours), False
+
+def build_prediction(hours):
+    result, from_forecast = prediction_result(hours)
+    return prediction_rows(result, include_weather=from_forecast)
+
+prediction_snapshots = {}  # hours -> SnapshotCache
+
+def prediction_snapshot(hours):
+    snapshot = prediction_snapshots.get(hours)
+    if snapshot is None:
+        snapshot = prediction_snapshots.setdefault(hours, SnapshotCache(
+            lambda: prediction_version(hours), lambda: build_prediction(hours), app.json.dumps))
+    return snapshot
 
 @app.route('/api/prediction', methods=['GET'])
 def get_prediction_endpoint():
-    predictions = []
-    current_time = datetime.now()
-    for i in range(24):
-        future_time = current_time + timedelta(hours=i)
-        h = future_time.hour
-        if 6 <= h <= 18:
-            norm = (h - 6) / 12
-            base = 10 * math.sin(norm * math.pi)
-            pred = round(base * random.uniform(0.8, 1.0), 2)
-        else:
-            pred = 0
-        
-        predictions.append({
-            'hour': future_time.strftime('%H:00'),
-            'predicted_solar': pred
-        })
-    return jsonify(predictions)
+    hours = max(MIN_HOURS, min(request.args.get('hours', MIN_HOURS, type=int), MAX_HOURS))
+    return snapshot_response(prediction_snapshot(hours).get())
+
+# --- Sites ---
+# All sites are sampled together at most once per SITE_SAMPLE_SECONDS per warm
+# instance; their weather is refreshed first with batched forecast requests.
+SITE_SAMPLE_SECONDS = int(os.environ.get('SITE_SAMPLE_SECONDS', 60))
+SITE_LOG_ROWS = 1000  # readings kept per site
+
+def sample_sites():
+    """Append one reading per site if the last sample is older than SITE_SAMPLE_SECONDS."""
+    now = time.time()
+    sites = _storage['sites']
+    if not sites or now - _storage['sites_sampled_at'] < SITE_SAMPLE_SECONDS:
+        return
+    _storage['sites_sampled_at'] = now
+    refresh_locations([(site['latitude'], site['longitude']) for site in sites.values()])
+    for site_id, site in sites.items():
+        logs = _storage['site_logs'].setdefault(site_id, [])
+        battery = logs[-1]['battery_level'] if logs else 50.0
+        weather_data, _ = get_location_weather(site['latitude'], site['longitude'], site['city'])
+        log = site_reading(site, weather_data, battery, SITE_SAMPLE_SECONDS / 3600, now)
+        _storage['site_log_seq'] += 1
+        log['id'] = _storage['site_log_seq']
+        logs.append(log)
+        if len(logs) > SITE_LOG_ROWS:
+            del logs[:-SITE_LOG_ROWS]
+
+def format_site_reading(log):
+    return dict(zip(SITE_LOG_FIELDS, (
+        log['timestamp'].isoformat(timespec='seconds'), log['solar_generation'], log['consumption'],
+        log['battery_level'], log['temperature'], log['weather_desc']
+    )))
+
+def site_payload(site_id):
+    logs = _storage['site_logs'].get(site_id)
+    return dict(_storage['sites'][site_id], id=site_id, reading=format_site_reading(logs[-1]) if logs else None)
+
+def resolve_site_location(fields):
+    """Fill in latitude/longitude by geocoding the city when they were not given. Raises ValueError."""
+    if 'latitude' in fields:
+        return fields
+    lat, lon, _, _ = get_lat_lon(fields['city'])
+    if not lat:
+        raise ValueError(f"City '{fields['city']}' not found")
+    return dict(fields, latitude=lat, longitude=lon)
+
+def site_not_found():
+    return jsonify({'success': False, 'error': 'Site not found'}), 404
+
+@app.route('/api/sites', methods=['GET'])
+def list_sites_endpoint():
+    sample_sites()
+    return jsonify({'success': True, 'sites': [site_payload(site_id) for site_id in _storage['sites']]})
+
+@app.route('/api/sites', methods=['POST'])
+def create_site_endpoint():
+    try:
+        fields = resolve_site_location(parse_site(request.get_json(silent=True)))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    _storage['site_seq'] += 1
+    site_id = _storage['site_seq']
+    _storage['sites'][site_id] = {field: fields[field] for field in SITE_FIELDS}
+    return jsonify({'success': True, 'site': site_payload(site_id)}), 201
+
+@app.route('/api/sites/<int:site_id>', methods=['GET'])
+def get_site_endpoint(site_id):
+    if site_id not in _storage['sites']:
+        return site_not_found()
+    sample_sites()
+    return jsonify({'success': True, 'site': site_payload(site_id)})
+
+@app.route('/api/sites/<int:site_id>', methods=['PUT'])
+def update_site_endpoint(site_id):
+    site = _storage['sites'].get(site_id)
+    if site is None:
+        return site_not_found()
+    try:
+        fields = parse_site(request.get_json(silent=True), partial=True)
+        if 'city' in fields and fields['city'] != site['city']:
+            fields = resolve_site_location(fields)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    site.update(fields)
+    return jsonify({'success': True, 'site': site_payload(site_id)})
+
+@app.route('/api/sites/<int:site_id>', methods=['DELETE'])
+def delete_site_endpoint(site_id):
+    if _storage['sites'].pop(site_id, None) is None:
+        return site_not_found()
+    _storage['site_logs'].pop(site_id, None)
+    return jsonify({'success': True})
+
+@app.route('/api/sites/<int:site_id>/history', methods=['GET'])
+def site_history_endpoint(site_id):
+    """A site's readings, newest ?limit= rows (or those after the ?since= id), oldest first"""
+    if site_id not in _storage['sites']:
+        return site_not_found()
+    sample_sites()
+    limit = max(1, min(request.args.get('limit', HISTORY_BUFFER_ROWS, type=int), SITE_LOG_ROWS))
+    since = request.args.get('since', type=int)
+    logs = _storage['site_logs'].get(site_id, [])
+    if since is not None:
+        logs = [log for log in logs if log['id'] > since]
+    logs = logs[-limit:]
+    rows = [tuple(format_site_reading(log).values()) for log in logs]
+    return jsonify({
+        'success': True,
+        'site_id': site_id,
+        'cursor': logs[-1]['id'] if logs else (since or 0),
+        'history': columnar(rows, SITE_LOG_FIELDS) if wants_columnar(request.args) else [dict(zip(SITE_LOG_FIELDS, row)) for row in rows]
+    })
+
+@app.route('/api/sites/<int:site_id>/weather', methods=['GET'])
+def site_weather_endpoint(site_id):
+    site = _storage['sites'].get(site_id)
+    if site is None:
+        return site_not_found()
+    # One batched request refreshes every site that has gone stale
+    refresh_locations([(s['latitude'], s['longitude']) for s in _storage['sites'].values()])
+    weather_data, success = get_location_weather(site['latitude'], site['longitude'], site['city'])
+    weather_data['sunlight_factor'] = calculate_sunlight_factor(weather_data)
+    weather_data['icon_emoji'] = get_weather_icon_emoji(weather_data['icon'])
+    if not success:
+        return jsonify({'success': False, 'error': 'Weather not available', 'weather': weather_data}), 500
+    return jsonify({'success': True, 'weather': weather_data})
+
+@app.route('/api/sites/<int:site_id>/prediction', methods=['GET'])
+def site_prediction_endpoint(site_id):
+    site = _storage['sites'].get(site_id)
+    if site is None:
+        return site_not_found()
+    hours = max(MIN_HOURS, min(request.args.get('hours', MIN_HOURS, type=int), MAX_HOURS))
+    refresh_locations([(s['latitude'], s['longitude']) for s in _storage['sites'].values()])
+    forecast = get_location_forecast(site['latitude'], site['longitude'])
+    now = time.time()
+    if forecast is not None:
+        result = predict(forecast, site['solar_capacity'], site['panel_efficiency'], now, hours)
+        if len(result['time']):
+            return jsonify(prediction_rows(result))
+    result = fallback_prediction(site['solar_capacity'], site['panel_efficiency'], now, site['latitude'], site['longitude'], hours)
+    return jsonify(prediction_rows(result, include_weather=False))
 
 @app.route('/api/calculate-solar', methods=['POST'])
 def calculate_solar_endpoint():
@@ -403,37 +668,118 @@ def login_endpoint():
         return jsonify({'success': True, 'token': 'demo-token'})
     return jsonify({'success': False}), 401
 
+# IoT live history: one fixed-size ring buffer per device
+IOT_HISTORY_CAPACITY = int(os.environ.get('IOT_HISTORY_CAPACITY', 300))
+iot_buffers = RingBufferRegistry(capacity=IOT_HISTORY_CAPACITY)
+
+# Persistent telemetry: append-only mmap segments per device, shared by all workers
+telemetry_store = TelemetryStore(
+    os.environ.get('TELEMETRY_DIR') or os.path.join(tempfile.gettempdir(), 'telemetry'),
+    segment_records=int(os.environ.get('TELEMETRY_SEGMENT_RECORDS', 65536)),
+    retention_days=float(os.environ.get('TELEMETRY_RETENTION_DAYS', 30))
+)
+IOT_RANGE_MAX_POINTS = 5000
+# Appends only expire segments when they rotate; ingest also sweeps every device at this interval
+TELEMETRY_RETENTION_CHECK_SECONDS = int(os.environ.get('TELEMETRY_RETENTION_CHECK_SECONDS', 3600))
+_telemetry_expiry = {'next_at': 0.0}
+
+def expire_telemetry_if_due(now_ms):
+    if now_ms / 1000 < _telemetry_expiry['next_at']:
+        return
+    _telemetry_expiry['next_at'] = now_ms / 1000 + TELEMETRY_RETENTION_CHECK_SECONDS
+    try:
+        telemetry_store.enforce_retention(now_ms)
+    except OSError as e:
+        print(f"Telemetry retention Error: {e}")
+
+def record_telemetry(batch):
+    """Ingest a validated batch in one pass into the device's ring buffer."""
+    now_ms = int(time.time() * 1000)
+    # Device timestamps are ms since boot, so place each sample relative to the receive time
+    received_ms = now_ms - (batch.timestamps[-1] - batch.timestamps)
+    iot_buffers.extend(batch.device, received_ms, batch.voltages)
+    telemetry_store.append(batch.device, received_ms, batch.voltages)
+    expire_telemetry_if_due(now_ms)
+
+def iot_version(device):
+    """Changes with every ingest here and with readings other instances appended to the store."""
+    last_ms = telemetry_store.last_timestamp(device) if device else None
+    return (iot_buffers.seq, device, last_ms), (last_ms / 1000 if last_ms else None)
+
+def solar_version():
+    device = request.args.get('device') or iot_buffers.last_device
+    if device and not valid_device(device):
+        return None, None  # the handler rejects it
+    return iot_version(device)
+
+def parse_time_ms(value):
+    """Epoch milliseconds or an ISO date/datetime -> epoch milliseconds."""
+    if value.lstrip('-').isdigit():
+        return int(value)
+    return int(datetime.fromisoformat(value).timestamp() * 1000)
+
+def iot_range_response(device, args):
+    """Stored samples for ?start=&end= (columnar; evenly thinned to at most ?points=)."""
+    try:
+        end_ms = parse_time_ms(args['end']) if args.get('end') else int(time.time() * 1000)
+        start_ms = parse_time_ms(args['start']) if args.get('start') else end_ms - 3600 * 1000
+    except ValueError:
+        return jsonify({'success': False, 'error': 'start/end must be epoch ms or ISO dates'}), 400
+    points = max(1, min(args.get('points', IOT_RANGE_MAX_POINTS, type=int), IOT_RANGE_MAX_POINTS))
+    timestamps, voltages = telemetry_store.read_range_arrays(device, start_ms, end_ms)
+    step = max(1, -(-len(voltages) // points))
+    return jsonify({
+        'success': True,
+        'device': device,
+        'start': start_ms,
+        'end': end_ms,
+        'count': int(len(voltages)),
+        'timestamps': timestamps[::step].tolist(),
+        'voltages': voltages[::step].tolist()
+    })
+
 @app.route('/api/solar', methods=['GET', 'POST'])
+@conditional(solar_version)
 def iot_solar_endpoint():
     """IoT Solar endpoint for ESP32 data collection and dashboard retrieval"""
     if request.method == 'POST':
+        # Accepts one reading, a JSON batch or a packed binary frame (see iot_ingest.py)
         try:
-            data = request.get_json()
-            voltage = float(data.get('voltage', 0))
-            timestamp = data.get('timestamp', 0)
-            
-            # Update latest data
-            _storage['iot_data']['voltage'] = voltage
-            _storage['iot_data']['timestamp'] = timestamp
-            
-            # Add to history (keep last 50 points)
-            history_point = {
-                'voltage': voltage,
-                'time': datetime.now().strftime('%H:%M:%S')
-            }
-            _storage['iot_data']['history'].append(history_point)
-            if len(_storage['iot_data']['history']) > 50:
-                _storage['iot_data']['history'] = _storage['iot_data']['history'][-50:]
-                
-            return jsonify({'success': True})
-        except Exception as e:
+            batch = parse_request(request)
+        except ValueError as e:
             return jsonify({'success': False, 'error': str(e)}), 400
+        record_telemetry(batch)
+        return jsonify({'success': True, 'device': batch.device, 'accepted': len(batch)})
             
     else: # GET request
+        device = request.args.get('device') or iot_buffers.last_device
+        if device and not valid_device(device):
+            return jsonify({'success': False, 'error': 'invalid device id'}), 400
+        if device and (request.args.get('start') or request.args.get('end')):
+            return iot_range_response(device, request.args)
+        points = max(1, min(request.args.get('points', 50, type=int), iot_buffers.capacity))
+        buffer = iot_buffers.get(device) if device else None
+        if buffer is not None and len(buffer):
+            segments = buffer.segments(points)
+        elif device:
+            # Posted to another worker (or before a restart): read the persistent store
+            segments = [telemetry_store.tail(device, points)]
+        else:
+            segments = []
+        if not segments or len(segments[-1][1]) == 0:
+            return jsonify({'voltage': 0, 'status': 'Idle', 'history': [], 'device': device})
+        voltage = float(segments[-1][1][-1])
+        history = []
+        for timestamps, voltages in segments:
+            history.extend(
+                {'voltage': v, 'time': datetime.fromtimestamp(ts / 1000).strftime('%H:%M:%S')}
+                for ts, v in zip(timestamps.tolist(), voltages.tolist())
+            )
         return jsonify({
-            'voltage': _storage['iot_data']['voltage'],
-            'status': 'Charging' if _storage['iot_data']['voltage'] > 2.0 else 'Idle',
-            'history': _storage['iot_data']['history']
+            'voltage': voltage,
+            'status': 'Charging' if voltage > 2.0 else 'Idle',
+            'history': history,
+            'device': device
         })
 
 # Export Flask app for Vercel
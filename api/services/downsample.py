@@ -0,0 +1,75 @@
+"""
+Downsampling - Shape-preserving reduction of time series for charts
+Both methods return sorted row indices into the input, so one driver series
+(e.g. generation) picks the points and every other series is sliced with the
+same indices.
+
+  lttb    Largest-Triangle-Three-Buckets: one point per bucket, chosen to keep
+          the visual shape (peaks, dips, slopes); first and last points kept
+  minmax  The minimum and maximum of every bucket (up to 2 points per bucket);
+          never loses an extreme value
+"""
+
+import numpy as np
+
+METHODS = ('lttb', 'minmax')
+
+
+def lttb_indices(x, y, threshold):
+    """Indices of at most `threshold` points selected by LTTB."""
+    n = len(y)
+    if threshold >= n:
+        return np.arange(n)
+    if threshold < 3:
+        return np.array([0, n - 1][:max(threshold, 0)], dtype=np.int64)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # Bucket edges over the interior points; first and last points are fixed
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    # Mean of each bucket, used as the third triangle vertex for the bucket before it
+    sizes = np.diff(edges)
+    mean_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / sizes
+    mean_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1) / sizes
+    mean_x = np.append(mean_x[1:], x[-1])
+    mean_y = np.append(mean_y[1:], y[-1])
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        ax, ay = x[a], y[a]
+        # Twice the triangle area (a, candidate, next bucket mean); the constant factor doesn't matter
+        area = np.abs((ax - mean_x[i]) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (mean_y[i] - ay))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def minmax_indices(y, threshold):
+    """Indices of each bucket's min and max (at most `threshold` points, in order)."""
+    n = len(y)
+    if threshold >= n:
+        return np.arange(n)
+    buckets = max(1, threshold // 2)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(0, n, buckets + 1).astype(np.int64)
+    sizes = np.diff(edges)
+    starts = edges[:-1]
+    # argmin/argmax per bucket, vectorized by padding the buckets into a 2-D block
+    width = int(sizes.max())
+    positions = starts[:, None] + np.arange(width)[None, :]
+    valid = np.arange(width)[None, :] < sizes[:, None]
+    block = y[np.minimum(positions, n - 1)]
+    lows = starts + np.argmin(np.where(valid, block, np.inf), axis=1)
+    highs = starts + np.argmax(np.where(valid, block, -np.inf), axis=1)
+    return np.unique(np.concatenate((lows, highs)))
+
+
+def downsample_indices(x, y, threshold, method='lttb'):
+    if method == 'minmax':
+        return minmax_indices(y, threshold)
+    if method == 'lttb':
+        return lttb_indices(x, y, threshold)
+    raise ValueError(f"method must be one of {', '.join(METHODS)}")
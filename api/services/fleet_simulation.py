@@ -0,0 +1,241 @@
+"""
+Fleet Simulation - Vectorized energy simulation for many sites over a time grid
+Weather, solar generation, consumption and the battery are computed as
+(sites x steps) NumPy arrays: every physics step is one array operation over
+the whole chunk of sites and the whole time grid. The clamped battery
+recurrence runs as a log-depth associative scan, so nothing loops per site or
+per step in Python. Large fleets are split into chunks of sites that run
+in a process pool; run_fleet() reports throughput in site-hours per second.
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, fields
+
+import numpy as np
+
+from solar_geometry import solar_zenith, clear_sky_ghi
+
+FLEET_CHUNK_SITES = int(os.environ.get('FLEET_CHUNK_SITES', 64))
+FLEET_WORKERS = int(os.environ.get('FLEET_WORKERS', 0)) or os.cpu_count() or 1
+
+WEATHER_NAMES = np.array(['Clear', 'Clouds', 'Rain'])
+SUMMARY_FIELDS = ('solar_kwh', 'consumption_kwh', 'grid_import_kwh', 'grid_export_kwh',
+                  'battery_mean', 'battery_min', 'empty_hours')
+
+
+@dataclass(frozen=True)
+class Fleet:
+    """Site parameters, one array entry per site."""
+    solar_capacity: np.ndarray    # kW
+    panel_efficiency: np.ndarray  # 0-1
+    consumption_base: np.ndarray  # kW
+    battery_size: np.ndarray      # kWh
+    latitude: np.ndarray
+    longitude: np.ndarray
+    utc_offset: np.ndarray        # hours; local clock = UTC + utc_offset
+
+    def __len__(self):
+        return len(self.solar_capacity)
+
+    def chunk(self, start, stop):
+        return Fleet(**{f.name: getattr(self, f.name)[start:stop] for f in fields(self)})
+
+
+def make_fleet(solar_capacity, panel_efficiency, consumption_base, battery_size,
+               latitude, longitude, utc_offset=None):
+    """
+    Fleet from scalars or per-site sequences (scalars are broadcast to every site)
+    Without utc_offset the local clock is the mean solar time at each longitude.
+    """
+    if utc_offset is None:
+        utc_offset = np.asarray(longitude, dtype=np.float64) / 15.0
+    columns = np.broadcast_arrays(*(np.atleast_1d(np.asarray(value, dtype=np.float64)) for value in (
+        solar_capacity, panel_efficiency, consumption_base, battery_size, latitude, longitude, utc_offset)))
+    return Fleet(*(np.ascontiguousarray(column) for column in columns))
+
+
+def random_fleet(sites, latitude=20.0, longitude=78.0, spread=8.0, seed=None):
+    """Scenario fleet of `sites` households scattered within +/- spread degrees of a centre."""
+    rng = np.random.default_rng(seed)
+    return make_fleet(
+        solar_capacity=rng.uniform(3, 15, sites),
+        panel_efficiency=rng.uniform(0.8, 0.9, sites),
+        consumption_base=rng.uniform(2, 8, sites),
+        battery_size=rng.uniform(5, 20, sites),
+        latitude=np.clip(latitude + rng.uniform(-spread, spread, sites), -89, 89),
+        longitude=(longitude + rng.uniform(-spread, spread, sites) + 180) % 360 - 180
+    )
+
+
+def time_grid(start, days, resolution_minutes=60):
+    """int64 epoch seconds: `days` of steps every `resolution_minutes` from `start` (epoch seconds)."""
+    step = int(resolution_minutes * 60)
+    return int(start) + step * np.arange(int(days * 86400 // step), dtype=np.int64)
+
+
+def consumption_profile(hour, consumption_base):
+    """Typical household load in kW for local clock hours: morning/evening peaks."""
+    hour = np.floor(hour)
+    peak = ((hour >= 7) & (hour <= 10)) | ((hour >= 18) & (hour <= 21))
+    return consumption_base * np.where(peak, 1.5, 0.8)
+
+
+def clamped_scan(start, deltas, lo=0.0, hi=100.0):
+    """
+    Running sum of deltas along the last axis, clamped to [lo, hi] after every step
+    (b[i] = clip(b[i-1] + d[i], lo, hi)), for any number of rows at once
+    Each step is the map x -> clip(x + a, l, h), and composing two such maps
+    gives another one, so the prefix compositions are built by doubling
+    (Hillis-Steele): log2(steps) passes of whole-array operations.
+    """
+    a = np.array(deltas, dtype=np.float64)
+    n = a.shape[-1]
+    low = np.full_like(a, lo)
+    high = np.full_like(a, hi)
+    shift = 1
+    while shift < n:
+        # Element i absorbs the map ending at i - shift (which is applied first)
+        a_cur, low_cur, high_cur = a[..., shift:], low[..., shift:], high[..., shift:]
+        new_low = np.clip(low[..., :-shift] + a_cur, low_cur, high_cur)
+        new_high = np.clip(high[..., :-shift] + a_cur, low_cur, high_cur)
+        a[..., shift:] = a[..., :-shift] + a_cur
+        low[..., shift:] = new_low
+        high[..., shift:] = new_high
+        shift *= 2
+    return np.clip(np.asarray(start, dtype=np.float64)[..., None] + a, low, high)
+
+
+def simulate(fleet, times, seed=None, start_battery=50.0):
+    """
+    Simulated weather and energy flows for every site at every time in `times`
+    times are epoch seconds on an even grid. seed may be an int or a
+    np.random.SeedSequence; the same seed gives the same result.
+    Returns a dict of (sites, steps) arrays: temperature, clouds, weather
+    (index into WEATHER_NAMES), solar, consumption, battery (%) and efficiency.
+    """
+    rng = np.random.default_rng(seed)
+    times = np.asarray(times, dtype=np.int64)
+    n_sites, n = len(fleet), len(times)
+    step_hours = float(times[1] - times[0]) / 3600 if n > 1 else 1.0
+
+    # Local clock: hour of day, hour index since the first sample, and month
+    local = times[None, :] + np.round(fleet.utc_offset * 3600).astype(np.int64)[:, None]
+    hour = (local % 86400) // 3600
+    hour_index = local // 3600 - local[:, :1] // 3600
+    months = local.astype('datetime64[s]').astype('datetime64[M]').astype(np.int64) % 12 + 1
+
+    # Weather is drawn once per clock hour so sub-hourly samples stay coherent
+    n_hours = int(hour_index.max()) + 1 if n else 0
+    rain_draw = np.take_along_axis(rng.random((n_sites, n_hours)), hour_index, axis=1)
+    cloud_draw = np.take_along_axis(rng.random((n_sites, n_hours)), hour_index, axis=1)
+    cover_draw = np.take_along_axis(rng.random((n_sites, n_hours)), hour_index, axis=1)
+
+    # Simulate weather based on season (basic approximation)
+    is_monsoon = (months >= 6) & (months <= 9)
+    temperature = 30 - 5 * is_monsoon + 5 * ((hour >= 10) & (hour <= 15)) + rng.uniform(-2, 2, (n_sites, n))
+    rain = is_monsoon & (rain_draw < 0.4)
+    cloudy = ~rain & (cloud_draw < 0.2)
+    clouds = np.where(rain, 70 + 30 * cover_draw,
+                      np.where(cloudy, 30 + 50 * cover_draw, 20 * cover_draw))
+    weather = np.where(rain, 2, np.where(cloudy, 1, 0)).astype(np.int8)
+
+    # Solar: clear-sky irradiance at the site as a fraction of 1000 W/m2, reduced by clouds
+    zenith = solar_zenith(times[None, :], fleet.latitude[:, None], fleet.longitude[:, None])
+    time_factor = clear_sky_ghi(zenith) / 1000.0
+    cloud_factor = 1.0 - clouds / 100 * 0.7
+    solar = np.maximum(0.0, fleet.solar_capacity[:, None] * time_factor * cloud_factor
+                       * fleet.panel_efficiency[:, None])
+
+    # Consumption (morning/evening peaks)
+    consumption = consumption_profile(hour, fleet.consumption_base[:, None]) * rng.uniform(0.8, 1.2, (n_sites, n))
+
+    # Battery (kWh moved per step as a % of capacity)
+    battery = clamped_scan(np.broadcast_to(start_battery, (n_sites,)),
+                           (solar - consumption) * step_hours / fleet.battery_size[:, None] * 100)
+
+    efficiency = fleet.panel_efficiency[:, None] * 100 - np.maximum(0, (temperature - 25) * 0.5)
+
+    return {
+        'temperature': temperature,
+        'clouds': clouds,
+        'weather': weather,
+        'solar': solar,
+        'consumption': consumption,
+        'battery': battery,
+        'efficiency': efficiency,
+        'step_hours': step_hours
+    }
+
+
+def summarize(fleet, result, start_battery=50.0):
+    """Per-site totals of a simulate() result, one array per SUMMARY_FIELDS entry."""
+    dt = result['step_hours']
+    battery = result['battery']
+    # Energy the battery actually took in (+) or gave out (-) each step, in kWh
+    previous = np.concatenate((np.broadcast_to(start_battery, (len(fleet), 1)), battery[:, :-1]), axis=1)
+    stored = (battery - previous) / 100 * fleet.battery_size[:, None]
+    grid = (result['solar'] - result['consumption']) * dt - stored  # + export, - import
+    return {
+        'solar_kwh': result['solar'].sum(axis=1) * dt,
+        'consumption_kwh': result['consumption'].sum(axis=1) * dt,
+        'grid_import_kwh': np.maximum(-grid, 0).sum(axis=1),
+        'grid_export_kwh': np.maximum(grid, 0).sum(axis=1),
+        'battery_mean': battery.mean(axis=1),
+        'battery_min': battery.min(axis=1),
+        'empty_hours': (battery <= 0).sum(axis=1) * dt
+    }
+
+
+def _simulate_chunk(task):
+    """Pool worker: simulate one chunk of sites and return its summary (or full result)."""
+    fleet, times, seed, start_battery, keep_series = task
+    result = simulate(fleet, times, seed, start_battery)
+    summary = summarize(fleet, result, start_battery)
+    return (summary, result) if keep_series else (summary, None)
+
+
+def run_fleet(fleet, times, seed=None, start_battery=50.0, workers=FLEET_WORKERS,
+              chunk_sites=FLEET_CHUNK_SITES, keep_series=False):
+    """
+    Simulate a whole fleet in chunks of chunk_sites sites across `workers` processes
+    Every chunk gets its own child of SeedSequence(seed), so results do not
+    depend on the number of workers. Returns (summary, series, stats): summary
+    maps SUMMARY_FIELDS to per-site arrays, series is the concatenated
+    simulate() output (only with keep_series) and stats reports throughput.
+    """
+    times = np.asarray(times, dtype=np.int64)
+    bounds = [(start, min(start + chunk_sites, len(fleet))) for start in range(0, len(fleet), chunk_sites)]
+    seeds = np.random.SeedSequence(seed).spawn(len(bounds))
+    tasks = [(fleet.chunk(start, stop), times, chunk_seed, start_battery, keep_series)
+             for (start, stop), chunk_seed in zip(bounds, seeds)]
+    workers = max(1, min(workers, len(tasks)))
+
+    started = time.perf_counter()
+    if workers == 1:
+        results = [_simulate_chunk(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_simulate_chunk, tasks))
+    elapsed = time.perf_counter() - started
+
+    summary = {name: np.concatenate([chunk[name] for chunk, _ in results]) if results else np.empty(0)
+               for name in SUMMARY_FIELDS}
+    series = None
+    if keep_series and results:
+        series = {name: np.concatenate([result[name] for _, result in results])
+                  for name in results[0][1] if name != 'step_hours'}
+        series['step_hours'] = results[0][1]['step_hours']
+    step_hours = float(times[1] - times[0]) / 3600 if len(times) > 1 else 1.0
+    site_hours = len(fleet) * len(times) * step_hours
+    stats = {
+        'sites': len(fleet),
+        'steps': len(times),
+        'chunks': len(tasks),
+        'workers': workers,
+        'seconds': round(elapsed, 3),
+        'site_hours': site_hours,
+        'site_hours_per_second': round(site_hours / elapsed) if elapsed > 0 else None
+    }
+    return summary, series, stats
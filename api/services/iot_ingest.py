@@ -0,0 +1,111 @@
+"""
+IoT Ingest - Parse and validate telemetry batches from ESP32 devices
+
+Accepted POST /api/solar bodies:
+  JSON single   {"voltage": 12.1, "timestamp": 123456}                (legacy, one reading)
+  JSON batch    {"device": "esp32-01", "readings": [{"voltage": .., "timestamp": ..}, ...]}
+                or a bare list of readings
+  Binary frame  Content-Type: application/octet-stream, little-endian:
+                  magic    2s   b'SV'
+                  version  u8   1
+                  device   16s  ASCII id, NUL padded
+                  base_ts  u64  timestamp of the first sample (ms)
+                  count    u16  number of samples
+                  count x (delta_ms u16 since previous sample, millivolts u16)
+"""
+
+import re
+import struct
+from dataclasses import dataclass
+
+import numpy as np
+
+FRAME_MAGIC = b'SV'
+FRAME_VERSION = 1
+FRAME_HEADER = struct.Struct('<2sB16sQH')
+FRAME_SAMPLE = np.dtype([('delta_ms', '<u2'), ('millivolts', '<u2')])
+
+DEFAULT_DEVICE = 'default'
+MAX_BATCH = 4096          # samples per request
+MAX_VOLTAGE = 100.0       # anything above this is a wiring/ADC fault
+MAX_DEVICE_ID = 64
+DEVICE_ID = re.compile(rf'[A-Za-z0-9][A-Za-z0-9_-]{{0,{MAX_DEVICE_ID - 1}}}')  # also a directory name in the telemetry store
+
+
+@dataclass(frozen=True)
+class TelemetryBatch:
+    """Validated readings from one device, oldest first."""
+    device: str
+    timestamps: np.ndarray   # int64, device clock in ms
+    voltages: np.ndarray     # float64 volts
+
+    def __len__(self):
+        return len(self.voltages)
+
+
+def parse_frame(payload):
+    """Decode a packed binary frame (see module docstring). Raises ValueError if malformed."""
+    if len(payload) < FRAME_HEADER.size:
+        raise ValueError('frame too short')
+    magic, version, device, base_ts, count = FRAME_HEADER.unpack_from(payload)
+    if magic != FRAME_MAGIC or version != FRAME_VERSION:
+        raise ValueError('unsupported frame format')
+    expected = FRAME_HEADER.size + count * FRAME_SAMPLE.itemsize
+    if len(payload) != expected:
+        raise ValueError(f'frame length {len(payload)} does not match {count} samples')
+    samples = np.frombuffer(payload, dtype=FRAME_SAMPLE, count=count, offset=FRAME_HEADER.size)
+    deltas = samples['delta_ms'].astype(np.int64)
+    deltas[:1] = 0  # the first sample is at base_ts
+    timestamps = base_ts + np.cumsum(deltas)
+    voltages = samples['millivolts'] / 1000.0
+    device_id = device.rstrip(b'\0').decode('ascii', 'replace') or DEFAULT_DEVICE
+    return _validated(device_id, timestamps, voltages)
+
+
+def parse_json(data):
+    """Normalize a legacy single reading, a {"device", "readings"} batch or a bare list."""
+    if isinstance(data, list):
+        device, readings = DEFAULT_DEVICE, data
+    elif isinstance(data, dict) and 'readings' in data:
+        device, readings = data.get('device') or DEFAULT_DEVICE, data['readings']
+    elif isinstance(data, dict):
+        device, readings = data.get('device') or DEFAULT_DEVICE, [data]
+    else:
+        raise ValueError('expected a JSON object or array')
+    if not isinstance(readings, list):
+        raise ValueError('readings must be an array')
+    try:
+        voltages = np.array([float(r.get('voltage', 0)) for r in readings], dtype=np.float64)
+        timestamps = np.array([int(r.get('timestamp', 0)) for r in readings], dtype=np.int64)
+    except (AttributeError, TypeError, ValueError):
+        raise ValueError('each reading needs a numeric voltage and timestamp')
+    return _validated(str(device), timestamps, voltages)
+
+
+def parse_request(req):
+    """Parse a Flask request into a TelemetryBatch (raises ValueError on bad input)."""
+    if req.mimetype == 'application/octet-stream':
+        return parse_frame(req.get_data(cache=False))
+    data = req.get_json(silent=True)
+    if data is None:
+        raise ValueError('body must be JSON or an application/octet-stream frame')
+    return parse_json(data)
+
+
+def valid_device(device):
+    """True if device is a plain id: letters, digits, '_' and '-', at most MAX_DEVICE_ID characters."""
+    return isinstance(device, str) and DEVICE_ID.fullmatch(device) is not None
+
+
+def _validated(device, timestamps, voltages):
+    if not valid_device(device):
+        raise ValueError(f'invalid device id (letters, digits, "_" and "-", at most {MAX_DEVICE_ID} characters)')
+    if len(voltages) == 0:
+        raise ValueError('empty batch')
+    if len(voltages) > MAX_BATCH:
+        raise ValueError(f'batch larger than {MAX_BATCH} samples')
+    if not np.all(np.isfinite(voltages)) or voltages.min() < 0 or voltages.max() > MAX_VOLTAGE:
+        raise ValueError(f'voltage out of range (0-{MAX_VOLTAGE} V)')
+    if np.any(np.diff(timestamps) < 0):
+        raise ValueError('timestamps must be non-decreasing')
+    return TelemetryBatch(device=device, timestamps=timestamps, voltages=voltages)
@@ -0,0 +1,105 @@
+"""
+Snapshot Cache - One pre-serialized response shared by every client
+The payload is rebuilt only when its version changes; each build encodes the
+JSON once and precompresses it for every supported Content-Encoding, so serving
+it is a memory read plus a socket write.
+"""
+
+import hashlib
+import threading
+import time
+from dataclasses import dataclass, field
+
+from flask import Response, request
+
+from json_response import compress, negotiate_encoding, supported_encodings, COMPRESS_MIN_BYTES
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    version: object
+    body: bytes                       # identity-encoded JSON
+    etag: str
+    built_at: float
+    encoded: dict = field(default_factory=dict)  # Content-Encoding -> compressed body
+    payload: object = None            # the object body was encoded from (treat as read-only)
+
+
+class SnapshotCache:
+    """
+    Lazily rebuilt snapshot of build_fn()
+    version_fn() must be cheap (at most an indexed lookup); the body is rebuilt
+    by the first request that sees a new version while concurrent requests wait
+    for it.
+    """
+
+    def __init__(self, version_fn, build_fn, dumps, min_compress_bytes=COMPRESS_MIN_BYTES):
+        self.version_fn = version_fn
+        self.build_fn = build_fn
+        self.dumps = dumps
+        self.min_compress_bytes = min_compress_bytes
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self.builds = 0
+        self.hits = 0
+
+    def get(self):
+        version = self.version_fn()
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == version:
+            self.hits += 1
+            return snapshot
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.version != version:
+                snapshot = self._snapshot = self._build(version)
+            return snapshot
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshot = None
+
+    def _build(self, version):
+        payload = self.build_fn()
+        body = self.dumps(payload).encode('utf-8')
+        encoded = {}
+        if len(body) >= self.min_compress_bytes:
+            encoded = {encoding: compress(body, encoding) for encoding in supported_encodings()}
+        self.builds += 1
+        return Snapshot(
+            version=version,
+            body=body,
+            etag=hashlib.blake2b(body, digest_size=12).hexdigest(),
+            built_at=time.time(),
+            encoded=encoded,
+            payload=payload
+        )
+
+    def stats(self):
+        snapshot = self._snapshot
+        return {
+            'builds': self.builds,
+            'hits': self.hits,
+            'bytes': len(snapshot.body) if snapshot else 0,
+            'encodings': sorted(snapshot.encoded) if snapshot else [],
+            'built_at': snapshot.built_at if snapshot else None
+        }
+
+
+def snapshot_response(snapshot):
+    """304 for a matching If-None-Match, otherwise the precompressed body the client accepts."""
+    if request.if_none_match.contains_weak(snapshot.etag):
+        response = Response(status=304)
+    else:
+        encoding = negotiate_encoding(request.accept_encodings)
+        body = snapshot.encoded.get(encoding)
+        if body is None:
+            response = Response(snapshot.body, mimetype='application/json')
+        else:
+            response = Response(body, mimetype='application/json')
+            response.headers['Content-Encoding'] = encoding
+    # Weak: the same validator covers every encoding of the snapshot
+    response.set_etag(snapshot.etag, weak=True)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.vary.add('Accept-Encoding')
+    return response
@@ -0,0 +1,138 @@
+"""
+Solar Geometry - Sun position, day length and clear-sky irradiance from lat/lon and time
+Implements the NOAA solar calculator equations (Meeus-based, accurate to well
+under a degree for current dates), so whether the sun is up needs no network
+call. Every function accepts scalars or NumPy arrays of Unix timestamps (UTC
+epoch seconds) and broadcasts over them; a year of minute positions for one
+site takes about 0.2 s.
+"""
+
+import os
+
+import numpy as np
+
+# Site used when a location's coordinates are not known (Mumbai)
+DEFAULT_LATITUDE = float(os.environ.get('DEFAULT_LATITUDE', 19.0760))
+DEFAULT_LONGITUDE = float(os.environ.get('DEFAULT_LONGITUDE', 72.8777))
+
+SUNRISE_ZENITH = 90.833  # degrees: sun's upper limb on the horizon, including standard refraction
+
+
+def _sun_terms(timestamps):
+    """(declination in radians, equation of time in minutes) at the given instants."""
+    jd = np.asarray(timestamps, dtype=np.float64) / 86400.0 + 2440587.5
+    t = (jd - 2451545.0) / 36525.0  # Julian centuries since J2000.0
+
+    mean_long = np.radians((280.46646 + t * (36000.76983 + t * 0.0003032)) % 360.0)
+    mean_anom = np.radians(357.52911 + t * (35999.05029 - 0.0001537 * t))
+    eccent = 0.016708634 - t * (0.000042037 + 0.0000001267 * t)
+    center = (np.sin(mean_anom) * (1.914602 - t * (0.004817 + 0.000014 * t))
+              + np.sin(2 * mean_anom) * (0.019993 - 0.000101 * t)
+              + np.sin(3 * mean_anom) * 0.000289)
+    omega = np.radians(125.04 - 1934.136 * t)
+    apparent_long = np.radians(np.degrees(mean_long) + center - 0.00569 - 0.00478 * np.sin(omega))
+    obliquity = np.radians(23.0 + (26.0 + (21.448 - t * (46.815 + t * (0.00059 - t * 0.001813))) / 60.0) / 60.0
+                           + 0.00256 * np.cos(omega))
+
+    declination = np.arcsin(np.sin(obliquity) * np.sin(apparent_long))
+    y = np.tan(obliquity / 2) ** 2
+    equation_of_time = 4 * np.degrees(
+        y * np.sin(2 * mean_long)
+        - 2 * eccent * np.sin(mean_anom)
+        + 4 * eccent * y * np.sin(mean_anom) * np.cos(2 * mean_long)
+        - 0.5 * y * y * np.sin(4 * mean_long)
+        - 1.25 * eccent * eccent * np.sin(2 * mean_anom)
+    )
+    return declination, equation_of_time
+
+
+def _refraction(elevation):
+    """Atmospheric refraction correction in degrees for a true elevation (NOAA approximation)."""
+    elevation = np.asarray(elevation, dtype=np.float64)
+    with np.errstate(divide='ignore'):
+        cot_e = 1.0 / np.tan(np.radians(np.clip(elevation, -0.575, 89.9)))
+    cot_2 = cot_e * cot_e
+    correction = np.where(
+        elevation > 5.0,
+        np.where(elevation > 85.0, 0.0, cot_e * (58.1 - cot_2 * (0.07 - 0.000086 * cot_2))),
+        np.where(elevation > -0.575,
+                 1735.0 + elevation * (-518.2 + elevation * (103.4 + elevation * (-12.79 + elevation * 0.711))),
+                 -20.772 * cot_e)
+    )
+    return correction / 3600.0
+
+
+def _hour_angle(timestamps, longitude):
+    """(declination, hour angle) in radians at the given instants and longitudes."""
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    declination, equation_of_time = _sun_terms(timestamps)
+    true_solar_minutes = (timestamps % 86400.0 / 60.0 + equation_of_time + 4.0 * longitude) % 1440.0
+    return declination, np.radians(true_solar_minutes / 4.0 - 180.0)
+
+
+def _zenith(declination, hour_angle, lat, refraction):
+    cos_zenith = np.clip(np.sin(lat) * np.sin(declination)
+                         + np.cos(lat) * np.cos(declination) * np.cos(hour_angle), -1.0, 1.0)
+    zenith = np.degrees(np.arccos(cos_zenith))
+    if refraction:
+        zenith = zenith - _refraction(90.0 - zenith)
+    return zenith
+
+
+def solar_zenith(timestamps, latitude, longitude, refraction=True):
+    """Apparent solar zenith in degrees (solar_position() without the azimuth)."""
+    declination, hour_angle = _hour_angle(timestamps, longitude)
+    return _zenith(declination, hour_angle, np.radians(latitude), refraction)
+
+
+def solar_position(timestamps, latitude, longitude, refraction=True):
+    """
+    Apparent solar zenith and azimuth in degrees (azimuth clockwise from north)
+    Zenith above 90 means the sun is below the horizon.
+    """
+    declination, hour_angle = _hour_angle(timestamps, longitude)
+    lat = np.radians(latitude)
+    zenith = _zenith(declination, hour_angle, lat, refraction)
+    azimuth = (np.degrees(np.arctan2(np.sin(hour_angle),
+                                     np.cos(hour_angle) * np.sin(lat) - np.tan(declination) * np.cos(lat)))
+               + 180.0) % 360.0
+    return zenith, azimuth
+
+
+def sun_times(timestamps, latitude, longitude):
+    """
+    (sunrise, solar noon, sunset) as Unix timestamps for the solar day containing each timestamp
+    During polar night sunrise == sunset == noon; during midnight sun they are noon -/+ 12 h.
+    """
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    # Mean solar noon (UTC) of the local solar day, then correct by the equation of time there
+    day = np.floor((timestamps + longitude * 240.0) / 86400.0)
+    mean_noon = day * 86400.0 + 43200.0 - longitude * 240.0
+    declination, equation_of_time = _sun_terms(mean_noon)
+    solar_noon = mean_noon - equation_of_time * 60.0
+
+    lat = np.radians(latitude)
+    cos_hour_angle = (np.cos(np.radians(SUNRISE_ZENITH)) / (np.cos(lat) * np.cos(declination))
+                      - np.tan(lat) * np.tan(declination))
+    half_day = np.degrees(np.arccos(np.clip(cos_hour_angle, -1.0, 1.0))) * 240.0  # seconds
+    return solar_noon - half_day, solar_noon, solar_noon + half_day
+
+
+def clear_sky_ghi(zenith):
+    """Clear-sky global horizontal irradiance in W/m2 for a solar zenith in degrees (Haurwitz model)."""
+    cos_zenith = np.cos(np.radians(zenith))
+    with np.errstate(divide='ignore', over='ignore', invalid='ignore'):
+        ghi = 1098.0 * cos_zenith * np.exp(-0.059 / cos_zenith)
+    return np.where(cos_zenith > 0.0, ghi, 0.0)
+
+
+def cloudy_sky_ghi(clear_ghi, cloud_cover):
+    """Clear-sky GHI attenuated by total cloud cover in % (Kasten-Czeplak)."""
+    fraction = np.clip(np.asarray(cloud_cover, dtype=np.float64) / 100.0, 0.0, 1.0)
+    return clear_ghi * (1.0 - 0.75 * fraction ** 3.4)
+
+
+def irradiance(timestamps, latitude, longitude, cloud_cover=0.0):
+    """Estimated GHI in W/m2 at the given instants: clear-sky, attenuated by cloud cover (%)."""
+    zenith, _ = solar_position(timestamps, latitude, longitude)
+    return cloudy_sky_ghi(clear_sky_ghi(zenith), cloud_cover)
@@ -0,0 +1,142 @@
+"""
+Solar Prediction - Forecast-driven PV output, computed as one NumPy batch
+Uses Open-Meteo's hourly shortwave radiation (GHI), air temperature and cloud
+cover for the site. For each hour the array output is
+
+    P = capacity * GHI / 1000 * panel_efficiency * (1 + TEMP_COEFFICIENT * (T_cell - 25))
+    T_cell = T_air + (NOCT - 20) / 800 * GHI
+
+clipped to [0, capacity] (kW, i.e. kWh for the hour). Gaps in the radiation
+forecast, and the whole curve when there is no forecast, are estimated from the
+sun's position (services/solar_geometry.py) and cloud cover.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+
+import numpy as np
+
+from solar_geometry import irradiance as estimated_irradiance
+
+STC_IRRADIANCE = 1000.0      # W/m2 at standard test conditions
+TEMP_COEFFICIENT = -0.004    # power change per degree C of cell temperature above 25 C (crystalline Si)
+NOCT = 45.0                  # nominal operating cell temperature, C
+MIN_HOURS = 24
+MAX_HOURS = 168
+HOURLY_FIELDS = 'temperature_2m,cloud_cover,shortwave_radiation'
+
+
+@dataclass(frozen=True)
+class HourlyForecast:
+    """Hourly forecast arrays; shortwave_radiation is the mean over the hour *ending* at time."""
+    time: np.ndarray                 # int64 epoch seconds
+    temperature: np.ndarray          # C
+    cloud_cover: np.ndarray          # %
+    shortwave_radiation: np.ndarray  # W/m2
+    fetched_at: float
+
+
+def _filled(values):
+    """float64 array with missing (None/NaN) entries interpolated from their neighbours."""
+    values = np.array(values, dtype=np.float64)
+    missing = np.isnan(values)
+    if missing.all():
+        return np.zeros_like(values)
+    if missing.any():
+        index = np.arange(len(values))
+        values[missing] = np.interp(index[missing], index[~missing], values[~missing])
+    return values
+
+
+def parse_hourly(hourly, fetched_at, latitude=None, longitude=None):
+    """
+    HourlyForecast from the 'hourly' block of an Open-Meteo response (timeformat=unixtime)
+    With the site's coordinates, missing radiation values are estimated from the
+    sun's position at mid-hour and the cloud cover instead of interpolated.
+    """
+    times = np.asarray(hourly['time'], dtype=np.int64)
+    cloud_cover = _filled(hourly['cloud_cover'])
+    radiation = np.array(hourly['shortwave_radiation'], dtype=np.float64)
+    missing = np.isnan(radiation)
+    if missing.any() and latitude is not None and longitude is not None:
+        radiation[missing] = estimated_irradiance(times[missing] - 1800, latitude, longitude, cloud_cover[missing])
+    return HourlyForecast(
+        time=times,
+        temperature=_filled(hourly['temperature_2m']),
+        cloud_cover=cloud_cover,
+        shortwave_radiation=np.maximum(_filled(radiation), 0.0),
+        fetched_at=fetched_at
+    )
+
+
+def pv_output(irradiance, air_temperature, solar_capacity, panel_efficiency):
+    """Vectorized array output in kW for irradiance (W/m2) and air temperature (C) arrays."""
+    cell_temperature = air_temperature + (NOCT - 20.0) / 800.0 * irradiance
+    derate = 1.0 + TEMP_COEFFICIENT * (cell_temperature - 25.0)
+    power = solar_capacity * (irradiance / STC_IRRADIANCE) * panel_efficiency * derate
+    return np.clip(power, 0.0, solar_capacity)
+
+
+def predict(forecast, solar_capacity, panel_efficiency, start_ts, hours=24):
+    """
+    Predicted output for the `hours` whole hours starting at the hour containing start_ts
+    Returns a dict of equally long arrays: time (epoch s, start of each hour),
+    power (kW), irradiance, temperature and cloud_cover. Hours beyond the end of
+    the forecast are left out.
+    """
+    hours = max(MIN_HOURS, min(int(hours), MAX_HOURS))
+    hour_start = int(start_ts) // 3600 * 3600
+    # Open-Meteo radiation is the mean of the preceding hour, so the hour
+    # [t, t + 1h) is described by the sample stamped t + 1h
+    first = int(np.searchsorted(forecast.time, hour_start + 3600))
+    window = slice(first, first + hours)
+    irradiance = forecast.shortwave_radiation[window]
+    temperature = forecast.temperature[window]
+    return {
+        'time': forecast.time[window] - 3600,
+        'power': pv_output(irradiance, temperature, solar_capacity, panel_efficiency),
+        'irradiance': irradiance,
+        'temperature': temperature,
+        'cloud_cover': forecast.cloud_cover[window]
+    }
+
+
+def fallback_prediction(solar_capacity, panel_efficiency, start_ts, latitude, longitude, hours=24):
+    """
+    Weather-free estimate for when no forecast is available: clear-sky
+    irradiance at the site (sun position at mid-hour) and 25 C
+    """
+    hours = max(MIN_HOURS, min(int(hours), MAX_HOURS))
+    hour_start = int(start_ts) // 3600 * 3600
+    times = hour_start + 3600 * np.arange(hours, dtype=np.int64)
+    irradiance = estimated_irradiance(times + 1800, latitude, longitude)
+    temperature = np.full(hours, 25.0)
+    return {
+        'time': times,
+        'power': pv_output(irradiance, temperature, solar_capacity, panel_efficiency),
+        'irradiance': irradiance,
+        'temperature': temperature,
+        'cloud_cover': np.zeros(hours)
+    }
+
+
+def prediction_rows(result, include_weather=True):
+    """[{'hour', 'time', 'predicted_solar', ...}] rows for a predict()/fallback_prediction() result."""
+    rows = []
+    power = np.round(result['power'], 2).tolist()
+    irradiance = np.round(result['irradiance'], 1).tolist()
+    temperature = np.round(result['temperature'], 1).tolist()
+    cloud_cover = np.round(result['cloud_cover']).astype(int).tolist()
+    for i, ts in enumerate(result['time'].tolist()):
+        hour_time = datetime.fromtimestamp(ts)
+        row = {
+            'hour': hour_time.strftime('%H:00'),
+            'time': hour_time.isoformat(),
+            'predicted_solar': power[i]
+        }
+        if include_weather:
+            row['radiation'] = irradiance[i]
+            row['temperature'] = temperature[i]
+            row['cloud_cover'] = cloud_cover[i]
+        rows.append(row)
+    return rows
@@ -0,0 +1,103 @@
+"""
+TTL Cache - Thread-safe LRU cache with per-entry expiry
+Keeps answers to slow upstream lookups (e.g. geocoding) in memory,
+optionally mirrored to a small JSON file so restarts start warm
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Size-bounded LRU cache whose entries expire after a TTL.
+    Keys must be strings when a persist_path is used (JSON object keys).
+    """
+
+    def __init__(self, maxsize=256, ttl=3600, persist_path=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.persist_path = persist_path
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if persist_path:
+            self._load()
+
+    def get(self, key, default=None):
+        """Return the cached value for key, or default if absent/expired."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not _MISSING:
+                del self._entries[key]
+            self.misses += 1
+        return default
+
+    def set(self, key, value, ttl=None):
+        """Store value under key for ttl seconds (defaults to the cache TTL)."""
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            snapshot = list(self._entries.items()) if self.persist_path else None
+        if snapshot is not None:
+            self._save(snapshot)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+        if self.persist_path:
+            self._save([])
+
+    def stats(self):
+        """Hit/miss counters for monitoring."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0
+            }
+
+    def _load(self):
+        try:
+            with open(self.persist_path, 'r', encoding='utf-8') as fh:
+                stored = json.load(fh)
+        except (OSError, ValueError):
+            return
+        now = time.time()
+        # Oldest first so the LRU order survives the round trip
+        for key, (expires_at, value) in stored:
+            if expires_at > now:
+                self._entries[key] = (expires_at, value)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def _save(self, items):
+        # Write to a temp file and rename so readers never see half a file
+        tmp_path = f"{self.persist_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as fh:
+                json.dump([[key, list(entry)] for key, entry in items], fh)
+            os.replace(tmp_path, self.persist_path)
+        except OSError as e:
+            print(f"Cache persist error: {e}")
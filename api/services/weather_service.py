@@ -3,102 +3,344 @@ Weather Service - Real-time weather data integration
 Fetches live weather data from Open-Meteo API (Free, No Key Required)
 """
 
+import os
+import threading
+import time
 import requests
 from datetime import datetime
+from ttl_cache import TTLCache
+from http_client import http_get
+from singleflight import SingleFlight
+from solar_prediction import parse_hourly, HOURLY_FIELDS, MAX_HOURS
+from solar_geometry import solar_position, sun_times, clear_sky_ghi, SUNRISE_ZENITH, DEFAULT_LATITUDE, DEFAULT_LONGITUDE
 
 # Open-Meteo APIs
 GEOCODING_URL = "https://geocoding-api.open-meteo.com/v1/search"
 WEATHER_URL = "https://api.open-meteo.com/v1/forecast"
 
+# Geocoding cache - a city's coordinates never change, so keep them for a long time.
+# Unknown cities are cached too (for a shorter time) so typos don't hit the API every poll.
+# Set GEOCODE_CACHE_FILE (e.g. /tmp/geocode_cache.json on Vercel) to survive restarts.
+GEOCODE_CACHE_SIZE = int(os.environ.get('GEOCODE_CACHE_SIZE', 512))
+GEOCODE_CACHE_TTL = int(os.environ.get('GEOCODE_CACHE_TTL', 30 * 24 * 3600))
+GEOCODE_NEGATIVE_TTL = int(os.environ.get('GEOCODE_NEGATIVE_TTL', 3600))
+
+_geocode_cache = TTLCache(
+    maxsize=GEOCODE_CACHE_SIZE,
+    ttl=GEOCODE_CACHE_TTL,
+    persist_path=os.environ.get('GEOCODE_CACHE_FILE') or None
+)
+
+# Forecast cache - Open-Meteo only updates about every 15 minutes, so serve cached
+# forecasts per coordinate and refresh them in the background once they go stale.
+FORECAST_FRESH_SECONDS = int(os.environ.get('FORECAST_FRESH_SECONDS', 900))
+# Coordinates per batched forecast request (refresh_locations)
+WEATHER_BATCH_SIZE = int(os.environ.get('WEATHER_BATCH_SIZE', 100))
+
+_forecast_cache = {}  # (lat, lon) -> {'data': weather_data, 'hourly': HourlyForecast, 'fetched_at': epoch seconds}
+_forecast_lock = threading.Lock()
+_refreshing = set()
+_forecast_stats = {'fresh_hits': 0, 'stale_hits': 0, 'misses': 0, 'refreshes': 0, 'refresh_errors': 0,
+                   'batch_requests': 0, 'batch_locations': 0}
+
+# Concurrent callers for the same city/coordinate wait on one in-flight upstream call
+_flight = SingleFlight()
+
 def get_lat_lon(city):
     """
     Geocode city name to latitude/longitude using Open-Meteo Geocoding API
+    Results (including "not found") are served from the geocoding cache when possible
     """
+    key = (city or '').strip().lower()
+    cached = _geocode_cache.get(key)
+    if cached is not None:
+        if not cached['found']:
+            return None, None, city, None
+        return cached['lat'], cached['lon'], cached['name'], cached['country']
+
     try:
-        # Default to India context if not specified, but API handles standard cities well
-        params = {'name': city, 'count': 1, 'format': 'json'}
-        response = requests.get(GEOCODING_URL, params=params, timeout=5)
-        data = response.json()
-        
-        if 'results' in data and data['results']:
-            result = data['results'][0]
-            return result['latitude'], result['longitude'], result['name'], result.get('country', '')
+        entry = _flight.do(('geocode', key), lambda: _geocode(city, key))
+        if entry['found']:
+            return entry['lat'], entry['lon'], entry['name'], entry['country']
             
     except Exception as e:
+        # Network/API errors are not cached so the next call retries
         print(f"Geocoding Error: {e}")
         
     return None, None, city, None
 
+def _geocode(city, key):
+    """Query the geocoding API and cache the answer (raises on network errors)."""
+    # Default to India context if not specified, but API handles standard cities well
+    params = {'name': city, 'count': 1, 'format': 'json'}
+    response = http_get(GEOCODING_URL, params=params)
+    response.raise_for_status()
+    data = response.json()
+    
+    if 'results' in data and data['results']:
+        result = data['results'][0]
+        entry = {
+            'found': True,
+            'lat': result['latitude'],
+            'lon': result['longitude'],
+            'name': result['name'],
+            'country': result.get('country', '')
+        }
+        _geocode_cache.set(key, entry)
+        return entry
+
+    # Negative caching: the API answered, the city just doesn't exist
+    entry = {'found': False}
+    _geocode_cache.set(key, entry, ttl=GEOCODE_NEGATIVE_TTL)
+    return entry
+
+def known_coordinates(city):
+    """(lat, lon) of city from the geocoding cache, or the default site - never calls the API"""
+    cached = _geocode_cache.get((city or '').strip().lower())
+    if cached is not None and cached['found']:
+        return cached['lat'], cached['lon']
+    return DEFAULT_LATITUDE, DEFAULT_LONGITUDE
+
+def get_geocode_cache_stats():
+    """Hit/miss counters of the geocoding cache."""
+    return _geocode_cache.stats()
+
 def get_weather(city, api_key=None):
     """
     Fetch real-time weather data for a given city using Open-Meteo
     api_key param is preserved for interface compatibility but ignored
+
+    Forecasts are cached per coordinate. Within FORECAST_FRESH_SECONDS the cached
+    value is returned as-is; after that the stale value is still returned at once
+    while a single background refresh runs (stale-while-revalidate).
     """
-    
+    entry, resolved_name, error = _lookup_forecast(city)
+    if entry is None:
+        return {
+            'success': False,
+            'error': error,
+            'data': get_fallback_weather(city)
+        }
+    return {
+        'success': True,
+        'data': dict(entry['data'], city=resolved_name)
+    }
+
+def get_hourly_forecast(city, fetch=True):
+    """
+    Hourly forecast arrays for city (an HourlyForecast), or None if unavailable
+    Comes from the same cached forecast call as get_weather(). With fetch=False
+    only already cached data is used and the network is never touched (for
+    cheap version checks, or when a poller keeps the cache fresh).
+    """
+    if not fetch:
+        entry = _cached_forecast(city)
+    else:
+        entry, _, _ = _lookup_forecast(city)
+    return entry['hourly'] if entry is not None else None
+
+def _cached_forecast(city):
+    location = _geocode_cache.get((city or '').strip().lower())
+    if location is None or not location['found']:
+        return None
+    with _forecast_lock:
+        return _forecast_cache.get(_forecast_key(location['lat'], location['lon']))
+
+def _lookup_forecast(city):
+    """(cache entry, resolved name, error) for city; the entry is None if no forecast could be fetched."""
     # 1. Resolve City to Lat/Lon
     lat, lon, resolved_name, country = get_lat_lon(city)
     
     if not lat:
-         return {
-            'success': False,
-            'error': f"City '{city}' not found",
-            'data': get_fallback_weather(city)
-        }
+        return None, city, f"City '{city}' not found"
 
-    try:
-        # 2. Fetch Weather Data
-        params = {
-            'latitude': lat,
-            'longitude': lon,
-            'current': 'temperature_2m,relative_humidity_2m,apparent_temperature,is_day,weather_code,cloud_cover,pressure_msl,wind_speed_10m,wind_direction_10m',
-            'daily': 'sunrise,sunset',
-            'timezone': 'auto'
-        }
-        
-        response = requests.get(WEATHER_URL, params=params, timeout=5)
-        response.raise_for_status()
-        data = response.json()
-        
-        current = data['current']
-        daily = data['daily']
-        
-        # 3. Parse and Map Data
-        wmo_code = current['weather_code']
-        is_day = current['is_day']
-        weather_info = get_wmo_info(wmo_code, is_day)
-        
-        # Parse sunrise/sunset (ISO 8601 format)
-        sunrise_ts = int(datetime.fromisoformat(daily['sunrise'][0]).timestamp())
-        sunset_ts = int(datetime.fromisoformat(daily['sunset'][0]).timestamp())
-        
-        weather_data = {
-            'city': resolved_name,
-            'temperature': round(current['temperature_2m'], 1),
-            'feels_like': round(current['apparent_temperature'], 1),
-            'humidity': current['relative_humidity_2m'],
-            'clouds': current['cloud_cover'],
-            'weather': weather_info['main'],
-            'description': weather_info['description'],
-            'wind_speed': round(current['wind_speed_10m'], 1),
-            'sunrise': sunrise_ts,
-            'sunset': sunset_ts,
-            'visibility': 10.0, # Not provided by free tier, default to 10km
-            'pressure': round(current['pressure_msl']),
-            'icon': weather_info['icon']
-        }
+    key = _forecast_key(lat, lon)
+    with _forecast_lock:
+        entry = _forecast_cache.get(key)
 
-        return {
-            'success': True,
-            'data': weather_data
-        }
+    if entry is not None:
+        age = time.time() - entry['fetched_at']
+        if age < FORECAST_FRESH_SECONDS:
+            _forecast_stats['fresh_hits'] += 1
+        else:
+            _forecast_stats['stale_hits'] += 1
+            _schedule_refresh(key, lat, lon)
+        return entry, resolved_name, None
+
+    # 2. Nothing cached yet - fetch synchronously
+    _forecast_stats['misses'] += 1
+    try:
+        return _refresh_forecast(key, lat, lon), resolved_name, None
 
     except requests.exceptions.RequestException as e:
         print(f"Weather API Error: {e}")
-        return {
-            'success': False,
-            'error': str(e),
-            'data': get_fallback_weather(city)
-        }
+        return None, resolved_name, str(e)
+
+def _forecast_key(lat, lon):
+    # ~10 m precision is plenty to share one forecast per site
+    return (round(lat, 4), round(lon, 4))
+
+def _fetch_forecast(lat, lon):
+    """
+    Fetch and parse a coordinate's current conditions and hourly forecast (raises on HTTP errors)
+    Returns (weather_data, HourlyForecast).
+    """
+    return _fetch_forecasts([(lat, lon)])[0]
+
+def _fetch_forecasts(locations):
+    """
+    Fetch forecasts for a list of (lat, lon) in one request (raises on HTTP errors)
+    Open-Meteo takes comma-separated coordinate lists and answers with one
+    result per location, in order. Returns [(weather_data, HourlyForecast), ...].
+    """
+    params = {
+        'latitude': ','.join(str(lat) for lat, _ in locations),
+        'longitude': ','.join(str(lon) for _, lon in locations),
+        'current': 'temperature_2m,relative_humidity_2m,apparent_temperature,is_day,weather_code,cloud_cover,pressure_msl,wind_speed_10m,wind_direction_10m',
+        'hourly': HOURLY_FIELDS,
+        'daily': 'sunrise,sunset',
+        # Enough days to cover MAX_HOURS ahead of any time today
+        'forecast_days': MAX_HOURS // 24 + 1,
+        'timeformat': 'unixtime',
+        'timezone': 'auto'
+    }
+    
+    response = http_get(WEATHER_URL, params=params)
+    response.raise_for_status()
+    data = response.json()
+    # A single location comes back as an object, several as a list
+    results = data if isinstance(data, list) else [data]
+    if len(results) != len(locations):
+        raise requests.exceptions.RequestException(f"expected {len(locations)} forecasts, got {len(results)}")
+    fetched_at = time.time()
+    return [_parse_forecast(result, lat, lon, fetched_at) for result, (lat, lon) in zip(results, locations)]
+
+def _parse_forecast(data, lat, lon, fetched_at):
+    current = data['current']
+    daily = data['daily']
+    
+    # Parse and Map Data
+    wmo_code = current['weather_code']
+    is_day = current['is_day']
+    weather_info = get_wmo_info(wmo_code, is_day)
+    
+    # Sunrise/sunset come as epoch seconds (timeformat=unixtime)
+    sunrise_ts = int(daily['sunrise'][0])
+    sunset_ts = int(daily['sunset'][0])
+    
+    weather_data = {
+        'city': None,  # filled in by the caller from the geocoding result
+        'temperature': round(current['temperature_2m'], 1),
+        'feels_like': round(current['apparent_temperature'], 1),
+        'humidity': current['relative_humidity_2m'],
+        'clouds': current['cloud_cover'],
+        'weather': weather_info['main'],
+        'description': weather_info['description'],
+        'wind_speed': round(current['wind_speed_10m'], 1),
+        'sunrise': sunrise_ts,
+        'sunset': sunset_ts,
+        'visibility': 10.0, # Not provided by free tier, default to 10km
+        'pressure': round(current['pressure_msl']),
+        'icon': weather_info['icon'],
+        'latitude': lat,
+        'longitude': lon
+    }
+    return weather_data, parse_hourly(data['hourly'], fetched_at, lat, lon)
+
+def refresh_locations(locations, max_age=FORECAST_FRESH_SECONDS):
+    """
+    Make sure every (lat, lon) in locations has a cached forecast younger than max_age
+    Missing and stale coordinates are fetched WEATHER_BATCH_SIZE at a time with one
+    upstream request per batch, so hundreds of sites cost a handful of requests.
+    Returns the number of upstream requests made.
+    """
+    now = time.time()
+    wanted = {_forecast_key(lat, lon): (lat, lon) for lat, lon in locations}
+    with _forecast_lock:
+        due = [key for key in wanted
+               if key not in _forecast_cache or now - _forecast_cache[key]['fetched_at'] >= max_age]
+    made = 0
+    for offset in range(0, len(due), WEATHER_BATCH_SIZE):
+        keys = due[offset:offset + WEATHER_BATCH_SIZE]
+        made += 1
+        try:
+            results = _fetch_forecasts([wanted[key] for key in keys])
+        except (requests.exceptions.RequestException, KeyError, ValueError) as e:
+            # Keep serving whatever is cached; the next refresh retries
+            _forecast_stats['refresh_errors'] += 1
+            print(f"Weather batch Error: {e}")
+            continue
+        entries = {key: {'data': weather_data, 'hourly': hourly, 'fetched_at': hourly.fetched_at}
+                   for key, (weather_data, hourly) in zip(keys, results)}
+        with _forecast_lock:
+            _forecast_cache.update(entries)
+        _forecast_stats['refreshes'] += len(entries)
+        _forecast_stats['batch_requests'] += 1
+        _forecast_stats['batch_locations'] += len(entries)
+    return made
+
+def get_location_weather(lat, lon, name=None):
+    """
+    Cached weather for a coordinate (see refresh_locations), never calling the API
+    Returns (weather_data, success); fallback weather for the coordinate if nothing is cached.
+    """
+    with _forecast_lock:
+        entry = _forecast_cache.get(_forecast_key(lat, lon))
+    if entry is None:
+        return get_fallback_weather(name, lat, lon), False
+    return dict(entry['data'], city=name), True
+
+def get_location_forecast(lat, lon):
+    """Cached HourlyForecast for a coordinate, or None (never calls the API)."""
+    with _forecast_lock:
+        entry = _forecast_cache.get(_forecast_key(lat, lon))
+    return entry['hourly'] if entry is not None else None
+
+def _refresh_forecast(key, lat, lon):
+    """
+    Fetch a forecast and store it in the cache
+    Concurrent refreshes of the same coordinate share one upstream request
+    """
+    return _flight.do(('forecast', key), lambda: _fetch_and_store(key, lat, lon))
+
+def _fetch_and_store(key, lat, lon):
+    weather_data, hourly = _fetch_forecast(lat, lon)
+    entry = {'data': weather_data, 'hourly': hourly, 'fetched_at': hourly.fetched_at}
+    with _forecast_lock:
+        _forecast_cache[key] = entry
+    _forecast_stats['refreshes'] += 1
+    return entry
+
+def _schedule_refresh(key, lat, lon):
+    """Start one background refresh for key unless one is already running."""
+    with _forecast_lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+
+    def run():
+        try:
+            _refresh_forecast(key, lat, lon)
+        except Exception as e:
+            # Keep serving the stale value; the next stale hit retries
+            _forecast_stats['refresh_errors'] += 1
+            print(f"Weather refresh Error: {e}")
+        finally:
+            with _forecast_lock:
+                _refreshing.discard(key)
+
+    threading.Thread(target=run, name=f"weather-refresh-{key}", daemon=True).start()
+
+def get_coalescing_stats():
+    """How many geocode/forecast calls were served by another caller's in-flight request."""
+    return _flight.stats()
+
+def get_forecast_cache_stats():
+    """Counters of the stale-while-revalidate forecast cache."""
+    with _forecast_lock:
+        size = len(_forecast_cache)
+        refreshing = len(_refreshing)
+    return dict(_forecast_stats, size=size, refreshing=refreshing, fresh_seconds=FORECAST_FRESH_SECONDS)
 
 def get_wmo_info(code, is_day):
     """
@@ -136,11 +378,19 @@ def get_wmo_info(code, is_day):
         
     return info
 
-def get_fallback_weather(city):
+def get_fallback_weather(city, latitude=None, longitude=None):
     """
     Provide fallback weather data when API is unavailable
-    Uses reasonable defaults for Indian cities based on time of day
+    Uses reasonable defaults for Indian cities based on time of day; sunrise,
+    sunset and day/night come from the sun's position at the city (if its
+    coordinates are cached) or the default site
     """
+    if latitude is None or longitude is None:
+        latitude, longitude = known_coordinates(city)
+    now = time.time()
+    sunrise, _, sunset = sun_times(now, latitude, longitude)
+    zenith, _ = solar_position(now, latitude, longitude)
+    is_day = zenith < SUNRISE_ZENITH
     hour = datetime.now().hour
     
     # Simple temperature curve
@@ -159,23 +409,27 @@ def get_fallback_weather(city):
         'weather': weather,
         'description': desc,
         'wind_speed': 3.5,
-        'sunrise': int(datetime.now().replace(hour=6, minute=0).timestamp()),
-        'sunset': int(datetime.now().replace(hour=18, minute=30).timestamp()),
+        'sunrise': int(sunrise),
+        'sunset': int(sunset),
         'visibility': 10,
         'pressure': 1013,
-        'icon': '01d' if 6 <= hour <= 18 else '01n'
+        'icon': '01d' if is_day else '01n',
+        'latitude': latitude,
+        'longitude': longitude
     }
 
-def calculate_sunlight_factor(weather_data):
+def calculate_sunlight_factor(weather_data, now=None):
     """
     Calculate sunlight availability factor (0-1) based on weather conditions
+    and the sun's position at the weather's coordinates
     """
-    # Check if it's daytime
-    current_time = datetime.now().timestamp()
-    sunrise = weather_data['sunrise']
-    sunset = weather_data['sunset']
+    now = time.time() if now is None else now
+    latitude = weather_data.get('latitude', DEFAULT_LATITUDE)
+    longitude = weather_data.get('longitude', DEFAULT_LONGITUDE)
     
-    if current_time < sunrise or current_time > sunset:
+    # Check if it's daytime
+    zenith, _ = solar_position(now, latitude, longitude)
+    if zenith >= SUNRISE_ZENITH:
         return 0.0  # Night time, no sunlight
     
     # Base sunlight factor
@@ -198,16 +452,8 @@ def calculate_sunlight_factor(weather_data):
     else:
         weather_factor = 1.0
     
-    # Calculate time-of-day factor (peak at solar noon)
-    # Simple sine wave approximation between sunrise and sunset
-    day_duration = sunset - sunrise
-    if day_duration <= 0: return 0
-    
-    time_since_sunrise = current_time - sunrise
-    progress = time_since_sunrise / day_duration
-    
-    import math
-    time_factor = math.sin(progress * math.pi)
+    # Time-of-day factor: clear-sky irradiance as a fraction of the 1000 W/m2 panels are rated at
+    time_factor = float(clear_sky_ghi(zenith)) / 1000.0
     
     # Combine all factors
     sunlight_factor = base_factor * cloud_factor * weather_factor * time_factor
@@ -3,24 +3,52 @@ Smart Renewable Energy Optimization & Monitoring Dashboard - Backend API
 Realistic solar monitoring with real weather data integration
 """
 
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request, stream_with_context
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import insert, func, inspect
+import click
+import csv
 import math
-import random
+import time
+import numpy as np
 from datetime import datetime, timedelta
 import sys
 import os
+import atexit
 
 # Add services directory to path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'services'))
-from weather_service import get_weather, calculate_sunlight_factor, get_weather_icon_emoji
+from weather_service import calculate_sunlight_factor, get_weather_icon_emoji, get_geocode_cache_stats, get_forecast_cache_stats, get_coalescing_stats, get_hourly_forecast, known_coordinates, get_lat_lon, get_location_weather, get_location_forecast, refresh_locations
+from weather_poller import WeatherPoller
+from energy_sampler import EnergySampler
+from leader import LeaderLock
+from database import engine_options, apply_migrations
+from rollups import update_rollups, rebuild_statements
+from iot_ingest import parse_request, valid_device
+from ring_buffer import RingBufferRegistry
+from telemetry_store import TelemetryStore
+from history_generator import generate_history, history_rows, HISTORY_COLUMNS
+from fleet_simulation import make_fleet, random_fleet, time_grid, run_fleet, SUMMARY_FIELDS, FLEET_WORKERS, FLEET_CHUNK_SITES
+from config_cache import VersionedCache
+from event_hub import EventHub
+from conditional import conditional
+from json_response import FastJSONProvider, columnar, wants_columnar, install_compression
+from downsample import downsample_indices, METHODS as DOWNSAMPLE_METHODS
+from snapshot_cache import SnapshotCache, snapshot_response
+from solar_prediction import predict, fallback_prediction, prediction_rows, MIN_HOURS, MAX_HOURS
+from battery_dispatch import plan_dispatch, dispatch_advice, plan_schedule, plan_summary, DISPATCH_HOURS, DISPATCH_STEP_MINUTES
+from sites import SITE_FIELDS, SITE_LOG_FIELDS, parse_site, site_reading
+from dataclasses import dataclass
 
 app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///energy.db'
+app.json = FastJSONProvider(app)
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///energy.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-CORS(app)  # Enable CORS for frontend communication
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
+CORS(app, expose_headers=['ETag', 'Last-Modified'])  # Enable CORS for frontend communication
 db = SQLAlchemy(app)
+install_compression(app)  # gzip/brotli for large responses
 # LOCKED_CITY = 'Mumbai' # Removed as per user request
 
 
@@ -29,7 +57,7 @@ db = SQLAlchemy(app)
 class EnergyLog(db.Model):
     __tablename__ = 'energy_log'
     id = db.Column(db.Integer, primary_key=True)
-    timestamp = db.Column(db.DateTime, nullable=False)
+    timestamp = db.Column(db.DateTime, nullable=False, index=True)
     solar_generation = db.Column(db.Float, default=0)
     total_generation = db.Column(db.Float, default=0)
     consumption = db.Column(db.Float, default=0)
@@ -38,6 +66,11 @@ class EnergyLog(db.Model):
     temperature = db.Column(db.Float, default=0)
     weather_desc = db.Column(db.String(64), default='Clear')
 
+    __table_args__ = (
+        # Covering index so daily aggregates never touch the table rows
+        db.Index('ix_energy_log_ts_solar_cons', 'timestamp', 'solar_generation', 'consumption'),
+    )
+
 
 class SystemConfig(db.Model):
     __tablename__ = 'system_config'
@@ -49,9 +82,106 @@ class SystemConfig(db.Model):
     consumption_base = db.Column(db.Float, default=5)
     weather_api_key = db.Column(db.String(256), default=None)
     simulation_enabled = db.Column(db.Boolean, default=False)
+    version = db.Column(db.Integer, nullable=False, default=1)  # bumped on every update
+
+
+class Site(db.Model):
+    """An additional monitored installation (the SystemConfig one stays the primary site)."""
+    __tablename__ = 'site'
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(128), nullable=False)
+    city = db.Column(db.String(128), nullable=False)
+    latitude = db.Column(db.Float, nullable=False)
+    longitude = db.Column(db.Float, nullable=False)
+    solar_capacity = db.Column(db.Float, default=10)
+    battery_size = db.Column(db.Float, default=10)
+    panel_efficiency = db.Column(db.Float, default=0.85)
+    consumption_base = db.Column(db.Float, default=5)
+
+
+class SiteLog(db.Model):
+    __tablename__ = 'site_log'
+    id = db.Column(db.Integer, primary_key=True)
+    site_id = db.Column(db.Integer, nullable=False)
+    timestamp = db.Column(db.DateTime, nullable=False)
+    solar_generation = db.Column(db.Float, default=0)
+    consumption = db.Column(db.Float, default=0)
+    battery_level = db.Column(db.Float, default=50)
+    temperature = db.Column(db.Float, default=0)
+    weather_desc = db.Column(db.String(64), default='Clear')
+
+    __table_args__ = (
+        # Per-site history reads walk one site's rows in id order
+        db.Index('ix_site_log_site_id', 'site_id', 'id'),
+    )
+
+
+class RollupColumns:
+    """Aggregate columns shared by the hourly and daily rollup tables."""
+    bucket = db.Column(db.DateTime, primary_key=True)  # start of the hour/day
+    sample_count = db.Column(db.Integer, nullable=False, default=0)
+    generation_sum = db.Column(db.Float, default=0)
+    generation_min = db.Column(db.Float)
+    generation_max = db.Column(db.Float)
+    consumption_sum = db.Column(db.Float, default=0)
+    consumption_min = db.Column(db.Float)
+    consumption_max = db.Column(db.Float)
+    temperature_sum = db.Column(db.Float, default=0)
+    temperature_min = db.Column(db.Float)
+    temperature_max = db.Column(db.Float)
+    last_timestamp = db.Column(db.DateTime)
+    last_battery_level = db.Column(db.Float)
+
+
+class EnergyRollupHourly(RollupColumns, db.Model):
+    __tablename__ = 'energy_rollup_hourly'
+
+
+class EnergyRollupDaily(RollupColumns, db.Model):
+    __tablename__ = 'energy_rollup_daily'
 
 
 
+# Schema migrations for databases created before a change (tracked in PRAGMA user_version).
+# Append new entries; never edit or reorder applied ones.
+MIGRATIONS = [
+    (1, 'index energy_log.timestamp', [
+        'CREATE INDEX IF NOT EXISTS ix_energy_log_timestamp ON energy_log (timestamp)',
+    ]),
+    (2, 'covering index for daily aggregates', [
+        'CREATE INDEX IF NOT EXISTS ix_energy_log_ts_solar_cons ON energy_log (timestamp, solar_generation, consumption)',
+    ]),
+    (3, 'backfill hourly/daily rollups', rebuild_statements('energy_rollup_hourly', 'energy_rollup_daily')),
+    (4, 'system_config.version', [
+        'ALTER TABLE system_config ADD COLUMN version INTEGER NOT NULL DEFAULT 1',
+    ]),
+]
+
+def init_db():
+    """Create missing tables and apply pending migrations."""
+    fresh = not inspect(db.engine).has_table(EnergyLog.__tablename__)
+    db.create_all()
+    apply_migrations(db.engine, MIGRATIONS, fresh=fresh)
+
+@app.cli.command('init-db')
+def init_db_command():
+    """Create tables and migrate an existing energy.db."""
+    init_db()
+    print("Database is up to date")
+
+def rebuild_rollups():
+    """Recompute the hourly/daily rollup tables from energy_log."""
+    for statement in rebuild_statements(EnergyRollupHourly.__tablename__, EnergyRollupDaily.__tablename__):
+        db.session.execute(db.text(statement))
+    db.session.commit()
+
+@app.cli.command('rebuild-rollups')
+def rebuild_rollups_command():
+    """Backfill the rollup tables from raw energy_log rows."""
+    rebuild_rollups()
+    print(f"Rebuilt {EnergyRollupHourly.query.count()} hourly and {EnergyRollupDaily.query.count()} daily rollups")
+
+
 def get_config_from_db():
     """Get or create the single system config row."""
     config = SystemConfig.query.first()
@@ -69,135 +199,361 @@ def get_config_from_db():
     return config
 
 
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """Immutable copy of the SystemConfig row served from the config cache."""
+    city: str
+    solar_capacity: float
+    battery_size: float
+    panel_efficiency: float
+    consumption_base: float
+    weather_api_key: str
+    simulation_enabled: bool
+    version: int
+
+def load_config_snapshot():
+    config = get_config_from_db()
+    return ConfigSnapshot(
+        city=config.city,
+        solar_capacity=config.solar_capacity,
+        battery_size=config.battery_size,
+        panel_efficiency=config.panel_efficiency,
+        consumption_base=config.consumption_base,
+        weather_api_key=config.weather_api_key,
+        simulation_enabled=bool(config.simulation_enabled),
+        version=config.version or 1
+    )
+
+# Config changes only through POST /api/config, so readers share one cached snapshot.
+# The stamp file next to the database tells other worker processes when to reload.
+config_cache = VersionedCache(load_config_snapshot, os.path.join(app.instance_path, 'config.version'))
+
+def get_config():
+    """Cached, read-only system config (no query unless the config version changed)."""
+    return config_cache.get()
+
 
-def seed_history_data():
-    """Seed 30 days of hourly energy history for charts (only if empty)."""
+
+def seed_history_data(days=30, resolution_minutes=60, seed=None):
+    """Seed energy history for charts (only if empty; default 30 days hourly)."""
     if EnergyLog.query.first() is not None:
         return
-    config = get_config_from_db()
-    current_time = datetime.now() - timedelta(days=30)
-    battery = 50.0
-    for _ in range(30 * 24):
-        month = current_time.month
-        hour = current_time.hour
-        # Simulate weather based on season (basic approximation)
-        is_monsoon = 6 <= month <= 9
-        base_temp = 30 - (5 if is_monsoon else 0) + (5 if 10 <= hour <= 15 else 0)
-        temp = base_temp + random.uniform(-2, 2)
-        if is_monsoon and random.random() < 0.4:
-            weather = "Rain"
-            clouds = random.uniform(70, 100)
-        elif random.random() < 0.2:
-            weather = "Clouds"
-            clouds = random.uniform(30, 80)
-        else:
-            weather = "Clear"
-            clouds = random.uniform(0, 20)
-        # Solar Gen
-        if 6 <= hour <= 18:
-            time_factor = math.sin(((hour - 6) / 12) * math.pi)
-            cloud_factor = 1.0 - (clouds / 100 * 0.7)
-            solar = config.solar_capacity * time_factor * cloud_factor * config.panel_efficiency
-        else:
-            solar = 0.0
-        total_gen = solar
-        # Consumption
-        base_cons = config.consumption_base
-        usage_factor = 1.5 if (7 <= hour <= 10 or 18 <= hour <= 21) else 0.8
-        consumption = base_cons * usage_factor * random.uniform(0.8, 1.2)
-        # Battery Physics
-        net = total_gen - consumption
-        battery_change = (net / config.battery_size) * 100
-        battery = max(0, min(100, battery + battery_change))
-        log = EnergyLog(
-            timestamp=current_time,
-            solar_generation=0,
-            total_generation=0,
-            consumption=0,
-            battery_level=0,
-            efficiency=0,
-            temperature=round(temp, 1),
-            weather_desc=weather
-        )
-        db.session.add(log)
-        current_time += timedelta(hours=1)
+    config = get_config()
+    latitude, longitude = known_coordinates(config.city)
+    history = generate_history(
+        config.solar_capacity, config.panel_efficiency, config.consumption_base, config.battery_size,
+        days=days, resolution_minutes=resolution_minutes, seed=seed,
+        latitude=latitude, longitude=longitude
+    )
+    if not config.simulation_enabled:
+        # Simulation disabled: keep the weather columns, zero the energy readings
+        for column in ('solar_generation', 'total_generation', 'consumption', 'battery_level', 'efficiency'):
+            history[column] = np.zeros_like(history[column])
+    insert_history(history)
+    rebuild_rollups()
+    print(f"Seeded {days} days of history ({len(history['timestamp'])} rows)!")
+
+def insert_history(history, chunk_size=100000):
+    """Bulk insert generated history with executemany (no ORM objects)."""
+    sql = (f"INSERT INTO energy_log ({', '.join(HISTORY_COLUMNS)}) "
+           f"VALUES ({', '.join('?' * len(HISTORY_COLUMNS))})")
+    rows = history_rows(history)
+    connection = db.session.connection()
+    for offset in range(0, len(rows), chunk_size):
+        connection.exec_driver_sql(sql, rows[offset:offset + chunk_size])
     db.session.commit()
-    print("Seeded 30 days of history!")
 
+@app.cli.command('seed-history')
+@click.option('--days', default=30, show_default=True, help='Length of the generated history.')
+@click.option('--resolution', default=60, show_default=True, help='Minutes between samples.')
+@click.option('--seed', type=int, default=None, help='Random seed for a reproducible history.')
+@click.option('--replace', is_flag=True, help='Delete existing energy_log rows first.')
+def seed_history_command(days, resolution, seed, replace):
+    """Generate synthetic energy history."""
+    init_db()
+    if replace:
+        EnergyLog.query.delete()
+        db.session.commit()
+    elif EnergyLog.query.first() is not None:
+        print("energy_log already has data (use --replace to overwrite)")
+        return
+    started = time.perf_counter()
+    seed_history_data(days=days, resolution_minutes=resolution, seed=seed)
+    print(f"Done in {time.perf_counter() - started:.1f}s")
 
-optimization_tips = [
-    "Run heavy appliances between 11 AM - 2 PM for maximum solar usage",
-    "Battery is at optimal level. Store excess solar power",
-    "Weather forecast shows cloudy afternoon. Charge battery now",
-    "Peak efficiency detected. Great time for high-power tasks",
-    "Switch to battery power after sunset for better savings"
-]
+
+@app.cli.command('simulate-fleet')
+@click.option('--sites', default=1000, show_default=True, help='Number of random sites (ignored with --registered).')
+@click.option('--registered', is_flag=True, help='Simulate the sites stored in the site table instead.')
+@click.option('--days', default=365, show_default=True, help='Length of the simulated period.')
+@click.option('--resolution', default=60, show_default=True, help='Minutes between steps.')
+@click.option('--start', default=None, help='ISO start date (default: 1 January of this year).')
+@click.option('--workers', default=FLEET_WORKERS, show_default=True, help='Worker processes.')
+@click.option('--chunk', default=FLEET_CHUNK_SITES, show_default=True, help='Sites per worker task.')
+@click.option('--seed', type=int, default=None, help='Random seed for a reproducible scenario.')
+@click.option('--output', type=click.Path(dir_okay=False, writable=True), default=None,
+              help='Write per-site totals to this CSV file.')
+def simulate_fleet_command(sites, registered, days, resolution, start, workers, chunk, seed, output):
+    """Simulate a fleet of sites offline and report throughput."""
+    if registered:
+        init_db()
+        rows = Site.query.order_by(Site.id).all()
+        if not rows:
+            print("No sites registered (POST /api/sites)")
+            return
+        fleet = make_fleet(*([getattr(site, name) for site in rows] for name in (
+            'solar_capacity', 'panel_efficiency', 'consumption_base', 'battery_size', 'latitude', 'longitude')))
+        names = [site.name for site in rows]
+    else:
+        fleet = random_fleet(sites, seed=seed)
+        names = [f'site-{i + 1}' for i in range(sites)]
+    first = datetime.fromisoformat(start) if start else datetime(datetime.now().year, 1, 1)
+    times = time_grid(first.timestamp(), days, resolution)
+
+    summary, _, stats = run_fleet(fleet, times, seed=seed, workers=workers, chunk_sites=chunk)
+    print(f"Simulated {stats['sites']} sites x {stats['steps']} steps ({stats['site_hours']:,.0f} site-hours) "
+          f"in {stats['seconds']}s on {stats['workers']} worker(s): {stats['site_hours_per_second']:,} site-hours/s")
+    print(f"Fleet totals: solar {summary['solar_kwh'].sum():,.0f} kWh, consumption {summary['consumption_kwh'].sum():,.0f} kWh, "
+          f"grid import {summary['grid_import_kwh'].sum():,.0f} kWh, export {summary['grid_export_kwh'].sum():,.0f} kWh")
+    if output:
+        with open(output, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(('site',) + SUMMARY_FIELDS)
+            columns = [np.round(summary[name], 2).tolist() for name in SUMMARY_FIELDS]
+            writer.writerows([name] + list(values) for name, values in zip(names, zip(*columns)))
+        print(f"Per-site totals written to {output}")
+
+# --- Background workers ---
+# Weather is refreshed by a background poller; request handlers only read its snapshot.
+# One process (elected through an flock'd file) runs the poller and samplers, so a
+# multi-worker server still writes a single reading per interval.
+BACKGROUND_WORKERS = os.environ.get('BACKGROUND_WORKERS', '1') != '0'
+WEATHER_POLL_SECONDS = int(os.environ.get('WEATHER_POLL_SECONDS', 60))
+# Energy samples are taken on a fixed cadence and written to the DB in batches,
+# so request traffic no longer decides how many EnergyLog rows get written.
+SAMPLE_INTERVAL_SECONDS = int(os.environ.get('SAMPLE_INTERVAL_SECONDS', 60))
+SAMPLE_FLUSH_BATCH = int(os.environ.get('SAMPLE_FLUSH_BATCH', 10))
+SAMPLE_FLUSH_SECONDS = int(os.environ.get('SAMPLE_FLUSH_SECONDS', 120))
+
+def configured_cities():
+    """Cities the weather poller should keep fresh (runs on the poller thread)."""
+    with app.app_context():
+        return [get_config().city]
+
+def site_locations():
+    """Coordinates of every site; the poller refreshes them with batched requests."""
+    with app.app_context():
+        return [(lat, lon) for lat, lon in db.session.query(Site.latitude, Site.longitude)]
+
+weather_poller = WeatherPoller(configured_cities, interval=WEATHER_POLL_SECONDS, locations_fn=site_locations)
+
+background_leader = LeaderLock(os.path.join(app.instance_path, 'background.lock'))
+
+def start_background_workers():
+    """
+    Start the background threads if this process is the elected leader (idempotent)
+    Called lazily on requests, which covers the Flask dev server (only the
+    reloader child serves requests) and pre-forking WSGI servers (workers try to
+    lead after the fork; followers retry every LeaderLock.retry_seconds and take
+    over if the leader exits). Can also be called explicitly, e.g. from a gunicorn
+    post_worker_init hook. Returns whether this process runs the workers.
+    """
+    if not background_leader.acquire():
+        return False
+    weather_poller.start()
+    energy_sampler.start()
+    site_sampler.start()
+    return True
+
+def stop_background_workers():
+    weather_poller.stop()
+    energy_sampler.stop()
+    site_sampler.stop()
+    event_hub.stop()
+    background_leader.release()
+
+atexit.register(stop_background_workers)
+
+@app.before_request
+def ensure_background_workers():
+    if BACKGROUND_WORKERS and not (weather_poller.is_running() and energy_sampler.is_running() and site_sampler.is_running()):
+        start_background_workers()
+
+def get_current_weather(city):
+    """
+    Latest polled weather for city
+    Only blocks on the network for a city the poller has not fetched yet.
+    Returns (weather_data, success, error); weather_data is a fresh dict the caller may modify.
+    """
+    snapshot = weather_poller.get(city)
+    if snapshot is None:
+        # Not polled yet (startup or city just changed) - one fetch shared by concurrent requests
+        snapshot = weather_poller.fetch(city)
+    elif not weather_poller.is_running() and time.time() - snapshot.fetched_at >= weather_poller.interval:
+        # Another process runs the poller: refresh on read, at most once per poll interval
+        snapshot = weather_poller.fetch(city)
+    return dict(snapshot.weather), snapshot.success, snapshot.error
 
 def calculate_current_state():
-    """Calculates one realtime data point and saves to DB"""
-    config = get_config_from_db()
-    
-    # Get last log for battery continuity
-    last_log = EnergyLog.query.order_by(EnergyLog.timestamp.desc()).first()
-    current_battery = last_log.battery_level if last_log else 50.0
-    
-    # Weather
-    # Pass API key if available
-    api_key = config.weather_api_key
-    weather_response = get_weather(config.city, api_key)
-    weather_data = weather_response['data']
+    """Calculates one realtime data point (persisted later by the sampler's write-behind queue)"""
+    config = get_config()
+
+    # Weather (from the background poller's snapshot)
+    weather_data, _, _ = get_current_weather(config.city)
     
     sunlight_factor = calculate_sunlight_factor(weather_data)
     
     # Forced zero data as requested by user (Simulation Removed)
-    new_log = EnergyLog(
-        timestamp=datetime.now(),
-        solar_generation=0,
-        total_generation=0,
-        consumption=0,
-        battery_level=0,
-        efficiency=0,
-        temperature=weather_data['temperature'],
-        weather_desc=weather_data['weather']
-    )
-    db.session.add(new_log)
-    db.session.commit()
+    new_log = {
+        'timestamp': datetime.now(),
+        'solar_generation': 0,
+        'total_generation': 0,
+        'consumption': 0,
+        'battery_level': 0,
+        'efficiency': 0,
+        'temperature': weather_data['temperature'],
+        'weather_desc': weather_data['weather']
+    }
     
     return new_log, weather_data, sunlight_factor
 
-@app.route('/api/energy', methods=['GET'])
-def get_energy_data():
-    """Main API endpoint - Returns comprehensive energy system status"""
-    log, weather_data, sunlight_factor = calculate_current_state()
-    config = get_config_from_db()
+def take_sample():
+    """Sampler callback - runs on the sampler thread (and for followers' unpersisted samples)."""
+    if energy_sampler.is_running():
+        expire_telemetry_if_due()
+    with app.app_context():
+        return calculate_current_state()
+
+def write_samples(rows):
+    """Write-behind flush: insert a batch of samples with a single commit."""
+    with app.app_context():
+        db.session.execute(insert(EnergyLog), rows)
+        update_rollups(db.session, rows, EnergyRollupHourly, EnergyRollupDaily)
+        db.session.commit()
+
+energy_sampler = EnergySampler(
+    take_sample,
+    write_samples,
+    interval=SAMPLE_INTERVAL_SECONDS,
+    flush_batch=SAMPLE_FLUSH_BATCH,
+    flush_seconds=SAMPLE_FLUSH_SECONDS
+)
+
+def latest_sample_seq():
+    return get_latest_sample().seq
+
+def get_latest_sample():
+    """Latest in-memory sample (processes that do not run the sampler take their own, unpersisted)."""
+    return energy_sampler.current()
+
+# --- Sites ---
+# Every site is sampled on the same cadence as the main installation: one
+# sample holds the readings of all sites and a flush writes them in one insert.
+def site_fields(site):
+    return {field: getattr(site, field) for field in SITE_FIELDS}
+
+def last_site_batteries():
+    """site id -> battery level of its newest SiteLog row (after a restart)."""
+    newest = db.session.query(func.max(SiteLog.id)).group_by(SiteLog.site_id)
+    return dict(db.session.query(SiteLog.site_id, SiteLog.battery_level).filter(SiteLog.id.in_(newest)).all())
+
+def calculate_site_readings():
+    """One reading per site from the cached weather at its coordinates"""
+    sites = Site.query.all()
+    previous = site_sampler.latest()
+    if previous is not None:
+        batteries = {site_id: row['battery_level'] for site_id, row in previous.row['readings'].items()}
+    else:
+        batteries = last_site_batteries()
+    simulate = get_config().simulation_enabled
+    now = time.time()
+    readings = {}
+    for site in sites:
+        weather_data, _ = get_location_weather(site.latitude, site.longitude, site.city)
+        battery = batteries.get(site.id, 50.0)
+        row = site_reading(site_fields(site), weather_data, battery, SAMPLE_INTERVAL_SECONDS / 3600, now, simulate)
+        readings[site.id] = dict(row, site_id=site.id)
+    return {'timestamp': datetime.fromtimestamp(now), 'readings': readings}, {}, 0.0
+
+def take_site_sample():
+    with app.app_context():
+        return calculate_site_readings()
+
+def write_site_samples(samples):
+    """Write-behind flush: every site's readings of a batch of samples in one insert."""
+    rows = [row for sample in samples for row in sample['readings'].values()]
+    if not rows:
+        return
+    with app.app_context():
+        db.session.execute(insert(SiteLog), rows)
+        db.session.commit()
+
+site_sampler = EnergySampler(
+    take_site_sample,
+    write_site_samples,
+    interval=SAMPLE_INTERVAL_SECONDS,
+    flush_batch=SAMPLE_FLUSH_BATCH,
+    flush_seconds=SAMPLE_FLUSH_SECONDS
+)
+
+# --- Conditional GET validators ---
+# Cheap data versions: a matching If-None-Match is answered with 304 before
+# any rows are read or JSON is built (see services/conditional.py).
+def latest_log_version():
+    """(id, timestamp) of the newest EnergyLog row - one primary key lookup."""
+    row = db.session.query(EnergyLog.id, EnergyLog.timestamp).order_by(EnergyLog.id.desc()).first()
+    return (row.id, row.timestamp) if row else (0, None)
+
+HISTORY_RANGE_ARGS = ('start', 'end', 'days', 'points')
+
+def history_version():
+    version, last_modified = latest_log_version()
+    if 'end' not in request.args and any(key in request.args for key in HISTORY_RANGE_ARGS):
+        # A range without ?end= ends now: its echoed start/end move every second
+        version = (version, int(time.time()))
+    return version, last_modified
+
+def report_version():
+    # Rollups change with every flush; default ranges also move with the date
+    log_id, ts = latest_log_version()
+    return (log_id, datetime.now().date().isoformat()), ts
+
+def config_version():
+    return get_config().version, None
+
+def energy_payload():
+    """Comprehensive energy system status for the latest sample"""
+    sample = get_latest_sample()
+    log, weather_data, sunlight_factor = sample.row, sample.weather, sample.sunlight_factor
+    config = get_config()
     
     # Derived metrics
-    co2 = round(log.total_generation * 0.92, 2)
-    savings = round(log.total_generation * 8, 2)
+    co2 = round(log['total_generation'] * 0.92, 2)
+    savings = round(log['total_generation'] * 8, 2)
     
     # Performance score
-    perf = round((log.efficiency + (log.battery_level * 0.3) + (min(log.total_generation, config.solar_capacity) * 5)) / 2, 1)
+    perf = round((log['efficiency'] + (log['battery_level'] * 0.3) + (min(log['total_generation'], config.solar_capacity) * 5)) / 2, 1)
     
     battery_status = 'Optimal'
-    if log.battery_level > 80: battery_status = 'Charging'
-    elif log.battery_level < 20: battery_status = 'Low'
+    if log['battery_level'] > 80: battery_status = 'Charging'
+    elif log['battery_level'] < 20: battery_status = 'Low'
     
-    backup_time = round((log.battery_level / 100) * (config.battery_size / max(0.1, log.consumption)), 1)
+    backup_time = round((log['battery_level'] / 100) * (config.battery_size / max(0.1, log['consumption'])), 1)
     
     data = {
-        'solar_generation': log.solar_generation,
-        'total_generation': log.total_generation,
-        'consumption': log.consumption,
-        'battery': log.battery_level,
+        'solar_generation': log['solar_generation'],
+        'total_generation': log['total_generation'],
+        'consumption': log['consumption'],
+        'battery': log['battery_level'],
         'battery_status': battery_status,
         'backup_time': backup_time,
-        'temperature': log.temperature,
-        'efficiency': log.efficiency,
+        'temperature': log['temperature'],
+        'efficiency': log['efficiency'],
         'co2_saved': co2,
         'savings': savings,
-        'timestamp': log.timestamp.strftime('%H:%M:%S'),
-        'panel_voltage': round(300 + (log.solar_generation * 12), 1),
-        'panel_temperature': round(log.temperature + (4 + (sunlight_factor * 8)), 1),
+        'timestamp': log['timestamp'].strftime('%H:%M:%S'),
+        'panel_voltage': round(300 + (log['solar_generation'] * 12), 1),
+        'panel_temperature': round(log['temperature'] + (4 + (sunlight_factor * 8)), 1),
         'performance_score': perf,
         'weather': weather_data['weather'],
         'weather_description': weather_data['description'],
@@ -207,11 +563,37 @@ def get_energy_data():
         'city': weather_data['city'],
         'weather_icon': get_weather_icon_emoji(weather_data['icon'])
     }
-    return jsonify(data)
+    return data
+
+@app.route('/api/energy', methods=['GET'])
+def get_energy_data():
+    """Main API endpoint - Returns comprehensive energy system status"""
+    return jsonify(energy_payload())
+
+# --- Dashboard snapshot ---
+# Energy status plus the history buffer, built once per new sample (or flush, or
+# config change) and served to every client as the same precompressed bytes.
+def dashboard_version():
+    # The newest row id (not the sampler's write count) so every process sees the leader's flushes
+    return (latest_sample_seq(), latest_log_version()[0], get_config().version)
+
+def build_dashboard():
+    return {
+        'energy': energy_payload(),
+        'history': history_delta_payload(columnar_format=True)
+    }
+
+dashboard_snapshot = SnapshotCache(dashboard_version, build_dashboard, app.json.dumps)
+
+@app.route('/api/dashboard', methods=['GET'])
+def get_dashboard_endpoint():
+    """Everything the overview page shows, in one shared pre-serialized response"""
+    return snapshot_response(dashboard_snapshot.get())
 
 @app.route('/api/config', methods=['GET'])
+@conditional(config_version)
 def get_config_endpoint():
-    config = get_config_from_db()
+    config = get_config()
     return jsonify({
         'success': True,
         'config': {
@@ -222,7 +604,8 @@ def get_config_endpoint():
             'panel_efficiency': config.panel_efficiency,
             'consumption_base': config.consumption_base,
             'weather_api_key': config.weather_api_key or '',
-            'simulation_enabled': config.simulation_enabled
+            'simulation_enabled': config.simulation_enabled,
+            'version': config.version
         }
 
     })
@@ -240,143 +623,497 @@ def update_config_endpoint():
     if 'consumption_base' in data: config.consumption_base = float(data['consumption_base'])
     if 'weather_api_key' in data: config.weather_api_key = data['weather_api_key']
     if 'simulation_enabled' in data: config.simulation_enabled = bool(data['simulation_enabled'])
+    config.version = (config.version or 1) + 1
 
-    
     db.session.commit()
+    config_cache.publish(config.version)
+    if 'city' in data:
+        weather_poller.refresh_now()
     return jsonify({'success': True, 'message': 'Configuration updated successfully'})
 
 @app.route('/api/weather', methods=['GET'])
 def get_weather_endpoint():
-    config = get_config_from_db()
+    config = get_config()
     city = config.city
 
     
-    # Use stored API key
-    weather_response = get_weather(city, config.weather_api_key)
+    weather_data, success, error = get_current_weather(city)
     
-    if weather_response['success']:
-        weather_data = weather_response['data']
+    if success:
         # Recalculate sunlight for this specific weather check
         weather_data['sunlight_factor'] = calculate_sunlight_factor(weather_data)
         weather_data['icon_emoji'] = get_weather_icon_emoji(weather_data['icon'])
         return jsonify({'success': True, 'weather': weather_data})
     else:
-        return jsonify({'success': False, 'error': weather_response.get('error'), 'weather': weather_response['data']}), 500
+        return jsonify({'success': False, 'error': error, 'weather': weather_data}), 500
+
+@app.route('/api/weather/stats', methods=['GET'])
+def get_weather_stats_endpoint():
+    """Weather service cache counters (for monitoring upstream API usage)"""
+    return jsonify({
+        'success': True,
+        'geocode_cache': get_geocode_cache_stats(),
+        'forecast_cache': get_forecast_cache_stats(),
+        'single_flight': get_coalescing_stats(),
+        'poller': {
+            'running': weather_poller.is_running(),
+            'cycles': weather_poller.cycles,
+            'cities': {city: snap.fetched_at for city, snap in weather_poller.snapshots().items()}
+        },
+        'sampler': energy_sampler.stats(),
+        'sites': dict(site_sampler.stats(), locations=weather_poller.locations,
+                      batch_requests=weather_poller.batch_requests),
+        'stream': event_hub.stats(),
+        'dashboard': dashboard_snapshot.stats(),
+        'prediction': {hours: snapshot.stats() for hours, snapshot in prediction_snapshots.items()},
+        'optimization': optimization_snapshot.stats()
+    })
+
+HISTORY_FIELDS = ('timestamp', 'solar_generation', 'total_generation', 'consumption', 'battery', 'temperature', 'efficiency')
+HISTORY_BUFFER_ROWS = 50  # rows a dashboard keeps (and the legacy endpoint returns)
+
+def history_columns():
+    return (EnergyLog.timestamp, EnergyLog.solar_generation, EnergyLog.total_generation, EnergyLog.consumption,
+            EnergyLog.battery_level, EnergyLog.temperature, EnergyLog.efficiency)
+
+def format_history(logs, columnar_format=False):
+    """(timestamp, ...) rows oldest first -> row dicts or (columnar) one array per field"""
+    rows = [(log[0].strftime('%H:%M:%S'),) + tuple(log[1:]) for log in logs]
+    if columnar_format:
+        return columnar(rows, HISTORY_FIELDS)
+    return [dict(zip(HISTORY_FIELDS, row)) for row in rows]
+
+def history_payload(columnar_format=False):
+    """Last 50 entries in chronological order"""
+    logs = db.session.query(*history_columns()).order_by(EnergyLog.timestamp.desc()).limit(HISTORY_BUFFER_ROWS).all()
+    return format_history(logs[::-1], columnar_format)
+
+def history_cursor(value):
+    """?since= as an EnergyLog id; an ISO timestamp maps to the id of the last row at or before it."""
+    if value.isdigit():
+        return int(value)
+    ts = datetime.fromisoformat(value)
+    row = db.session.query(EnergyLog.id).filter(EnergyLog.timestamp <= ts).order_by(EnergyLog.timestamp.desc()).first()
+    return row.id if row else 0
+
+def history_delta_payload(since=None, columnar_format=False):
+    """
+    Rows added after cursor `since` (an EnergyLog id) - a primary key range scan
+    Returns {cursor, reset, history}. reset means the client should replace its
+    buffer instead of appending: no cursor given (a snapshot), more new rows than
+    the buffer holds, or a cursor beyond the newest id (the table was reseeded).
+    """
+    newer = EnergyLog.query.with_entities(EnergyLog.id, *history_columns())
+    if since is not None:
+        newer = newer.filter(EnergyLog.id > since)
+    logs = newer.order_by(EnergyLog.id.desc()).limit(HISTORY_BUFFER_ROWS + 1).all()
+    reset = since is None or len(logs) > HISTORY_BUFFER_ROWS
+    if not logs:
+        latest_id = latest_log_version()[0]
+        if since is not None and latest_id >= since:
+            return {'cursor': since, 'reset': False, 'history': format_history([], columnar_format)}
+        logs = EnergyLog.query.with_entities(EnergyLog.id, *history_columns()) \
+            .order_by(EnergyLog.id.desc()).limit(HISTORY_BUFFER_ROWS).all()
+        reset = True
+    logs = logs[:HISTORY_BUFFER_ROWS][::-1]
+    return {
+        'cursor': logs[-1][0] if logs else 0,
+        'reset': reset,
+        'history': format_history([log[1:] for log in logs], columnar_format)
+    }
 
 @app.route('/api/history', methods=['GET'])
+@conditional(history_version)
 def get_history_endpoint():
-    # Return last 50 entries
-    logs = EnergyLog.query.order_by(EnergyLog.timestamp.desc()).limit(50).all()
-    # Reverse to show chronological order for charts
-    history_data = []
-    for log in reversed(logs):
-        history_data.append({
-            'timestamp': log.timestamp.strftime('%H:%M:%S'),
-            'solar_generation': log.solar_generation,
-            'total_generation': log.total_generation,
-            'consumption': log.consumption,
-            'battery': log.battery_level,
-            'temperature': log.temperature,
-            'efficiency': log.efficiency
-        })
-    return jsonify(history_data)
+    # ?since=<id or ISO ts>: only rows added after the cursor (dashboards poll with this)
+    if 'since' in request.args:
+        try:
+            since = history_cursor(request.args['since'])
+        except ValueError:
+            return jsonify({'success': False, 'error': 'since must be a row id or an ISO timestamp'}), 400
+        return jsonify(dict(history_delta_payload(since, wants_columnar(request.args)), success=True))
+    # ?start=&end=&days=&points= select a range; without them, the last 50 entries
+    if any(key in request.args for key in HISTORY_RANGE_ARGS):
+        return history_range_response(request.args)
+    return jsonify(history_payload(wants_columnar(request.args)))
+
+# Longest ranges the report endpoints will aggregate in one request (keeps latency bounded)
+MONTHLY_MAX_DAYS = int(os.environ.get('MONTHLY_MAX_DAYS', 366))
+YEARLY_MAX_DAYS = int(os.environ.get('YEARLY_MAX_DAYS', 3660))
+
+def parse_date_range(args, default_days, max_days):
+    """
+    Resolve ?days= / ?start= / ?end= query args into a (start, end) datetime pair
+    start/end accept ISO dates or datetimes; end defaults to now, start to end - days.
+    Raises ValueError on malformed input or a range longer than max_days.
+    """
+    end = datetime.fromisoformat(args['end']) if args.get('end') else datetime.now()
+    if args.get('start'):
+        start = datetime.fromisoformat(args['start'])
+    else:
+        days = int(args.get('days', default_days))
+        if days <= 0:
+            raise ValueError('days must be positive')
+        start = end - timedelta(days=days)
+    if start >= end:
+        raise ValueError('start must be before end')
+    if end - start > timedelta(days=max_days):
+        raise ValueError(f'range is limited to {max_days} days')
+    return start, end
+
+# Range queries read from the finest source (raw rows, hourly or daily rollups) that
+# needs at most points * HISTORY_OVERSAMPLE rows, then downsample to `points`, so the
+# work per request is bounded by `points` rather than by the length of the range.
+HISTORY_MAX_DAYS = int(os.environ.get('HISTORY_MAX_DAYS', 3660))
+HISTORY_DEFAULT_POINTS = 500
+HISTORY_MAX_POINTS = 5000
+HISTORY_OVERSAMPLE = 8
+
+def history_source(start, end, budget):
+    """'raw', 'hour' or 'day': the finest resolution with at most ~budget rows in [start, end)."""
+    if (end - start) / timedelta(hours=1) > budget:
+        return 'day'
+    raw_rows = db.session.query(func.sum(EnergyRollupHourly.sample_count)).filter(
+        EnergyRollupHourly.bucket >= start.replace(minute=0, second=0, microsecond=0),
+        EnergyRollupHourly.bucket < end
+    ).scalar() or 0
+    return 'raw' if raw_rows <= budget else 'hour'
+
+def history_range_rows(start, end, source):
+    """Rows of (timestamp, solar, total, consumption, battery, temperature, efficiency), oldest first."""
+    if source == 'raw':
+        return db.session.query(
+            EnergyLog.timestamp, EnergyLog.solar_generation, EnergyLog.total_generation, EnergyLog.consumption,
+            EnergyLog.battery_level, EnergyLog.temperature, EnergyLog.efficiency
+        ).filter(EnergyLog.timestamp >= start, EnergyLog.timestamp < end).order_by(EnergyLog.timestamp).all()
+    model = EnergyRollupHourly if source == 'hour' else EnergyRollupDaily
+    bucket_start = start.replace(minute=0, second=0, microsecond=0) if source == 'hour' else day_start(start)
+    generation = model.generation_sum / model.sample_count
+    # Rollups hold bucket averages; efficiency is only recorded per raw row
+    return db.session.query(
+        model.bucket, generation, generation, model.consumption_sum / model.sample_count,
+        model.last_battery_level, model.temperature_sum / model.sample_count, None
+    ).filter(model.bucket >= bucket_start, model.bucket < end).order_by(model.bucket).all()
+
+def history_range_response(args):
+    """Downsampled history for a date range with full ISO timestamps"""
+    try:
+        start, end = parse_date_range(args, 1, HISTORY_MAX_DAYS)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    method = args.get('method', 'lttb')
+    if method not in DOWNSAMPLE_METHODS:
+        return jsonify({'success': False, 'error': f"method must be one of {', '.join(DOWNSAMPLE_METHODS)}"}), 400
+    points = max(3, min(args.get('points', HISTORY_DEFAULT_POINTS, type=int), HISTORY_MAX_POINTS))
+
+    source = history_source(start, end, points * HISTORY_OVERSAMPLE)
+    rows = history_range_rows(start, end, source)
+    source_rows = len(rows)
+    if source_rows > points:
+        # Pick the points on total generation; every series uses the same rows
+        x = np.fromiter((row[0].timestamp() for row in rows), dtype=np.float64, count=source_rows)
+        y = np.fromiter((row[2] or 0 for row in rows), dtype=np.float64, count=source_rows)
+        rows = [rows[i] for i in downsample_indices(x, y, points, method).tolist()]
+    rows = [
+        (row[0].isoformat(timespec='seconds'),) + tuple(None if v is None else round(v, 3) for v in row[1:])
+        for row in rows
+    ]
+
+    return jsonify({
+        'success': True,
+        'start': start.isoformat(timespec='seconds'),
+        'end': end.isoformat(timespec='seconds'),
+        'resolution': source,
+        'method': method,
+        'source_rows': source_rows,
+        'points': len(rows),
+        'history': columnar(rows, HISTORY_FIELDS) if wants_columnar(args) else [dict(zip(HISTORY_FIELDS, row)) for row in rows]
+    })
+
+MONTHLY_FIELDS = ('day', 'date', 'solar', 'consumption', 'total', 'avg_temperature',
+                  'min_temperature', 'max_temperature', 'peak_generation', 'battery')
+YEARLY_FIELDS = ('month', 'solar', 'consumption', 'total', 'avg_temperature',
+                 'min_temperature', 'max_temperature', 'days')
+
+def day_start(ts):
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
 
 @app.route('/api/monthly', methods=['GET'])
+@conditional(report_version)
 def get_monthly_endpoint():
-    # Aggregate data by day for the last 30 days
-    # Since specific daily aggregation query might be complex in raw SQL/ORM for this quick setup,
-    # we'll fetch all hourly logs and aggregate in python or just take daily snapshots if we had them.
-    # For now, let's take one reading per day from the logs we seeded/have.
-    
-    end_date = datetime.now()
-    start_date = end_date - timedelta(days=30)
-    
-    # Simple approach: Fetch all logs in range and aggregate by day
-    logs = EnergyLog.query.filter(EnergyLog.timestamp >= start_date).all()
-    
-    daily_map = {}
-    for log in logs:
-        day_str = log.timestamp.strftime('%Y-%m-%d')
-        if day_str not in daily_map:
-            daily_map[day_str] = {'solar': 0, 'cons': 0, 'count': 0}
-        
-        daily_map[day_str]['solar'] += log.solar_generation
-        daily_map[day_str]['cons'] += log.consumption
-        daily_map[day_str]['count'] += 1
+    # Per-day report (default: last 30 days) read from the daily rollups,
+    # so the cost depends on the number of days, not on raw row count
+    try:
+        start_date, end_date = parse_date_range(request.args, 30, MONTHLY_MAX_DAYS)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    rollups = EnergyRollupDaily.query.filter(
+        EnergyRollupDaily.bucket >= day_start(start_date),
+        EnergyRollupDaily.bucket < end_date
+    ).order_by(EnergyRollupDaily.bucket).all()
     
-    monthly_data = []
-    # Sort keys
-    for day in sorted(daily_map.keys()):
-        d = daily_map[day]
-        avg_solar = d['solar'] / d['count']
-        avg_cons = d['cons'] / d['count']
-        
-        monthly_data.append({
-            'day': datetime.strptime(day, '%Y-%m-%d').day,
-            'solar': round(avg_solar * 24, 2),
-            'consumption': round(avg_cons * 24, 2),
-            'total': round(avg_solar * 24, 2)
-        })
-        
-    return jsonify(monthly_data)
+    rows = []
+    for r in rollups:
+        avg_gen = r.generation_sum / r.sample_count
+        avg_cons = r.consumption_sum / r.sample_count
+        rows.append((
+            r.bucket.day,
+            r.bucket.strftime('%Y-%m-%d'),
+            round(avg_gen * 24, 2),
+            round(avg_cons * 24, 2),
+            round(avg_gen * 24, 2),
+            round(r.temperature_sum / r.sample_count, 1),
+            r.temperature_min,
+            r.temperature_max,
+            r.generation_max,
+            r.last_battery_level
+        ))
+
+    if wants_columnar(request.args):
+        return jsonify(columnar(rows, MONTHLY_FIELDS))
+    return jsonify([dict(zip(MONTHLY_FIELDS, row)) for row in rows])
+
+@app.route('/api/yearly', methods=['GET'])
+@conditional(report_version)
+def get_yearly_endpoint():
+    # Per-month report (default: last 365 days) aggregated from the daily rollups
+    try:
+        start_date, end_date = parse_date_range(request.args, 365, YEARLY_MAX_DAYS)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    month = func.strftime('%Y-%m', EnergyRollupDaily.bucket)
+    # Daily energy estimate = average kW over the day * 24 h (same as /api/monthly)
+    rows = db.session.query(
+        month,
+        func.sum(EnergyRollupDaily.generation_sum * 24.0 / EnergyRollupDaily.sample_count),
+        func.sum(EnergyRollupDaily.consumption_sum * 24.0 / EnergyRollupDaily.sample_count),
+        func.sum(EnergyRollupDaily.temperature_sum) / func.sum(EnergyRollupDaily.sample_count),
+        func.min(EnergyRollupDaily.temperature_min),
+        func.max(EnergyRollupDaily.temperature_max),
+        func.count()
+    ).filter(
+        EnergyRollupDaily.bucket >= day_start(start_date),
+        EnergyRollupDaily.bucket < end_date
+    ).group_by(month).order_by(month).all()
+
+    rows = [
+        (month_str, round(gen or 0, 2), round(cons or 0, 2), round(gen or 0, 2),
+         round(avg_temp or 0, 1), min_temp, max_temp, days)
+        for month_str, gen, cons, avg_temp, min_temp, max_temp, days in rows
+    ]
+    if wants_columnar(request.args):
+        return jsonify(columnar(rows, YEARLY_FIELDS))
+    return jsonify([dict(zip(YEARLY_FIELDS, row)) for row in rows])
+
+# --- Battery dispatch ---
+# The optimizer plans DISPATCH_HOURS ahead from the solar prediction, the
+# consumption profile and the tariff; the plan (with the advice derived from it)
+# is rebuilt only when the forecast, config, time step or state of charge changes.
+def dispatch_soc():
+    return get_latest_sample().row['battery_level']
+
+def optimization_version():
+    config = get_config()
+    forecast = get_hourly_forecast(config.city, fetch=False)
+    return (forecast.fetched_at if forecast else None, config.version,
+            int(time.time()) // (DISPATCH_STEP_MINUTES * 60), round(dispatch_soc()))
+
+def build_optimization():
+    config = get_config()
+    hourly, _ = prediction_result(DISPATCH_HOURS + 1)
+    plan = plan_dispatch(hourly, config.consumption_base, config.battery_size, dispatch_soc(), time.time())
+    return dict(dispatch_advice(plan), summary=plan_summary(plan), schedule=plan_schedule(plan))
+
+optimization_snapshot = SnapshotCache(optimization_version, build_optimization, app.json.dumps)
+
+def optimization_payload():
+    return optimization_snapshot.get().payload
 
 @app.route('/api/optimization', methods=['GET'])
 def get_optimization_endpoint():
-    hour = datetime.now().hour
-    
-    # Logic similar to before
-    if 10 <= hour <= 14:
-        tip, priority = "Peak solar hours! Run heavy loads now.", "high"
-    elif 6 <= hour <= 10:
-        tip, priority = "Morning sun. Charge battery.", "medium"
-    elif 15 <= hour <= 18:
-        tip, priority = "Solar declining. Prepare for evening.", "medium"
+    """Battery schedule minimizing grid import cost, with the advice derived from it"""
+    return snapshot_response(optimization_snapshot.get())
+
+# --- Solar prediction ---
+# Computed in one NumPy pass from the cached hourly forecast and re-serialized
+# only when the forecast is refreshed, the config changes or the hour rolls over.
+def prediction_version(hours):
+    config = get_config()
+    forecast = get_hourly_forecast(config.city, fetch=False)
+    return (forecast.fetched_at if forecast else None, config.version, int(time.time()) // 3600, hours)
+
+def prediction_result(hours):
+    """(predict() arrays for the next `hours`, whether they come from the weather forecast)"""
+    config = get_config()
+    forecast = get_hourly_forecast(config.city, fetch=False)
+    now = time.time()
+    if forecast is not None:
+        result = predict(forecast, config.solar_capacity, config.panel_efficiency, now, hours)
+        if len(result['time']):
+            return result, True
+    # No forecast (or it has run out): clear-sky estimate at the site
+    latitude, longitude = known_coordinates(config.city)
+    return fallback_prediction(config.solar_capacity, config.panel_efficiency, now, latitude, longitude, hours), False
+
+def build_prediction(hours):
+    result, from_forecast = prediction_result(hours)
+    # Fallback rows have no weather columns
+    return prediction_rows(result, include_weather=from_forecast)
+
+prediction_snapshots = {}  # hours -> SnapshotCache
+
+def prediction_snapshot(hours):
+    snapshot = prediction_snapshots.get(hours)
+    if snapshot is None:
+        snapshot = prediction_snapshots.setdefault(hours, SnapshotCache(
+            lambda: prediction_version(hours), lambda: build_prediction(hours), app.json.dumps))
+    return snapshot
+
+@app.route('/api/prediction', methods=['GET'])
+def get_prediction_endpoint():
+    """Hourly solar output forecast (?hours=24..168, default 24)"""
+    hours = max(MIN_HOURS, min(request.args.get('hours', MIN_HOURS, type=int), MAX_HOURS))
+    return snapshot_response(prediction_snapshot(hours).get())
+
+# --- Site endpoints ---
+SITE_HISTORY_MAX_ROWS = 1000
+SITE_ROW_FIELDS = ('timestamp', 'solar_generation', 'consumption', 'battery_level', 'temperature', 'weather_desc')
+
+def site_payload(site):
+    """Site config plus its latest reading (None until it has been sampled)."""
+    sample = site_sampler.latest()
+    if sample is not None:
+        reading = sample.row['readings'].get(site.id)
     else:
-        tip, priority = "Night time. Keep non-essential loads minimal.", "low"
-        
-    log = EnergyLog.query.order_by(EnergyLog.timestamp.desc()).first()
-    bat = log.battery_level if log else 50
-    
-    bat_tip = "Battery optimal."
-    if bat > 90: bat_tip = "Battery full. Store available solar for evening use."
-    elif bat < 30: bat_tip = "Battery low. Conserve energy."
-
-    timeline = [
-        {'time': '06-10', 'period': 'Morning', 'solar': 'Rising', 'recommendation': 'Charge Battery', 'icon': '🌅'},
-        {'time': '10-14', 'period': 'Peak', 'solar': 'Max', 'recommendation': 'Heavy Loads', 'icon': '☀️'},
-        {'time': '14-18', 'period': 'Afternoon', 'solar': 'Declining', 'recommendation': 'Moderate Usage', 'icon': '🌤️'},
-        {'time': '18-22', 'period': 'Evening', 'solar': 'None', 'recommendation': 'Battery Power', 'icon': '🌙'},
-        {'time': '22-06', 'period': 'Night', 'solar': 'None', 'recommendation': 'Sleep Mode', 'icon': '🌃'},
-    ]
-    
+        # Sampled by another process: its newest stored row
+        reading = SiteLog.query.filter_by(site_id=site.id).order_by(SiteLog.id.desc()).first()
+        reading = {field: getattr(reading, field) for field in SITE_ROW_FIELDS} if reading else None
+    return dict(site_fields(site), id=site.id, reading=format_site_reading(reading) if reading else None)
+
+
+def format_site_reading(row):
+    return dict(zip(SITE_LOG_FIELDS, (row['timestamp'].isoformat(timespec='seconds'),) +
+                    tuple(row[field] for field in SITE_ROW_FIELDS[1:])))
+
+def resolve_site_location(fields):
+    """Fill in latitude/longitude by geocoding the city when they were not given. Raises ValueError."""
+    if 'latitude' in fields:
+        return fields
+    lat, lon, _, _ = get_lat_lon(fields['city'])
+    if not lat:
+        raise ValueError(f"City '{fields['city']}' not found")
+    return dict(fields, latitude=lat, longitude=lon)
+
+def follow_site_forecast(site):
+    """Where another process runs the poller, refresh the site's cached forecast on read (only if stale)."""
+    if not weather_poller.is_running():
+        refresh_locations([(site.latitude, site.longitude)])
+
+def site_not_found():
+    return jsonify({'success': False, 'error': 'Site not found'}), 404
+
+@app.route('/api/sites', methods=['GET'])
+def list_sites_endpoint():
+    return jsonify({'success': True, 'sites': [site_payload(site) for site in Site.query.order_by(Site.id).all()]})
+
+@app.route('/api/sites', methods=['POST'])
+def create_site_endpoint():
+    try:
+        fields = resolve_site_location(parse_site(request.get_json(silent=True)))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    site = Site(**fields)
+    db.session.add(site)
+    db.session.commit()
+    return jsonify({'success': True, 'site': site_payload(site)}), 201
+
+@app.route('/api/sites/<int:site_id>', methods=['GET'])
+def get_site_endpoint(site_id):
+    site = db.session.get(Site, site_id)
+    if site is None:
+        return site_not_found()
+    return jsonify({'success': True, 'site': site_payload(site)})
+
+@app.route('/api/sites/<int:site_id>', methods=['PUT'])
+def update_site_endpoint(site_id):
+    site = db.session.get(Site, site_id)
+    if site is None:
+        return site_not_found()
+    try:
+        fields = parse_site(request.get_json(silent=True), partial=True)
+        if 'city' in fields and fields['city'] != site.city:
+            fields = resolve_site_location(fields)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    for name, value in fields.items():
+        setattr(site, name, value)
+    db.session.commit()
+    return jsonify({'success': True, 'site': site_payload(site)})
+
+@app.route('/api/sites/<int:site_id>', methods=['DELETE'])
+def delete_site_endpoint(site_id):
+    site = db.session.get(Site, site_id)
+    if site is None:
+        return site_not_found()
+    SiteLog.query.filter_by(site_id=site_id).delete()
+    db.session.delete(site)
+    db.session.commit()
+    return jsonify({'success': True})
+
+@app.route('/api/sites/<int:site_id>/history', methods=['GET'])
+def site_history_endpoint(site_id):
+    """A site's readings, newest ?limit= rows (or those after the ?since= row id), oldest first"""
+    if db.session.get(Site, site_id) is None:
+        return site_not_found()
+    limit = max(1, min(request.args.get('limit', HISTORY_BUFFER_ROWS, type=int), SITE_HISTORY_MAX_ROWS))
+    since = request.args.get('since', type=int)
+    query = db.session.query(SiteLog.id, SiteLog.timestamp, SiteLog.solar_generation, SiteLog.consumption,
+                             SiteLog.battery_level, SiteLog.temperature, SiteLog.weather_desc) \
+        .filter(SiteLog.site_id == site_id)
+    if since is not None:
+        query = query.filter(SiteLog.id > since)
+    logs = query.order_by(SiteLog.id.desc()).limit(limit).all()[::-1]
+    rows = [(log[1].isoformat(timespec='seconds'),) + tuple(log[2:]) for log in logs]
     return jsonify({
-        'current_tip': tip,
-        'priority': priority,
-        'battery_tip': bat_tip,
-        'timeline': timeline,
-        'tips': random.sample(optimization_tips, 3)
+        'success': True,
+        'site_id': site_id,
+        'cursor': logs[-1][0] if logs else (since or 0),
+        'history': columnar(rows, SITE_LOG_FIELDS) if wants_columnar(request.args) else [dict(zip(SITE_LOG_FIELDS, row)) for row in rows]
     })
 
-@app.route('/api/prediction', methods=['GET'])
-def get_prediction_endpoint():
-    # Simple prediction based on time
-    predictions = []
-    current_time = datetime.now()
-    for i in range(24):
-        future_time = current_time + timedelta(hours=i)
-        h = future_time.hour
-        if 6 <= h <= 18:
-            norm = (h - 6) / 12
-            base = 10 * math.sin(norm * math.pi)
-            pred = round(base * random.uniform(0.8, 1.0), 2)
-        else:
-            pred = 0
-        
-        predictions.append({
-            'hour': future_time.strftime('%H:00'),
-            'predicted_solar': pred
-        })
-    return jsonify(predictions)
+@app.route('/api/sites/<int:site_id>/weather', methods=['GET'])
+def site_weather_endpoint(site_id):
+    """A site's weather from the batched forecast cache"""
+    site = db.session.get(Site, site_id)
+    if site is None:
+        return site_not_found()
+    follow_site_forecast(site)
+    weather_data, success = get_location_weather(site.latitude, site.longitude, site.city)
+    weather_data['sunlight_factor'] = calculate_sunlight_factor(weather_data)
+    weather_data['icon_emoji'] = get_weather_icon_emoji(weather_data['icon'])
+    if not success:
+        weather_poller.refresh_now()
+        return jsonify({'success': False, 'error': 'Weather not available yet', 'weather': weather_data}), 500
+    return jsonify({'success': True, 'weather': weather_data})
+
+@app.route('/api/sites/<int:site_id>/prediction', methods=['GET'])
+def site_prediction_endpoint(site_id):
+    """Hourly solar output forecast for a site (?hours=24..168, default 24)"""
+    site = db.session.get(Site, site_id)
+    if site is None:
+        return site_not_found()
+    hours = max(MIN_HOURS, min(request.args.get('hours', MIN_HOURS, type=int), MAX_HOURS))
+    follow_site_forecast(site)
+    forecast = get_location_forecast(site.latitude, site.longitude)
+    now = time.time()
+    if forecast is not None:
+        result = predict(forecast, site.solar_capacity, site.panel_efficiency, now, hours)
+        if len(result['time']):
+            return jsonify(prediction_rows(result))
+    result = fallback_prediction(site.solar_capacity, site.panel_efficiency, now, site.latitude, site.longitude, hours)
+    return jsonify(prediction_rows(result, include_weather=False))
 
 @app.route('/api/calculate-solar', methods=['POST'])
 def calculate_solar_endpoint():
@@ -407,51 +1144,180 @@ def login_endpoint():
         return jsonify({'success': True, 'token': 'demo-token'})
     return jsonify({'success': False}), 401
 
-# IoT Data memory storage
-iot_data = {
-    'voltage': 0,
-    'timestamp': 0,
-    'history': []
-}
+# IoT live history: one fixed-size ring buffer per device
+IOT_HISTORY_CAPACITY = int(os.environ.get('IOT_HISTORY_CAPACITY', 300))
+iot_buffers = RingBufferRegistry(capacity=IOT_HISTORY_CAPACITY)
+
+# Persistent telemetry: append-only mmap segments per device, shared by all workers
+telemetry_store = TelemetryStore(
+    os.environ.get('TELEMETRY_DIR') or os.path.join(app.instance_path, 'telemetry'),
+    segment_records=int(os.environ.get('TELEMETRY_SEGMENT_RECORDS', 65536)),
+    retention_days=float(os.environ.get('TELEMETRY_RETENTION_DAYS', 30))
+)
+IOT_RANGE_MAX_POINTS = 5000
+# Appends only expire segments when they rotate, so a low-rate device would keep
+# old data forever; the elected sampler also sweeps every device at this interval
+TELEMETRY_RETENTION_CHECK_SECONDS = int(os.environ.get('TELEMETRY_RETENTION_CHECK_SECONDS', 3600))
+_telemetry_expiry = {'next_at': 0.0}
+
+def expire_telemetry_if_due():
+    now = time.time()
+    if now < _telemetry_expiry['next_at']:
+        return
+    _telemetry_expiry['next_at'] = now + TELEMETRY_RETENTION_CHECK_SECONDS
+    try:
+        telemetry_store.enforce_retention(int(now * 1000))
+    except OSError as e:
+        print(f"Telemetry retention Error: {e}")
+
+@app.cli.command('expire-telemetry')
+def expire_telemetry_command():
+    """Delete telemetry segments older than TELEMETRY_RETENTION_DAYS."""
+    telemetry_store.enforce_retention(int(time.time() * 1000))
+    print(f"Telemetry retention enforced for {len(telemetry_store.devices())} device(s)")
+
+def record_telemetry(batch):
+    """Ingest a validated batch in one pass into the device's ring buffer."""
+    now_ms = int(time.time() * 1000)
+    # Device timestamps are ms since boot, so place each sample relative to the receive time
+    received_ms = now_ms - (batch.timestamps[-1] - batch.timestamps)
+    iot_buffers.extend(batch.device, received_ms, batch.voltages)
+    telemetry_store.append(batch.device, received_ms, batch.voltages)
+
+def parse_time_ms(value):
+    """Epoch milliseconds or an ISO date/datetime -> epoch milliseconds."""
+    if value.lstrip('-').isdigit():
+        return int(value)
+    return int(datetime.fromisoformat(value).timestamp() * 1000)
+
+def iot_range_response(device, args):
+    """Stored samples for ?start=&end= (columnar; evenly thinned to at most ?points=)."""
+    try:
+        end_ms = parse_time_ms(args['end']) if args.get('end') else int(time.time() * 1000)
+        start_ms = parse_time_ms(args['start']) if args.get('start') else end_ms - 3600 * 1000
+    except ValueError:
+        return jsonify({'success': False, 'error': 'start/end must be epoch ms or ISO dates'}), 400
+    points = max(1, min(args.get('points', IOT_RANGE_MAX_POINTS, type=int), IOT_RANGE_MAX_POINTS))
+    timestamps, voltages = telemetry_store.read_range_arrays(device, start_ms, end_ms)
+    step = max(1, -(-len(voltages) // points))
+    return jsonify({
+        'success': True,
+        'device': device,
+        'start': start_ms,
+        'end': end_ms,
+        'count': int(len(voltages)),
+        'timestamps': timestamps[::step].tolist(),
+        'voltages': voltages[::step].tolist()
+    })
+
+def iot_version(device):
+    """Changes with every ingest here and with readings other workers appended to the store."""
+    last_ms = telemetry_store.last_timestamp(device) if device else None
+    return (iot_buffers.seq, device, last_ms), (last_ms / 1000 if last_ms else None)
+
+def solar_version():
+    device = request.args.get('device') or iot_buffers.last_device
+    if device and not valid_device(device):
+        return None, None  # the handler rejects it
+    return iot_version(device)
+
+def iot_payload(device, points=50):
+    """Latest voltage and the newest `points` samples of one device"""
+    buffer = iot_buffers.get(device) if device else None
+    if buffer is not None and len(buffer):
+        segments = buffer.segments(points)
+    elif device:
+        # Posted to another worker (or before a restart): read the persistent store
+        segments = [telemetry_store.tail(device, points)]
+    else:
+        segments = []
+    if not segments or len(segments[-1][1]) == 0:
+        return {'voltage': 0, 'status': 'Idle', 'history': [], 'device': device}
+    voltage = float(segments[-1][1][-1])
+    history = []
+    for timestamps, voltages in segments:
+        history.extend(
+            {'voltage': v, 'time': datetime.fromtimestamp(ts / 1000).strftime('%H:%M:%S')}
+            for ts, v in zip(timestamps.tolist(), voltages.tolist())
+        )
+    return {
+        'voltage': voltage,
+        'status': 'Charging' if voltage > 2.0 else 'Idle',
+        'history': history,
+        'device': device
+    }
 
 @app.route('/api/solar', methods=['GET', 'POST'])
+@conditional(solar_version)
 def iot_solar_endpoint():
     """IoT Solar endpoint for ESP32 data collection and dashboard retrieval"""
     if request.method == 'POST':
+        # Accepts one reading, a JSON batch or a packed binary frame (see iot_ingest.py)
         try:
-            data = request.get_json()
-            voltage = float(data.get('voltage', 0))
-            timestamp = data.get('timestamp', 0)
-            
-            # Update latest data
-            iot_data['voltage'] = voltage
-            iot_data['timestamp'] = timestamp
-            
-            # Add to history
-            history_point = {
-                'voltage': voltage,
-                'time': datetime.now().strftime('%H:%M:%S')
-            }
-            iot_data['history'].append(history_point)
-            if len(iot_data['history']) > 50:
-                iot_data['history'] = iot_data['history'][-50:]
-                
-            return jsonify({'success': True})
-        except Exception as e:
+            batch = parse_request(request)
+        except ValueError as e:
             return jsonify({'success': False, 'error': str(e)}), 400
+        record_telemetry(batch)
+        return jsonify({'success': True, 'device': batch.device, 'accepted': len(batch)})
             
     else: # GET request
-        return jsonify({
-            'voltage': iot_data['voltage'],
-            'status': 'Charging' if iot_data['voltage'] > 2.0 else 'Idle',
-            'history': iot_data['history']
-        })
+        device = request.args.get('device') or iot_buffers.last_device
+        if device and not valid_device(device):
+            return jsonify({'success': False, 'error': 'invalid device id'}), 400
+        if device and (request.args.get('start') or request.args.get('end')):
+            return iot_range_response(device, request.args)
+        points = max(1, min(request.args.get('points', 50, type=int), iot_buffers.capacity))
+        return jsonify(iot_payload(device, points))
+
+# --- Live stream (Server-Sent Events) ---
+# One producer per process publishes a topic only when its version changes;
+# every connected dashboard gets the same pre-serialized message.
+STREAM_CHECK_SECONDS = float(os.environ.get('STREAM_CHECK_SECONDS', 1))
+STREAM_HEARTBEAT_SECONDS = float(os.environ.get('STREAM_HEARTBEAT_SECONDS', 15))
+
+_history_stream = {'cursor': None}  # cursor of the last published history message
+
+def history_stream_payload():
+    """
+    Rows added since the previous history message (the first one is a reset snapshot)
+    `since` is the cursor the rows follow: a client whose cursor differs (it just
+    connected, or missed a message) catches up with GET /api/history?since=<cursor>.
+    """
+    since = _history_stream['cursor']
+    payload = history_delta_payload(since, columnar_format=True)
+    _history_stream['cursor'] = payload['cursor']
+    return dict(payload, since=since)
+
+event_hub = EventHub(
+    interval=STREAM_CHECK_SECONDS,
+    heartbeat=STREAM_HEARTBEAT_SECONDS,
+    context=app.app_context,
+    dumps=app.json.dumps
+)
+event_hub.register('energy', latest_sample_seq, energy_payload)
+event_hub.register('history', lambda: latest_log_version()[0], history_stream_payload)
+event_hub.register('iot', lambda: iot_version(iot_buffers.last_device)[0], lambda: iot_payload(iot_buffers.last_device))
+event_hub.register('optimization', optimization_version, optimization_payload)
+
+@app.route('/api/stream', methods=['GET'])
+def stream_endpoint():
+    """SSE stream: ?topics=energy,history,iot,optimization (default: all)"""
+    requested = [t.strip() for t in request.args.get('topics', '').split(',') if t.strip()]
+    unknown = [t for t in requested if t not in event_hub.topics()]
+    if unknown:
+        return jsonify({'success': False, 'error': f"unknown topics: {', '.join(unknown)}"}), 400
+    event_hub.start()
+    return Response(
+        stream_with_context(event_hub.subscribe(requested or event_hub.topics())),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
 
 # --- Init ---
 
 if __name__ == '__main__':
     with app.app_context():
-        db.create_all()
+        init_db()
         seed_history_data()
         
     print("Server running with SQLite persistence on http://127.0.0.1:5000")
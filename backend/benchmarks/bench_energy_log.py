@@ -0,0 +1,110 @@
+"""
+Benchmark - energy_log query latency with and without the timestamp indexes
+
+Builds a throwaway SQLite database with the same schema and pragmas as
+backend/app.py, fills it with one row per minute, and times the queries the
+API runs against energy_log.
+
+Usage:
+    python benchmarks/bench_energy_log.py              # 1,000,000 rows
+    python benchmarks/bench_energy_log.py --rows 3000000
+"""
+
+import argparse
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'services'))
+from database import apply_pragmas
+
+SCHEMA = """
+CREATE TABLE energy_log (
+    id INTEGER PRIMARY KEY,
+    timestamp DATETIME NOT NULL,
+    solar_generation FLOAT, total_generation FLOAT, consumption FLOAT,
+    battery_level FLOAT, efficiency FLOAT, temperature FLOAT,
+    weather_desc VARCHAR(64)
+)
+"""
+INDEXES = (
+    "CREATE INDEX ix_energy_log_timestamp ON energy_log (timestamp)",
+    "CREATE INDEX ix_energy_log_ts_solar_cons ON energy_log (timestamp, solar_generation, consumption)",
+)
+
+# (name, sql, params) - mirrors the API's hot queries
+QUERIES = [
+    ('latest row (/api/energy, /api/optimization)',
+     'SELECT * FROM energy_log ORDER BY timestamp DESC LIMIT 1', ()),
+    ('last 50 rows (/api/history)',
+     'SELECT * FROM energy_log ORDER BY timestamp DESC LIMIT 50', ()),
+    ('last 30 days (/api/monthly)',
+     'SELECT count(*), sum(solar_generation) FROM energy_log WHERE timestamp >= ?', None),
+    ('daily GROUP BY, 30 days (/api/monthly)',
+     'SELECT date(timestamp), sum(solar_generation), sum(consumption), count(*) '
+     'FROM energy_log WHERE timestamp >= ? GROUP BY date(timestamp)', None),
+]
+
+
+def fill(conn, rows):
+    start = datetime.now() - timedelta(minutes=rows)
+    batch = 50000
+    for offset in range(0, rows, batch):
+        n = min(batch, rows - offset)
+        conn.executemany(
+            'INSERT INTO energy_log (timestamp, solar_generation, total_generation, consumption, '
+            'battery_level, efficiency, temperature, weather_desc) VALUES (?, 1, 1, 1, 50, 85, 30, "Clear")',
+            ((str(start + timedelta(minutes=offset + i)),) for i in range(n))
+        )
+    conn.commit()
+
+
+def time_query(conn, sql, params, repeat):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        conn.execute(sql, params).fetchall()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    month_ago = str(datetime.now() - timedelta(days=30))
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, 'bench.db'))
+        apply_pragmas(conn)
+        conn.execute(SCHEMA)
+
+        t0 = time.perf_counter()
+        fill(conn, args.rows)
+        print(f"Inserted {args.rows:,} rows in {time.perf_counter() - t0:.1f}s\n")
+
+        results = {}
+        for label in ('no index', 'indexed'):
+            if label == 'indexed':
+                t0 = time.perf_counter()
+                for index in INDEXES:
+                    conn.execute(index)
+                conn.execute('ANALYZE')
+                print(f"Built indexes in {time.perf_counter() - t0:.1f}s\n")
+            for name, sql, params in QUERIES:
+                results.setdefault(name, {})[label] = time_query(conn, sql, (month_ago,) if params is None else params, args.repeat)
+        conn.close()
+
+    print(f"{'query':<48}{'no index':>12}{'indexed':>12}{'speedup':>10}")
+    for name, timings in results.items():
+        before, after = timings['no index'], timings['indexed']
+        print(f"{name:<48}{before:>10.2f}ms{after:>10.2f}ms{before / max(after, 1e-6):>9.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,326 @@
+"""
+Battery Dispatch - Charge/discharge schedule that minimizes the cost of grid imports
+Dynamic programming over a discretized state of charge (SoC). Working backwards
+from the end of the horizon, every step computes the cheapest cost-to-go of
+every SoC level in one vectorized NumPy operation; the schedule is then read
+forwards from the current SoC. SoC levels are evenly spaced, so the energy
+moved (and the cost of a step) depends only on how many levels the battery
+moves, which keeps each step a (levels x power-limited moves) array.
+
+Per step (kWh): solar + discharge * efficiency + import = load + charge / efficiency + export
+The battery discharges only into the local load, and charges only from surplus
+solar unless allow_grid_charging is set.
+"""
+
+import os
+from dataclasses import dataclass
+from datetime import datetime
+
+import numpy as np
+
+from fleet_simulation import consumption_profile
+
+TARIFF_RATE = float(os.environ.get('TARIFF_RATE', 8))              # per kWh imported
+TARIFF_PEAK_RATE = float(os.environ.get('TARIFF_PEAK_RATE', 12))   # per kWh imported during peak hours
+TARIFF_PEAK_HOURS = os.environ.get('TARIFF_PEAK_HOURS', '18-22')   # local hours [start, end)
+BATTERY_C_RATE = float(os.environ.get('BATTERY_C_RATE', 0.5))      # max charge/discharge power as a fraction of capacity per hour
+BATTERY_EFFICIENCY = float(os.environ.get('BATTERY_EFFICIENCY', 0.95))  # one-way (charge or discharge)
+BATTERY_MIN_SOC = float(os.environ.get('BATTERY_MIN_SOC', 10))     # % kept in reserve
+SOC_LEVELS = int(os.environ.get('DISPATCH_SOC_LEVELS', 101))       # 101 levels = 1 % steps
+DISPATCH_STEP_MINUTES = int(os.environ.get('DISPATCH_STEP_MINUTES', 15))
+DISPATCH_HOURS = int(os.environ.get('DISPATCH_HOURS', 48))
+
+_EPS = 1e-9
+_TIE_BREAK = 1e-7
+
+
+@dataclass(frozen=True)
+class DispatchPlan:
+    """Optimized schedule; every array has one entry per step (powers in kW, positive battery = charging)."""
+    time: np.ndarray         # epoch seconds, start of each step
+    step_hours: float
+    solar: np.ndarray
+    load: np.ndarray
+    tariff: np.ndarray
+    battery: np.ndarray
+    grid_import: np.ndarray
+    grid_export: np.ndarray
+    soc: np.ndarray          # % at the end of each step
+    start_soc: float
+    cost: float
+    baseline_import: float   # kWh imported with no battery
+    baseline_cost: float
+
+
+def peak_hours(spec=TARIFF_PEAK_HOURS):
+    start, end = (int(part) for part in spec.split('-'))
+    return start, end
+
+
+def local_hours(times):
+    """Fractional local clock hour of each epoch timestamp."""
+    times = np.asarray(times, dtype=np.int64)
+    utc_offset = datetime.fromtimestamp(int(times[0])).astimezone().utcoffset().total_seconds() if len(times) else 0
+    return ((times + utc_offset) % 86400) / 3600.0
+
+
+def tou_tariff(hours, rate=TARIFF_RATE, peak_rate=TARIFF_PEAK_RATE, peak=None):
+    """Time-of-use price per kWh for each local clock hour."""
+    start, end = peak or peak_hours()
+    hours = np.asarray(hours)
+    in_peak = (hours >= start) & (hours < end) if start <= end else (hours >= start) | (hours < end)
+    return np.where(in_peak, peak_rate, rate)
+
+
+def plan_dispatch(hourly, consumption_base, battery_size, soc, start_ts,
+                  hours=DISPATCH_HOURS, step_minutes=DISPATCH_STEP_MINUTES, **options):
+    """
+    Optimized plan for the next `hours` from an hourly prediction (predict() /
+    fallback_prediction() arrays) and the household consumption profile
+    """
+    step = step_minutes * 60
+    times = int(start_ts) // step * step + step * np.arange(int(hours * 3600 // step), dtype=np.int64)
+    # Hourly power is the mean over [time, time + 1h): hold it for every step in the hour
+    index = np.clip(np.searchsorted(hourly['time'], times, side='right') - 1, 0, len(hourly['time']) - 1)
+    solar = np.where(times < hourly['time'][-1] + 3600, hourly['power'][index], 0.0)
+    hour = local_hours(times)
+    return optimize_dispatch(times, solar, consumption_profile(hour, consumption_base), tou_tariff(hour),
+                             battery_size, soc, step / 3600.0, **options)
+
+
+def optimize_dispatch(times, solar, load, tariff, battery_size, soc, step_hours,
+                      c_rate=BATTERY_C_RATE, efficiency=BATTERY_EFFICIENCY, min_soc=BATTERY_MIN_SOC,
+                      levels=SOC_LEVELS, export_rate=0.0, allow_grid_charging=False):
+    """
+    Schedule minimizing sum(tariff * import - export_rate * export) over the horizon
+    solar, load (kW) and tariff are per-step arrays; soc is the current state of charge in %.
+    Energy left at the end is credited at the cheapest tariff, so the plan does not
+    empty the battery just because the horizon ends.
+    """
+    solar = np.asarray(solar, dtype=np.float64)
+    load = np.asarray(load, dtype=np.float64)
+    tariff = np.asarray(tariff, dtype=np.float64)
+    n = len(solar)
+    unit = battery_size / (levels - 1)  # kWh per SoC level
+    start = int(round(min(max(soc, 0.0), 100.0) / 100.0 * (levels - 1)))
+    reserve = int(np.ceil(min_soc / 100.0 * (levels - 1) - _EPS))
+
+    # Battery moves allowed by the power limit, as level offsets
+    reach = int(np.floor(c_rate * battery_size * step_hours / unit + _EPS)) if battery_size > 0 else 0
+    moves = np.arange(-reach, reach + 1)
+    stored = moves * unit                                                  # kWh into (+) / out of (-) the battery
+    drawn = np.where(stored > 0, stored / efficiency, stored * efficiency)  # kWh taken from (+) / given to (-) the bus
+
+    # Per-step cost of each move: (n, moves)
+    net = ((solar - load) * step_hours)[:, None] - drawn[None, :]
+    imports = np.maximum(-net, 0.0)
+    exports = np.maximum(net, 0.0)
+    # A tiny credit for moving energy, larger the earlier it happens, breaks ties
+    # between equally cheap schedules towards acting on the nearest (most certain) hours
+    step_cost = (tariff[:, None] * imports - export_rate * exports
+                 - _TIE_BREAK * np.arange(n, 0, -1)[:, None] * np.abs(stored)[None, :])
+    # The battery only covers local load, never exports
+    deficit = np.maximum((load - solar) * step_hours, 0.0)
+    step_cost[(-drawn[None, :] > deficit[:, None] + _EPS)] = np.inf
+    if not allow_grid_charging:
+        surplus = np.maximum((solar - load) * step_hours, 0.0)
+        step_cost[(drawn[None, :] > surplus[:, None] + _EPS)] = np.inf
+
+    # Destination level for every (level, move); moving below the reserve is only
+    # allowed while charging back up from it
+    level = np.arange(levels)
+    target = level[:, None] + moves[None, :]
+    valid = (target >= 0) & (target < levels) & ((target >= reserve) | (moves[None, :] >= 0))
+    target = np.clip(target, 0, levels - 1)
+
+    value = -level * unit * efficiency * (tariff.min() if n else 0.0)  # terminal credit
+    policy = np.empty((n, levels), dtype=np.int16)
+    for t in range(n - 1, -1, -1):
+        total = np.where(valid, step_cost[t][None, :] + value[target], np.inf)
+        best = np.argmin(total, axis=1)
+        policy[t] = best
+        value = total[level, best]
+
+    # Read the schedule forwards from the current level
+    chosen = np.empty(n, dtype=np.int64)
+    current = start
+    for t in range(n):
+        chosen[t] = policy[t, current]
+        current = current + moves[chosen[t]]
+
+    path = start + np.cumsum(moves[chosen])
+    grid_import = imports[np.arange(n), chosen]
+    grid_export = exports[np.arange(n), chosen]
+    baseline_import = np.maximum((load - solar) * step_hours, 0.0)
+    return DispatchPlan(
+        time=np.asarray(times, dtype=np.int64),
+        step_hours=step_hours,
+        solar=solar,
+        load=load,
+        tariff=tariff,
+        battery=stored[chosen] / step_hours,
+        grid_import=grid_import / step_hours,
+        grid_export=grid_export / step_hours,
+        soc=path * 100.0 / (levels - 1),
+        start_soc=start * 100.0 / (levels - 1),
+        cost=float(np.sum(tariff * grid_import)),
+        baseline_import=float(baseline_import.sum()),
+        baseline_cost=float(np.sum(tariff * baseline_import))
+    )
+
+
+# --- Advice derived from a plan ---
+
+ACTIONS = {
+    'charge': {'period': 'Charge Battery', 'icon': '🔋', 'recommendation': 'Store surplus solar in the battery'},
+    'export': {'period': 'Solar Surplus', 'icon': '☀️', 'recommendation': 'Spare solar - run heavy loads now'},
+    'discharge': {'period': 'Battery Power', 'icon': '🌙', 'recommendation': 'Battery covers the load'},
+    'import': {'period': 'Grid Power', 'icon': '🔌', 'recommendation': 'Keep non-essential loads minimal'},
+    'solar': {'period': 'Solar Power', 'icon': '🌤️', 'recommendation': 'Solar covers the load'},
+}
+_THRESHOLD_KW = 0.05
+
+
+def classify(battery, grid_import, grid_export):
+    """Dominant action for each entry of the power arrays: charge, discharge, export, import or solar."""
+    return np.select(
+        [battery > _THRESHOLD_KW, battery < -_THRESHOLD_KW,
+         grid_export > _THRESHOLD_KW, grid_import > _THRESHOLD_KW],
+        ['charge', 'discharge', 'export', 'import'], 'solar'
+    )
+
+
+def _hourly_mean(values, steps_per_hour):
+    """Mean of every block of steps_per_hour values (a trailing partial block is dropped)."""
+    hours = len(values) // steps_per_hour
+    return values[:hours * steps_per_hour].reshape(hours, steps_per_hour).mean(axis=1)
+
+
+def _clock(ts):
+    return datetime.fromtimestamp(int(ts)).strftime('%H:%M')
+
+
+def _runs(values):
+    """(start, end) index pairs of runs of equal consecutive values."""
+    if len(values) == 0:
+        return []
+    edges = np.flatnonzero(values[1:] != values[:-1]) + 1
+    starts = np.concatenate(([0], edges))
+    ends = np.concatenate((edges, [len(values)]))
+    return list(zip(starts.tolist(), ends.tolist()))
+
+
+def _best_window(energy, width):
+    """(start index, kWh) of the `width`-step window with the most energy."""
+    if len(energy) < width:
+        return 0, float(np.sum(energy))
+    sums = np.convolve(energy, np.ones(width), mode='valid')
+    start = int(np.argmax(sums))
+    return start, float(sums[start])
+
+
+def dispatch_advice(plan, timeline_hours=24, max_periods=8):
+    """current_tip, priority, battery_tip, timeline and tips derived from the schedule."""
+    dt = plan.step_hours
+    action = str(classify(plan.battery[:1], plan.grid_import[:1], plan.grid_export[:1])[0])
+    peak_now = plan.tariff[0] > plan.tariff.min()
+
+    if action == 'charge':
+        tip, priority = f"Surplus solar: charging the battery at {plan.battery[0]:.1f} kW.", 'medium'
+    elif action == 'export':
+        tip, priority = f"Battery full with {plan.grid_export[0]:.1f} kW of spare solar. Run heavy loads now!", 'high'
+    elif action == 'discharge':
+        tip = f"{'Peak tariff: b' if peak_now else 'B'}attery is supplying {-plan.battery[0]:.1f} kW of the load."
+        priority = 'medium'
+    elif action == 'import':
+        tip = f"Drawing {plan.grid_import[0]:.1f} kW from the grid{' at peak tariff' if peak_now else ''}. Keep non-essential loads minimal."
+        priority = 'high' if peak_now else 'low'
+    else:
+        tip, priority = "Solar covers the load. Good time for moderate usage.", 'low'
+
+    # Battery outlook over the timeline window
+    window = max(1, min(len(plan.time), int(round(timeline_hours / dt))))
+    soc = plan.soc[:window]
+    high, low = int(np.argmax(soc)), int(np.argmin(soc))
+    end_time = plan.time[:window] + int(dt * 3600)
+    battery_tip = (f"Battery at {plan.start_soc:.0f}%. Planned peak {soc[high]:.0f}% at {_clock(end_time[high])}, "
+                   f"lowest {soc[low]:.0f}% at {_clock(end_time[low])}.")
+
+    # Timeline: consecutive hours with the same dominant action
+    steps_per_hour = max(1, int(round(1 / dt)))
+    hourly = {name: _hourly_mean(getattr(plan, name)[:window], steps_per_hour)
+              for name in ('solar', 'battery', 'grid_import', 'grid_export')}
+    actions = classify(hourly['battery'], hourly['grid_import'], hourly['grid_export'])
+    timeline = []
+    for start, end in _runs(actions)[:max_periods]:
+        info = ACTIONS[str(actions[start])]
+        first = int(plan.time[start * steps_per_hour])
+        timeline.append({
+            'time': f"{_clock(first)}-{_clock(first + (end - start) * 3600)}",
+            'period': info['period'],
+            'solar': f"{hourly['solar'][start:end].sum():.1f} kWh",
+            'recommendation': info['recommendation'],
+            'icon': info['icon'],
+            'battery_kwh': round(float(hourly['battery'][start:end].sum()), 2),
+            'grid_kwh': round(float(hourly['grid_import'][start:end].sum()), 2)
+        })
+
+    horizon = len(plan.time) * dt
+    imported = float(plan.grid_import.sum() * dt)
+    tips = [
+        f"Optimized battery use cuts grid import from {plan.baseline_import:.1f} to {imported:.1f} kWh "
+        f"(saving ₹{plan.baseline_cost - plan.cost:.0f}) over the next {horizon:.0f} h."
+    ]
+    exported = plan.grid_export[:window] * dt
+    if exported.sum() > _THRESHOLD_KW:
+        start, kwh = _best_window(exported, 2 * steps_per_hour)
+        tips.append(f"Run heavy appliances {_clock(plan.time[start])}-{_clock(plan.time[start] + 7200)}: "
+                    f"{kwh:.1f} kWh of solar would otherwise go unused.")
+    else:
+        start, kwh = _best_window(plan.solar[:window] * dt, 2 * steps_per_hour)
+        tips.append(f"Solar peaks {_clock(plan.time[start])}-{_clock(plan.time[start] + 7200)} "
+                    f"({kwh:.1f} kWh). Schedule flexible loads then.")
+    peak = plan.tariff[:window] > plan.tariff.min()
+    if peak.any():
+        from_battery = float(np.maximum(-plan.battery[:window][peak], 0).sum() * dt)
+        from_grid = float(plan.grid_import[:window][peak].sum() * dt)
+        tips.append(f"Peak tariff hours: the battery covers {from_battery:.1f} kWh, "
+                    f"{from_grid:.1f} kWh still comes from the grid.")
+    else:
+        tips.append(f"Battery discharges {float(np.maximum(-plan.battery[:window], 0).sum() * dt):.1f} kWh "
+                    f"in the next {timeline_hours} h to avoid grid import.")
+
+    return {
+        'current_tip': tip,
+        'priority': priority,
+        'battery_tip': battery_tip,
+        'timeline': timeline,
+        'tips': tips
+    }
+
+
+def plan_summary(plan):
+    imported = float(plan.grid_import.sum() * plan.step_hours)
+    return {
+        'horizon_hours': round(len(plan.time) * plan.step_hours, 2),
+        'step_minutes': round(plan.step_hours * 60),
+        'grid_import_kwh': round(imported, 2),
+        'baseline_import_kwh': round(plan.baseline_import, 2),
+        'cost': round(plan.cost, 2),
+        'baseline_cost': round(plan.baseline_cost, 2),
+        'savings': round(plan.baseline_cost - plan.cost, 2)
+    }
+
+
+def plan_schedule(plan):
+    """Columnar schedule for charts (kW per step, SoC in %)."""
+    return {
+        'time': [datetime.fromtimestamp(ts).isoformat() for ts in plan.time.tolist()],
+        'solar': np.round(plan.solar, 2).tolist(),
+        'load': np.round(plan.load, 2).tolist(),
+        'battery': np.round(plan.battery, 2).tolist(),
+        'grid_import': np.round(plan.grid_import, 2).tolist(),
+        'grid_export': np.round(plan.grid_export, 2).tolist(),
+        'soc': np.round(plan.soc, 1).tolist(),
+        'tariff': plan.tariff.tolist()
+    }
@@ -0,0 +1,70 @@
+"""
+Conditional GET - Version-based ETag / Last-Modified validators
+A read endpoint declares a cheap version function (e.g. the newest log id or
+the config version). The validator is derived from that version and the query
+string before the handler runs, so an unchanged poll is answered with a bodiless
+304 without querying rows or serializing JSON.
+"""
+
+import hashlib
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import make_response, request
+
+
+def make_etag(version):
+    """Stable validator for (path, query string, version)."""
+    key = repr((request.path, sorted(request.args.items(multi=True)), version))
+    return hashlib.blake2b(key.encode('utf-8'), digest_size=12).hexdigest()
+
+
+def _as_datetime(last_modified):
+    """Aware UTC datetime from a datetime (naive = local time) or epoch seconds."""
+    if last_modified is None:
+        return None
+    if not isinstance(last_modified, datetime):
+        return datetime.fromtimestamp(last_modified, tz=timezone.utc)
+    return last_modified.astimezone(timezone.utc)
+
+
+def _not_modified(etag, last_modified):
+    if request.if_none_match:
+        # If-None-Match takes precedence over If-Modified-Since (RFC 9110 13.2.2)
+        return request.if_none_match.contains_weak(etag)
+    if last_modified is not None and request.if_modified_since is not None:
+        return last_modified.replace(microsecond=0) <= request.if_modified_since
+    return False
+
+
+def conditional(version_fn):
+    """
+    Decorator for GET endpoints
+    version_fn() returns (version, last_modified) where last_modified is a
+    datetime, epoch seconds or None. Returning None as the version disables
+    validation for that request (the handler runs as usual).
+    """
+    def decorator(handler):
+        @wraps(handler)
+        def wrapper(*args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return handler(*args, **kwargs)
+            version, last_modified = version_fn()
+            if version is None:
+                return handler(*args, **kwargs)
+            etag = make_etag(version)
+            last_modified = _as_datetime(last_modified)
+            if _not_modified(etag, last_modified):
+                response = make_response('', 304)
+            else:
+                response = make_response(handler(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                if last_modified is not None:
+                    response.last_modified = last_modified
+            response.set_etag(etag, weak=True)
+            # Let clients store the response but revalidate on every use
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
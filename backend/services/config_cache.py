@@ -0,0 +1,60 @@
+"""
+Config Cache - In-process cache of a rarely changing database row
+Readers get an immutable snapshot. Writers bump a version and publish it to a
+small stamp file, so every worker process notices the change with one os.stat()
+instead of a database query.
+"""
+
+import os
+import threading
+
+
+class VersionedCache:
+    """
+    Caches load_fn() until the stamp file changes
+    load_fn() must return an object with a `version` attribute.
+    """
+
+    def __init__(self, load_fn, stamp_path):
+        self.load_fn = load_fn
+        self.stamp_path = stamp_path
+        self._snapshot = None
+        self._stamp = None
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    def _read_stamp(self):
+        try:
+            st = os.stat(self.stamp_path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def get(self):
+        """Current snapshot; reloads only if another process (or this one) published a new version."""
+        stamp = self._read_stamp()
+        snapshot = self._snapshot
+        if snapshot is not None and stamp == self._stamp:
+            return snapshot
+        with self._lock:
+            if self._snapshot is None or stamp != self._stamp:
+                self._snapshot = self.load_fn()
+                self._stamp = stamp
+                self.loads += 1
+            return self._snapshot
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshot = None
+
+    def publish(self, version):
+        """Announce a new version to all processes (call after the DB commit)."""
+        tmp_path = f"{self.stamp_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.stamp_path) or '.', exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as fh:
+                fh.write(str(version))
+            os.replace(tmp_path, self.stamp_path)
+        except OSError as e:
+            print(f"Config stamp Error: {e}")
+        self.invalidate()
@@ -0,0 +1,73 @@
+"""
+Database Setup - Tuned SQLite engine and lightweight schema migrations
+"""
+
+import sqlite3
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+
+# Applied to every new SQLite connection
+SQLITE_PRAGMAS = (
+    ('journal_mode', 'WAL'),        # readers don't block the writer (and vice versa)
+    ('synchronous', 'NORMAL'),      # fsync at checkpoints only; safe with WAL
+    ('mmap_size', 268435456),       # 256 MB memory-mapped reads
+    ('cache_size', -65536),         # 64 MB page cache (negative = KiB)
+    ('temp_store', 'MEMORY'),
+    ('busy_timeout', 5000),         # wait up to 5 s for a lock instead of failing
+)
+
+# Pooled connections; check_same_thread=False lets the pool hand a connection to
+# the background threads as well as request threads
+SQLITE_ENGINE_OPTIONS = {
+    'pool_size': 5,
+    'max_overflow': 10,
+    'pool_timeout': 30,
+    'pool_recycle': 3600,
+    'pool_pre_ping': True,
+    'connect_args': {'check_same_thread': False, 'timeout': 15}
+}
+
+
+def engine_options(database_uri):
+    """SQLAlchemy engine options for database_uri (pool settings only apply to file databases)."""
+    if database_uri.startswith('sqlite') and ':memory:' not in database_uri and database_uri != 'sqlite://':
+        return dict(SQLITE_ENGINE_OPTIONS)
+    return {}
+
+
+def apply_pragmas(dbapi_connection):
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS:
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+
+@event.listens_for(Engine, 'connect')
+def _on_connect(dbapi_connection, connection_record):
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        apply_pragmas(dbapi_connection)
+
+
+def apply_migrations(engine, migrations, fresh=False):
+    """
+    Bring an existing database up to date
+    migrations is an ordered list of (version, description, [sql, ...]); the
+    applied version is tracked in SQLite's PRAGMA user_version. A fresh database
+    (just built by create_all()) is stamped with the latest version instead of
+    replaying migrations that describe changes it already has.
+    """
+    latest = migrations[-1][0] if migrations else 0
+    with engine.begin() as conn:
+        if fresh:
+            conn.execute(text(f'PRAGMA user_version = {int(latest)}'))
+            return latest
+        current = conn.execute(text('PRAGMA user_version')).scalar() or 0
+        for version, description, statements in migrations:
+            if version <= current:
+                continue
+            for statement in statements:
+                conn.execute(text(statement))
+            conn.execute(text(f'PRAGMA user_version = {int(version)}'))
+            print(f"Applied migration {version}: {description}")
+            current = version
+    return current
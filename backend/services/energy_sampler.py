@@ -0,0 +1,169 @@
+"""
+Energy Sampler - Fixed-cadence sampling with write-behind persistence
+Samples the system on its own schedule (independent of request traffic), keeps
+the latest sample in memory for readers and writes samples to the database in
+buffered batches
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from types import MappingProxyType
+
+
+@dataclass(frozen=True)
+class EnergySample:
+    """
+    One system sample
+    row is the read-only column mapping persisted as an EnergyLog row;
+    seq increases by one per sample within a process; taken_at is epoch seconds.
+    """
+    seq: int
+    row: MappingProxyType
+    weather: MappingProxyType
+    sunlight_factor: float
+    taken_at: float
+
+
+class EnergySampler:
+    """
+    Background sampler
+    sample_fn() -> (row dict, weather dict, sunlight_factor) builds one sample.
+    flush_fn(rows) persists a list of row dicts in one transaction.
+    Pending rows are flushed once flush_batch rows are queued or the oldest has
+    waited flush_seconds, and always on stop().
+    """
+
+    def __init__(self, sample_fn, flush_fn, interval=60, flush_batch=10, flush_seconds=120, max_pending=10000):
+        self.sample_fn = sample_fn
+        self.flush_fn = flush_fn
+        self.interval = interval
+        self.flush_batch = flush_batch
+        self.flush_seconds = flush_seconds
+        self._pending = deque(maxlen=max_pending)  # oldest rows drop first if the DB stays down
+        self._pending_since = None
+        self._latest = None
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+        self.flushes = 0
+        self.flush_errors = 0
+        self.written = 0
+
+    def latest(self):
+        """Most recent EnergySample, or None before the first sample."""
+        return self._latest
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive() and self._pid == os.getpid()
+
+    def start(self):
+        with self._lock:
+            if self.is_running():
+                return
+            self._stop.clear()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='energy-sampler', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=5):
+        with self._lock:
+            thread = self._thread
+            self._stop.set()
+            self._thread = None
+        if thread is not None and thread.is_alive() and thread is not threading.current_thread():
+            thread.join(timeout)
+        self.flush()
+
+    def sample_now(self, persist=True):
+        """Take one sample and publish it; persist=False keeps it out of the write-behind queue."""
+        row, weather, sunlight_factor = self.sample_fn()
+        with self._lock:
+            self._seq += 1
+            sample = EnergySample(
+                seq=self._seq,
+                row=MappingProxyType(dict(row)),
+                weather=MappingProxyType(dict(weather)),
+                sunlight_factor=sunlight_factor,
+                taken_at=time.time()
+            )
+            self._latest = sample
+            if persist:
+                self._pending.append(dict(row))
+                if self._pending_since is None:
+                    self._pending_since = time.time()
+        return sample
+
+    def current(self):
+        """
+        Latest sample for readers
+        Where the sampler thread runs this is latest(). Elsewhere (a process that
+        is not the elected sampler, or before the first tick) an unpersisted
+        sample is taken at most once per interval, so only the sampler writes rows.
+        """
+        sample = self._latest
+        if sample is None or (not self.is_running() and time.time() - sample.taken_at >= self.interval):
+            sample = self.sample_now(persist=False)
+        return sample
+
+    def flush_due(self):
+        with self._lock:
+            if not self._pending:
+                return False
+            return (len(self._pending) >= self.flush_batch or
+                    time.time() - self._pending_since >= self.flush_seconds)
+
+    def flush(self):
+        """Write all pending rows in one batch; rows are re-queued if the write fails."""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                batch = list(self._pending)
+                self._pending.clear()
+                self._pending_since = None
+            try:
+                self.flush_fn(batch)
+            except Exception as e:
+                print(f"Energy sampler flush Error: {e}")
+                with self._lock:
+                    self.flush_errors += 1
+                    # Put the batch back in front of rows queued meanwhile; when that
+                    # overflows max_pending, the oldest rows are the ones dropped
+                    self._pending = deque(batch + list(self._pending), maxlen=self._pending.maxlen)
+                    self._pending_since = time.time()
+                return 0
+            with self._lock:
+                self.flushes += 1
+                self.written += len(batch)
+            return len(batch)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'running': self.is_running(),
+                'interval': self.interval,
+                'samples': self._seq,
+                'pending': len(self._pending),
+                'flushes': self.flushes,
+                'flush_errors': self.flush_errors,
+                'written': self.written
+            }
+
+    def _run(self):
+        next_at = time.monotonic()
+        while not self._stop.is_set():
+            try:
+                self.sample_now()
+            except Exception as e:
+                print(f"Energy sampler Error: {e}")
+            if self.flush_due():
+                self.flush()
+            # Fixed cadence: schedule from the previous tick, not from "now"
+            next_at += self.interval
+            self._stop.wait(max(0.0, next_at - time.monotonic()))
@@ -0,0 +1,144 @@
+"""
+Event Hub - Server-Sent Events fan-out for live dashboard data
+One producer thread checks a cheap version number per topic (e.g. the energy
+sampler's sequence) and, only when it changes, builds and serializes the
+payload once. Every subscriber is then woken and sent the same pre-encoded
+bytes, so server work follows the data change rate, not the number of clients.
+Slow subscribers only ever get the newest message per topic.
+"""
+
+import json
+import os
+import threading
+from contextlib import nullcontext
+
+
+def format_event(topic, data, event_id):
+    """Encode one SSE message (data is a JSON string without newlines)."""
+    return f"id: {event_id}\nevent: {topic}\ndata: {data}\n\n".encode('utf-8')
+
+
+class EventHub:
+    """
+    Topic registry, change detector and subscriber fan-out
+    register(topic, version_fn, payload_fn): version_fn() must be cheap and
+    return a new value whenever payload_fn() would return something different.
+    context is an optional factory for a context manager the producer runs its
+    callbacks in (e.g. Flask's app.app_context); dumps encodes payloads to a
+    single-line JSON string (e.g. app.json.dumps).
+    """
+
+    def __init__(self, interval=1.0, heartbeat=15.0, retry_ms=3000, context=None, dumps=None):
+        self.interval = interval
+        self.heartbeat = heartbeat
+        self.retry_ms = retry_ms
+        self.context = context or nullcontext
+        self.dumps = dumps or (lambda obj: json.dumps(obj, separators=(',', ':'), default=str))
+        self._topics = {}       # topic -> (version_fn, payload_fn)
+        self._versions = {}     # topic -> last published version
+        self._messages = {}     # topic -> (event_id, encoded bytes)
+        self._event_id = 0
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+        self.subscribers = 0
+        self.published = 0
+        self.errors = 0
+
+    def register(self, topic, version_fn, payload_fn):
+        self._topics[topic] = (version_fn, payload_fn)
+
+    def topics(self):
+        return list(self._topics)
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive() and self._pid == os.getpid()
+
+    def start(self):
+        with self._cond:
+            if self.is_running():
+                return
+            self._stop.clear()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='event-hub', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=5):
+        with self._cond:
+            thread = self._thread
+            self._stop.set()
+            self._thread = None
+            self._cond.notify_all()
+        if thread is not None and thread.is_alive() and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def poll_once(self):
+        """Publish every topic whose version changed since the last check."""
+        with self.context():
+            for topic, (version_fn, payload_fn) in list(self._topics.items()):
+                try:
+                    version = version_fn()
+                    if topic in self._versions and version == self._versions[topic]:
+                        continue
+                    data = self.dumps(payload_fn())
+                except Exception as e:
+                    self.errors += 1
+                    print(f"Event hub Error ({topic}): {e}")
+                    continue
+                with self._cond:
+                    self._event_id += 1
+                    self._versions[topic] = version
+                    self._messages[topic] = (self._event_id, format_event(topic, data, self._event_id))
+                    self.published += 1
+                    self._cond.notify_all()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.poll_once()
+            self._stop.wait(self.interval)
+
+    def subscribe(self, topics):
+        """
+        Generator of SSE chunks for topics: the current message of each topic
+        first, then every newer one, with comment heartbeats while idle
+        """
+        topics = [t for t in dict.fromkeys(topics) if t in self._topics]
+        sent = {}
+        with self._cond:
+            self.subscribers += 1
+        try:
+            yield f"retry: {self.retry_ms}\n\n".encode('utf-8')
+            while not self._stop.is_set():
+                with self._cond:
+                    pending = self._pending(topics, sent)
+                    if not pending:
+                        self._cond.wait(self.heartbeat)
+                        pending = self._pending(topics, sent)
+                if not pending:
+                    yield b": keepalive\n\n"
+                    continue
+                for topic, (event_id, message) in pending:
+                    sent[topic] = event_id
+                yield b''.join(message for _, (_, message) in pending)
+        finally:
+            with self._cond:
+                self.subscribers -= 1
+
+    def _pending(self, topics, sent):
+        # Caller holds self._cond
+        pending = []
+        for topic in topics:
+            message = self._messages.get(topic)
+            if message is not None and sent.get(topic) != message[0]:
+                pending.append((topic, message))
+        return pending
+
+    def stats(self):
+        return {
+            'running': self.is_running(),
+            'topics': self.topics(),
+            'subscribers': self.subscribers,
+            'published': self.published,
+            'errors': self.errors
+        }
@@ -0,0 +1,75 @@
+"""
+Leader Lock - Elect one process to run the background workers
+Every worker process tries a non-blocking flock on the same file. The one that
+gets it holds it (and keeps the file open) for the rest of its life and runs
+the weather poller and samplers; the others only serve requests. When the
+leader exits the kernel releases the lock and the next process to retry takes
+over, so there is always at most one sampler writing rows.
+"""
+
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process use only, every process leads
+    fcntl = None
+
+
+class LeaderLock:
+    """Non-blocking, per-process leader election on an flock'd file."""
+
+    def __init__(self, path, retry_seconds=30):
+        self.path = path
+        self.retry_seconds = retry_seconds
+        self._fd = None
+        self._pid = None
+        self._leader = False
+        self._next_try = 0.0
+        self._lock = threading.Lock()
+
+    def is_leader(self):
+        return self._leader and self._pid == os.getpid()
+
+    def acquire(self):
+        """True if this process is (or just became) the leader; followers retry at most every retry_seconds."""
+        if self.is_leader():
+            return True
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked: the parent's descriptor (and any lock on it) is not ours
+                self._fd = None
+                self._leader = False
+                self._next_try = 0.0
+                self._pid = os.getpid()
+            if self._leader:
+                return True
+            now = time.monotonic()
+            if now < self._next_try:
+                return False
+            self._next_try = now + self.retry_seconds
+            if fcntl is None:
+                self._leader = True
+                return True
+            if self._fd is None:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return False
+            os.ftruncate(self._fd, 0)
+            os.pwrite(self._fd, f'{os.getpid()}\n'.encode('ascii'), 0)  # the leader's pid, for operators
+            self._leader = True
+            return True
+
+    def release(self):
+        with self._lock:
+            if self._fd is not None and self._pid == os.getpid():
+                if fcntl is not None and self._leader:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+                os.close(self._fd)
+            self._fd = None
+            self._leader = False
+            self._next_try = 0.0
@@ -0,0 +1,112 @@
+"""
+Ring Buffer - Fixed-capacity, array-backed live history per IoT device
+Each device keeps int64 epoch-ms timestamps and float64 voltages in two
+preallocated NumPy arrays: appends are O(1) slice writes and window reads are
+views into the arrays (no per-sample objects anywhere)
+"""
+
+import threading
+
+import numpy as np
+
+
+class DeviceRingBuffer:
+    """Circular buffer of (timestamp_ms, voltage) samples for one device."""
+
+    __slots__ = ('capacity', 'timestamps', 'voltages', '_next', '_count', '_lock')
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.timestamps = np.zeros(capacity, dtype=np.int64)
+        self.voltages = np.zeros(capacity, dtype=np.float64)
+        self._next = 0     # slot the next sample goes into
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._count
+
+    def append(self, timestamp_ms, voltage):
+        with self._lock:
+            i = self._next
+            self.timestamps[i] = timestamp_ms
+            self.voltages[i] = voltage
+            self._next = (i + 1) % self.capacity
+            self._count = min(self._count + 1, self.capacity)
+
+    def extend(self, timestamps_ms, voltages):
+        """Append a batch with at most two slice writes (only the newest `capacity` samples survive)."""
+        timestamps_ms = np.asarray(timestamps_ms, dtype=np.int64)[-self.capacity:]
+        voltages = np.asarray(voltages, dtype=np.float64)[-self.capacity:]
+        n = len(voltages)
+        if n == 0:
+            return
+        with self._lock:
+            start = self._next
+            first = min(n, self.capacity - start)
+            self.timestamps[start:start + first] = timestamps_ms[:first]
+            self.voltages[start:start + first] = voltages[:first]
+            if first < n:
+                self.timestamps[:n - first] = timestamps_ms[first:]
+                self.voltages[:n - first] = voltages[first:]
+            self._next = (start + n) % self.capacity
+            self._count = min(self._count + n, self.capacity)
+
+    def latest(self):
+        """(timestamp_ms, voltage) of the newest sample, or None if empty."""
+        if self._count == 0:
+            return None
+        i = (self._next - 1) % self.capacity
+        return int(self.timestamps[i]), float(self.voltages[i])
+
+    def segments(self, n=None):
+        """
+        Newest n samples (default all) as up to two (timestamps, voltages) view
+        pairs, oldest first. The views share memory with the buffer.
+        """
+        with self._lock:
+            count = self._count if n is None else max(0, min(n, self._count))
+            end = self._next
+            start = end - count
+            if start >= 0:
+                return [(self.timestamps[start:end], self.voltages[start:end])]
+            if end == 0:
+                # Wrapped exactly to slot 0: the newest samples end at the array's end
+                return [(self.timestamps[start:], self.voltages[start:])]
+            return [(self.timestamps[start:], self.voltages[start:]),
+                    (self.timestamps[:end], self.voltages[:end])]
+
+    def window(self, n=None):
+        """Newest n samples as contiguous (timestamps, voltages) arrays; copies only when wrapped."""
+        parts = self.segments(n)
+        if len(parts) == 1:
+            return parts[0]
+        return (np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts]))
+
+
+class RingBufferRegistry:
+    """Lazily created ring buffer per device id, plus a global ingest sequence number."""
+
+    def __init__(self, capacity=300):
+        self.capacity = capacity
+        self._buffers = {}
+        self._lock = threading.Lock()
+        self.seq = 0              # bumped on every ingest (cheap change detector)
+        self.last_device = None
+
+    def get(self, device):
+        return self._buffers.get(device)
+
+    def devices(self):
+        return list(self._buffers)
+
+    def extend(self, device, timestamps_ms, voltages):
+        buffer = self._buffers.get(device)
+        if buffer is None:
+            with self._lock:
+                buffer = self._buffers.setdefault(device, DeviceRingBuffer(self.capacity))
+        buffer.extend(timestamps_ms, voltages)
+        with self._lock:
+            self.seq += 1
+            self.last_device = device
+        return buffer
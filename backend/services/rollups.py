@@ -0,0 +1,105 @@
+"""
+Rollups - Incrementally maintained hourly/daily aggregates of energy_log
+Every batch of samples is folded into its hour and day buckets with one SQLite
+upsert per table, so reports read a few rows per day instead of raw samples
+"""
+
+from sqlalchemy import case, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+# rollup column prefix -> energy_log column
+ROLLUP_FIELDS = (
+    ('generation', 'total_generation'),
+    ('consumption', 'consumption'),
+    ('temperature', 'temperature'),
+)
+
+# SQLAlchemy's SQLite DateTime text format, so rollup buckets compare like energy_log timestamps
+_HOUR_FORMAT = '%Y-%m-%d %H:00:00.000000'
+_DAY_FORMAT = '%Y-%m-%d 00:00:00.000000'
+
+
+def hour_bucket(ts):
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+
+def day_bucket(ts):
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def aggregate_rows(rows, bucket_fn):
+    """Fold sample rows (dicts with a datetime 'timestamp') into per-bucket partial aggregates."""
+    buckets = {}
+    for row in rows:
+        ts = row['timestamp']
+        key = bucket_fn(ts)
+        agg = buckets.get(key)
+        if agg is None:
+            agg = buckets[key] = {'bucket': key, 'sample_count': 0,
+                                  'last_timestamp': ts, 'last_battery_level': row['battery_level']}
+            for name, _ in ROLLUP_FIELDS:
+                agg[f'{name}_sum'] = 0.0
+                agg[f'{name}_min'] = None
+                agg[f'{name}_max'] = None
+        agg['sample_count'] += 1
+        for name, column in ROLLUP_FIELDS:
+            value = row.get(column) or 0.0
+            agg[f'{name}_sum'] += value
+            agg[f'{name}_min'] = value if agg[f'{name}_min'] is None else min(agg[f'{name}_min'], value)
+            agg[f'{name}_max'] = value if agg[f'{name}_max'] is None else max(agg[f'{name}_max'], value)
+        if ts >= agg['last_timestamp']:
+            agg['last_timestamp'] = ts
+            agg['last_battery_level'] = row['battery_level']
+    return list(buckets.values())
+
+
+def upsert_statement(model):
+    """INSERT ... ON CONFLICT(bucket) that merges a partial aggregate into an existing bucket."""
+    table = model.__table__
+    stmt = sqlite_insert(table)
+    new = stmt.excluded
+    updates = {'sample_count': table.c.sample_count + new.sample_count}
+    for name, _ in ROLLUP_FIELDS:
+        updates[f'{name}_sum'] = table.c[f'{name}_sum'] + new[f'{name}_sum']
+        updates[f'{name}_min'] = func.min(table.c[f'{name}_min'], new[f'{name}_min'])
+        updates[f'{name}_max'] = func.max(table.c[f'{name}_max'], new[f'{name}_max'])
+    # SET expressions all see the old row, so the CASE compares against the old last_timestamp
+    newer = new.last_timestamp >= table.c.last_timestamp
+    updates['last_battery_level'] = case((newer, new.last_battery_level), else_=table.c.last_battery_level)
+    updates['last_timestamp'] = func.max(table.c.last_timestamp, new.last_timestamp)
+    return stmt.on_conflict_do_update(index_elements=['bucket'], set_=updates)
+
+
+def update_rollups(session, rows, hourly_model, daily_model):
+    """Fold a batch of freshly written samples into both rollup tables (caller commits)."""
+    if not rows:
+        return
+    session.execute(upsert_statement(hourly_model), aggregate_rows(rows, hour_bucket))
+    session.execute(upsert_statement(daily_model), aggregate_rows(rows, day_bucket))
+
+
+def _rebuild_sql(target, source, ts_column, bucket_format, count_expr, value_fn, battery_column):
+    columns = ['bucket', 'sample_count']
+    selects = [f"strftime('{bucket_format}', {ts_column})", count_expr]
+    for name, column in ROLLUP_FIELDS:
+        for agg in ('sum', 'min', 'max'):
+            columns.append(f'{name}_{agg}')
+            selects.append(f'{agg}({value_fn(name, column, agg)})')
+    columns += ['last_timestamp', 'last_battery_level']
+    # SQLite returns the bare column from the row that produced max()
+    last_ts = 'timestamp' if source == 'energy_log' else 'last_timestamp'
+    selects += [f'max({last_ts})', battery_column]
+    return (f"INSERT INTO {target} ({', '.join(columns)}) "
+            f"SELECT {', '.join(selects)} FROM {source} GROUP BY 1")
+
+
+def rebuild_statements(hourly_table, daily_table):
+    """SQL that recomputes both rollup tables from scratch (hourly from energy_log, daily from hourly)."""
+    return [
+        f'DELETE FROM {hourly_table}',
+        f'DELETE FROM {daily_table}',
+        _rebuild_sql(hourly_table, 'energy_log', 'timestamp', _HOUR_FORMAT, 'count(*)',
+                     lambda name, column, agg: column, 'battery_level'),
+        _rebuild_sql(daily_table, hourly_table, 'bucket', _DAY_FORMAT, 'sum(sample_count)',
+                     lambda name, column, agg: f'{name}_{agg}', 'last_battery_level'),
+    ]
@@ -0,0 +1,100 @@
+"""
+Sites - Validation and live readings for additional monitored installations
+Each site has its own location, array, battery and load. Its weather comes from
+the forecast cache, which the poller refreshes for all sites at once with
+batched Open-Meteo requests (weather_service.refresh_locations).
+"""
+
+import time
+from datetime import datetime
+
+from weather_service import calculate_sunlight_factor
+from fleet_simulation import consumption_profile
+
+SITE_FIELDS = ('name', 'city', 'latitude', 'longitude', 'solar_capacity', 'battery_size',
+               'panel_efficiency', 'consumption_base')
+SITE_DEFAULTS = {
+    'solar_capacity': 10,
+    'battery_size': 10,
+    'panel_efficiency': 0.85,
+    'consumption_base': 5
+}
+SITE_LOG_FIELDS = ('timestamp', 'solar_generation', 'consumption', 'battery', 'temperature', 'weather')
+
+# (low, high, inclusive low) for numeric fields
+_RANGES = {
+    'latitude': (-90.0, 90.0, True),
+    'longitude': (-180.0, 180.0, True),
+    'solar_capacity': (0.0, None, True),
+    'battery_size': (0.0, None, False),
+    'panel_efficiency': (0.0, 1.0, False),
+    'consumption_base': (0.0, None, True),
+}
+
+
+def parse_site(data, partial=False):
+    """
+    Validated site fields from a JSON body
+    With partial=False (create) name, city and the defaults are filled in; with
+    partial=True (update) only the given fields are returned. Raises ValueError.
+    """
+    if not isinstance(data, dict):
+        raise ValueError('expected a JSON object')
+    fields = {} if partial else dict(SITE_DEFAULTS)
+    for name in ('name', 'city'):
+        if name in data:
+            value = str(data[name] or '').strip()
+            if not value:
+                raise ValueError(f'{name} must not be empty')
+            fields[name] = value
+    if not partial:
+        if 'name' not in fields:
+            raise ValueError('name is required')
+        fields.setdefault('city', fields['name'])
+    for name, (low, high, inclusive) in _RANGES.items():
+        if name not in data or data[name] is None:
+            continue
+        try:
+            value = float(data[name])
+        except (TypeError, ValueError):
+            raise ValueError(f'{name} must be a number')
+        if value < low or (value == low and not inclusive) or (high is not None and value > high):
+            raise ValueError(f'{name} is out of range')
+        fields[name] = value
+    if ('latitude' in fields) != ('longitude' in fields):
+        raise ValueError('latitude and longitude must be given together')
+    return fields
+
+
+def site_reading(site, weather_data, battery_level, step_hours, now=None, simulate=True):
+    """
+    One reading for a site (a mapping of SITE_FIELDS) from its current weather
+    Solar output follows the sunlight factor at the site, the load the
+    household profile at the site's solar clock hour, and the battery absorbs
+    the difference over step_hours. With simulate=False the energy columns
+    are zero and only the weather is recorded.
+    """
+    now = time.time() if now is None else now
+    row = {
+        'timestamp': datetime.fromtimestamp(now),
+        'solar_generation': 0,
+        'consumption': 0,
+        'battery_level': 0,
+        'temperature': weather_data['temperature'],
+        'weather_desc': weather_data['weather']
+    }
+    if not simulate:
+        return row
+
+    sunlight_factor = calculate_sunlight_factor(weather_data, now)
+    solar = site['solar_capacity'] * sunlight_factor * site['panel_efficiency']
+    # Local mean solar time stands in for the site's clock
+    hour = (now / 3600.0 + site['longitude'] / 15.0) % 24
+    consumption = float(consumption_profile(hour, site['consumption_base']))
+    battery = battery_level + (solar - consumption) * step_hours / site['battery_size'] * 100
+    row.update(
+        solar_generation=round(solar, 2),
+        consumption=round(consumption, 2),
+        battery_level=round(max(0.0, min(100.0, battery)), 1)
+    )
+    return row
@@ -0,0 +1,323 @@
+"""
+Telemetry Store - Persistent, append-only IoT sample log
+Each device writes fixed-width (timestamp_ms int64, voltage float64) records
+into memory-mapped segment files. Segments rotate when full, are deleted once
+older than the retention window, and carry a sparse time index so range reads
+are binary searches that return zero-copy NumPy views of the mmap.
+
+Layout:  <root>/<device>/<seq:010d>.seg   (seq never repeats: <device>/.seq holds the highest used)
+Segment: 64-byte header (magic, record count, capacity, first/last timestamp)
+         followed by `capacity` 16-byte records
+Appends take an flock on <root>/<device>/.lock so several worker processes can
+share one store; the record count lives in the shared mmap header.
+"""
+
+import mmap
+import os
+import struct
+import threading
+
+import numpy as np
+
+from iot_ingest import valid_device
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process use only
+    fcntl = None
+
+RECORD = np.dtype([('ts', '<i8'), ('voltage', '<f8')])
+HEADER = struct.Struct('<8sQQqq')       # magic, count, capacity, first_ts, last_ts
+HEADER_SIZE = 64
+MAGIC = b'TSEG0001'
+INDEX_STRIDE = 1024                     # one sparse index entry per this many records
+SEQ_FILE = '.seq'
+
+
+def _safe_device(device):
+    """The device id as a directory name; ids that are not plain names are rejected, never rewritten."""
+    if not valid_device(device):
+        raise ValueError(f'invalid device id {device!r}')
+    return device
+
+
+class Segment:
+    """One mmap'd segment file."""
+
+    def __init__(self, path, capacity=None):
+        self.path = path
+        self.seq = int(os.path.basename(path).split('.')[0])
+        created = not os.path.exists(path)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if created:
+                os.ftruncate(fd, HEADER_SIZE + capacity * RECORD.itemsize)
+            self._mm = mmap.mmap(fd, 0)
+        finally:
+            os.close(fd)
+        if created:
+            HEADER.pack_into(self._mm, 0, MAGIC, 0, capacity, 0, 0)
+        magic, _, self.capacity, _, _ = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f'{path} is not a telemetry segment')
+        self.records = np.frombuffer(self._mm, dtype=RECORD, count=self.capacity, offset=HEADER_SIZE)
+        self._index = np.empty(0, dtype=np.int64)  # ts of every INDEX_STRIDE-th record
+
+    # Header fields are re-read on every access so appends from other processes are visible
+    @property
+    def count(self):
+        return HEADER.unpack_from(self._mm, 0)[1]
+
+    @property
+    def first_ts(self):
+        return HEADER.unpack_from(self._mm, 0)[3]
+
+    @property
+    def last_ts(self):
+        return HEADER.unpack_from(self._mm, 0)[4]
+
+    def free(self):
+        return self.capacity - self.count
+
+    def append(self, timestamps, voltages):
+        """Write as many records as fit; returns how many were written (caller holds the lock)."""
+        count = self.count
+        n = min(len(voltages), self.capacity - count)
+        if n <= 0:
+            return 0
+        block = self.records[count:count + n]
+        block['ts'] = timestamps[:n]
+        block['voltage'] = voltages[:n]
+        first_ts = int(timestamps[0]) if count == 0 else self.first_ts
+        HEADER.pack_into(self._mm, 0, MAGIC, count + n, self.capacity, first_ts, int(timestamps[n - 1]))
+        return n
+
+    def _sparse_index(self, count):
+        covered = len(self._index)
+        needed = (count + INDEX_STRIDE - 1) // INDEX_STRIDE
+        if needed > covered:
+            # Records are append-only, so existing index entries never change
+            fresh = self.records['ts'][covered * INDEX_STRIDE:count:INDEX_STRIDE]
+            self._index = np.concatenate((self._index, fresh))
+        return self._index
+
+    def search(self, ts, side):
+        """Position of ts among this segment's records (like np.searchsorted)."""
+        count = self.count
+        index = self._sparse_index(count)
+        block = max(0, int(np.searchsorted(index, ts, side)) - 1)
+        lo = block * INDEX_STRIDE
+        hi = min(count, lo + 2 * INDEX_STRIDE)
+        return lo + int(np.searchsorted(self.records['ts'][lo:hi], ts, side))
+
+    def slice(self, start_ms, end_ms):
+        """Zero-copy view of the records with start_ms <= ts < end_ms."""
+        return self.records[self.search(start_ms, 'left'):self.search(end_ms, 'left')]
+
+    def flush(self):
+        self._mm.flush()
+
+    def close(self):
+        self.records = None
+        try:
+            self._mm.close()
+        except BufferError:
+            pass  # a caller still holds a view; the mapping is released with it
+
+
+class _DeviceLog:
+    def __init__(self, directory):
+        self.directory = directory
+        self.segments = []
+        self.dir_mtime = None
+        self.lock = threading.Lock()
+        self.file_lock = _FileLock(os.path.join(directory, '.lock'))
+
+
+class TelemetryStore:
+    """Append-only per-device telemetry log with rotation and retention."""
+
+    def __init__(self, root, segment_records=65536, retention_days=30):
+        self.root = root
+        self.segment_records = segment_records
+        self.retention_ms = int(retention_days * 86400 * 1000)
+        self._devices = {}
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _device(self, device):
+        name = _safe_device(device)
+        log = self._devices.get(name)
+        if log is None:
+            with self._lock:
+                log = self._devices.get(name)
+                if log is None:
+                    directory = os.path.join(self.root, name)
+                    os.makedirs(directory, exist_ok=True)
+                    log = self._devices[name] = _DeviceLog(directory)
+        self._refresh(log)
+        return log
+
+    def _refresh(self, log):
+        """Pick up segments created or deleted by other processes."""
+        if os.stat(log.directory).st_mtime_ns != log.dir_mtime:
+            with log.lock:
+                self._scan(log)
+
+    def _scan(self, log):
+        # Caller holds log.lock
+        mtime = os.stat(log.directory).st_mtime_ns
+        names = sorted(n for n in os.listdir(log.directory) if n.endswith('.seg'))
+        known = {os.path.basename(s.path): s for s in log.segments}
+        segments = []
+        complete = True
+        for name in names:
+            segment = known.pop(name, None)
+            if segment is None:
+                try:
+                    segment = Segment(os.path.join(log.directory, name))
+                except (OSError, ValueError):
+                    complete = False  # another process is still creating it; rescan next time
+                    continue
+            segments.append(segment)
+        for stale in known.values():
+            stale.close()
+        log.segments = segments
+        log.dir_mtime = mtime if complete else None
+
+    def devices(self):
+        return sorted(n for n in os.listdir(self.root)
+                      if valid_device(n) and os.path.isdir(os.path.join(self.root, n)))
+
+    def append(self, device, timestamps_ms, voltages):
+        """Append a batch (timestamps should be non-decreasing across calls)."""
+        timestamps_ms = np.asarray(timestamps_ms, dtype=np.int64)
+        voltages = np.asarray(voltages, dtype=np.float64)
+        log = self._device(device)
+        with log.lock, log.file_lock:
+            if os.stat(log.directory).st_mtime_ns != log.dir_mtime:
+                self._scan(log)
+            written = 0
+            rotated = False
+            while written < len(voltages):
+                if not log.segments or log.segments[-1].free() == 0:
+                    seq = self._next_seq(log)
+                    path = os.path.join(log.directory, f'{seq:010d}.seg')
+                    log.segments.append(Segment(path, self.segment_records))
+                    rotated = True
+                written += log.segments[-1].append(timestamps_ms[written:], voltages[written:])
+            if rotated:
+                self._expire_locked(log, int(timestamps_ms[-1]))
+                log.dir_mtime = os.stat(log.directory).st_mtime_ns
+        return written
+
+    def _next_seq(self, log):
+        """
+        Sequence number for a new segment (caller holds the locks)
+        Names are never reused, even after every segment has expired: another
+        process may still have the old file of that name mapped.
+        """
+        path = os.path.join(log.directory, SEQ_FILE)
+        try:
+            with open(path) as f:
+                last = int(f.read() or 0)
+        except (OSError, ValueError):
+            last = 0
+        if log.segments:
+            last = max(last, log.segments[-1].seq)
+        with open(path, 'w') as f:
+            f.write(f'{last + 1}\n')
+        return last + 1
+
+    def _expire_locked(self, log, now_ms):
+        """Delete segments whose newest record is older than the retention window."""
+        cutoff = now_ms - self.retention_ms
+        keep = []
+        for segment in log.segments:
+            # The active segment goes too once all of it has expired; the next append starts a new one
+            if segment.count and segment.last_ts < cutoff:
+                segment.close()
+                os.remove(segment.path)
+            else:
+                keep.append(segment)
+        log.segments = keep
+
+    def enforce_retention(self, now_ms):
+        """Expire every device's old segments (appends only do this when they rotate)."""
+        for name in self.devices():
+            log = self._device(name)
+            with log.lock, log.file_lock:
+                self._expire_locked(log, now_ms)
+                log.dir_mtime = os.stat(log.directory).st_mtime_ns
+
+    def read_range(self, device, start_ms, end_ms):
+        """Records with start_ms <= ts < end_ms as a list of zero-copy views (one per segment)."""
+        log = self._device(device)
+        views = []
+        for segment in list(log.segments):
+            if segment.count == 0 or segment.last_ts < start_ms or segment.first_ts >= end_ms:
+                continue
+            view = segment.slice(start_ms, end_ms)
+            if len(view):
+                views.append(view)
+        return views
+
+    def read_range_arrays(self, device, start_ms, end_ms):
+        """Range as contiguous (timestamps, voltages) arrays (copies only across segment boundaries)."""
+        views = self.read_range(device, start_ms, end_ms)
+        if not views:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        if len(views) == 1:
+            return views[0]['ts'], views[0]['voltage']
+        joined = np.concatenate(views)
+        return joined['ts'], joined['voltage']
+
+    def tail(self, device, n):
+        """Newest n records as (timestamps, voltages)."""
+        log = self._device(device)
+        parts = []
+        remaining = n
+        for segment in reversed(list(log.segments)):
+            count = segment.count
+            take = min(remaining, count)
+            if take:
+                parts.append(segment.records[count - take:count])
+                remaining -= take
+            if remaining == 0:
+                break
+        if not parts:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        joined = parts[0] if len(parts) == 1 else np.concatenate(parts[::-1])
+        return joined['ts'], joined['voltage']
+
+    def last_timestamp(self, device):
+        """Timestamp of the device's newest record (None if it has none); one header read."""
+        log = self._device(device)
+        segments = log.segments
+        if not segments or segments[-1].count == 0:
+            return None
+        return segments[-1].last_ts
+
+    def flush(self):
+        for log in list(self._devices.values()):
+            for segment in list(log.segments):
+                segment.flush()
+
+
+class _FileLock:
+    """Exclusive flock on a lock file, kept open for reuse (no-op where fcntl is unavailable)."""
+
+    def __init__(self, path):
+        self.path = path
+        self.fd = None
+
+    def __enter__(self):
+        if fcntl is not None:
+            if self.fd is None:
+                self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self.fd is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
@@ -0,0 +1,152 @@
+"""
+Weather Poller - Refreshes weather off the request path
+A daemon thread polls every configured city on a fixed schedule and publishes
+an immutable snapshot; request handlers read the latest snapshot and only
+fetch (once, coalesced) a city that has not been polled yet.
+Extra coordinates (e.g. monitored sites) are refreshed in the same cycle with
+batched requests and read from the forecast cache.
+"""
+
+import os
+import threading
+import time
+from dataclasses import dataclass
+from types import MappingProxyType
+
+from singleflight import SingleFlight
+from weather_service import get_weather, get_fallback_weather, refresh_locations
+
+
+@dataclass(frozen=True)
+class WeatherSnapshot:
+    """One city's weather as of fetched_at (weather is a read-only mapping)."""
+    city: str
+    weather: MappingProxyType
+    success: bool
+    error: str
+    fetched_at: float
+
+
+_EMPTY = MappingProxyType({})
+
+
+class WeatherPoller:
+    """
+    Background weather refresher
+    cities_fn is called on every cycle so config changes are picked up without a restart.
+    locations_fn (optional) returns (lat, lon) pairs whose forecasts batch_fn keeps fresh.
+    start() is safe to call repeatedly and from forked workers: each process gets its own thread.
+    """
+
+    def __init__(self, cities_fn, interval=60, fetch_fn=get_weather, locations_fn=None, batch_fn=refresh_locations):
+        self.cities_fn = cities_fn
+        self.interval = interval
+        self.fetch_fn = fetch_fn
+        self.locations_fn = locations_fn
+        self.batch_fn = batch_fn
+        self._snapshots = _EMPTY  # city -> WeatherSnapshot, swapped atomically
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._publish_lock = threading.Lock()
+        self._flight = SingleFlight()
+        self._thread = None
+        self._pid = None
+        self.cycles = 0
+        self.locations = 0
+        self.batch_requests = 0
+
+    def get(self, city):
+        """Latest snapshot for city, or None if it has not been polled yet."""
+        return self._snapshots.get(city)
+
+    def snapshots(self):
+        return self._snapshots
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive() and self._pid == os.getpid()
+
+    def start(self):
+        with self._lock:
+            if self.is_running():
+                return
+            self._stop.clear()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='weather-poller', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=5):
+        with self._lock:
+            thread = self._thread
+            self._stop.set()
+            self._wake.set()
+            self._thread = None
+        if thread is not None and thread.is_alive() and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def refresh_now(self):
+        """Ask the poller to run a cycle immediately (e.g. after the city changed)."""
+        self._wake.set()
+
+    def fetch(self, city):
+        """
+        Fetch one city now and publish it (for a cache miss before the first poll)
+        Concurrent callers for the same city share one fetch.
+        """
+        snapshot = self._flight.do(city, lambda: self._fetch_city(city))
+        with self._publish_lock:
+            snapshots = dict(self._snapshots)
+            snapshots[city] = snapshot
+            self._snapshots = MappingProxyType(snapshots)
+        return snapshot
+
+    def _fetch_city(self, city):
+        try:
+            response = self.fetch_fn(city)
+        except Exception as e:
+            print(f"Weather poller Error ({city}): {e}")
+            return self._snapshots.get(city) or WeatherSnapshot(
+                city=city,
+                weather=MappingProxyType(dict(get_fallback_weather(city))),
+                success=False,
+                error=str(e),
+                fetched_at=time.time()
+            )
+        return WeatherSnapshot(
+            city=city,
+            weather=MappingProxyType(dict(response['data'])),
+            success=response['success'],
+            error=response.get('error'),
+            fetched_at=time.time()
+        )
+
+    def poll_once(self):
+        """Fetch every configured city once and publish a new snapshot."""
+        try:
+            cities = list(dict.fromkeys(self.cities_fn()))
+        except Exception as e:
+            print(f"Weather poller config Error: {e}")
+            return
+
+        published = {city: self._fetch_city(city) for city in cities}
+        with self._publish_lock:
+            self._snapshots = MappingProxyType(published)
+        self.poll_locations()
+        self.cycles += 1
+
+    def poll_locations(self):
+        """Refresh the forecasts of every extra location (stale ones only, in batches)."""
+        if self.locations_fn is None:
+            return
+        try:
+            locations = list(dict.fromkeys(self.locations_fn()))
+            self.batch_requests += self.batch_fn(locations)
+            self.locations = len(locations)
+        except Exception as e:
+            print(f"Weather poller locations Error: {e}")
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.poll_once()
+            self._wake.wait(self.interval)
+            self._wake.clear()
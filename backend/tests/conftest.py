@@ -0,0 +1,131 @@
+"""
+Test setup - put backend/services on sys.path the way app.py does, so the
+service modules import each other by their bare names
+"""
+
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'services'))
+
+
+@pytest.fixture(scope='session')
+def backend(tmp_path_factory):
+    """backend/app.py on a throwaway database, without background threads or weather API calls"""
+    root = tmp_path_factory.mktemp('backend')
+    os.environ['DATABASE_URL'] = f"sqlite:///{root / 'energy.db'}"
+    os.environ['BACKGROUND_WORKERS'] = '0'
+    os.environ['TELEMETRY_DIR'] = str(root / 'telemetry')
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    import app as backend_app
+    from weather_service import get_fallback_weather
+
+    backend_app.weather_poller.fetch_fn = lambda city: {'success': True, 'data': get_fallback_weather(city)}
+    # Keep the stamp and lock files out of backend/instance
+    backend_app.config_cache.stamp_path = str(root / 'config.version')
+    backend_app.background_leader.path = str(root / 'background.lock')
+    with backend_app.app.app_context():
+        backend_app.init_db()
+    return backend_app
+
+
+@pytest.fixture
+def client(backend):
+    """Test client on empty energy tables."""
+    with backend.app.app_context():
+        for model in (backend.EnergyLog, backend.EnergyRollupHourly, backend.EnergyRollupDaily, backend.SiteLog, backend.Site):
+            model.query.delete()
+        backend.db.session.commit()
+    return backend.app.test_client()
+
+
+@pytest.fixture
+def add_samples(backend):
+    """add_samples(n, start=..., step_minutes=1) writes n energy_log rows through the sampler's flush."""
+    def add(n, start=datetime(2026, 1, 1, 8), step_minutes=1):
+        rows = [{
+            'timestamp': start + timedelta(minutes=i * step_minutes),
+            'solar_generation': float(i),
+            'total_generation': float(i),
+            'consumption': 2.0,
+            'battery_level': 50.0,
+            'efficiency': 80.0,
+            'temperature': 25.0 + i % 3,
+            'weather_desc': 'Clear'
+        } for i in range(n)]
+        backend.write_samples(rows)
+        return rows
+    return add
+
+
+class FakeResponse:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+
+class FakeOpenMeteo:
+    """Stands in for weather_service.http_get: canned geocoding and forecast answers, with a call log."""
+
+    CITIES = {'pune': (18.52, 73.86, 'Pune', 'India'), 'mumbai': (19.08, 72.88, 'Mumbai', 'India')}
+
+    def __init__(self):
+        self.calls = []
+        self.fail = False
+        self.temperature = 30.0
+
+    def __call__(self, url, params=None, timeout=None):
+        self.calls.append((url, dict(params or {})))
+        if self.fail:
+            import requests
+            raise requests.exceptions.ConnectionError('upstream down')
+        if 'geocoding' in url:
+            city = self.CITIES.get(params['name'].strip().lower())
+            if city is None:
+                return FakeResponse({})
+            lat, lon, name, country = city
+            return FakeResponse({'results': [{'latitude': lat, 'longitude': lon, 'name': name, 'country': country}]})
+        latitudes = str(params['latitude']).split(',')
+        forecasts = [self.forecast() for _ in latitudes]
+        return FakeResponse(forecasts[0] if len(forecasts) == 1 else forecasts)
+
+    def forecast(self, hours=48):
+        start = int(time.time()) // 3600 * 3600
+        return {
+            'current': {'temperature_2m': self.temperature, 'apparent_temperature': self.temperature + 2,
+                        'relative_humidity_2m': 60, 'is_day': 1, 'weather_code': 0, 'cloud_cover': 10,
+                        'pressure_msl': 1012.0, 'wind_speed_10m': 3.0, 'wind_direction_10m': 90},
+            'daily': {'sunrise': [start - 6 * 3600], 'sunset': [start + 6 * 3600]},
+            'hourly': {'time': [start + 3600 * i for i in range(hours)],
+                       'temperature_2m': [self.temperature] * hours,
+                       'cloud_cover': [10] * hours,
+                       'shortwave_radiation': [500.0] * hours}
+        }
+
+    def count(self, kind):
+        return sum(1 for url, _ in self.calls if kind in url)
+
+
+@pytest.fixture
+def open_meteo(monkeypatch):
+    """Fresh weather_service caches with upstream calls answered by FakeOpenMeteo."""
+    import weather_service
+
+    fake = FakeOpenMeteo()
+    monkeypatch.setattr(weather_service, 'http_get', fake)
+    weather_service._geocode_cache.clear()
+    with weather_service._forecast_lock:
+        weather_service._forecast_cache.clear()
+        weather_service._refreshing.clear()
+    for key in weather_service._forecast_stats:
+        weather_service._forecast_stats[key] = 0
+    return fake
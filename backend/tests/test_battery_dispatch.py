@@ -0,0 +1,107 @@
+import numpy as np
+import pytest
+
+from battery_dispatch import optimize_dispatch, plan_dispatch, plan_summary, tou_tariff
+
+STEP = 1.0  # hour
+OFF_PEAK, PEAK = 8.0, 12.0
+
+
+def run(solar, load, tariff, battery_size=10.0, soc=50.0, **options):
+    n = len(solar)
+    options.setdefault('efficiency', 1.0)
+    return optimize_dispatch(np.arange(n) * 3600, solar, load, tariff, battery_size, soc, STEP, **options)
+
+
+def assert_balanced(plan, efficiency=1.0):
+    charge = np.maximum(plan.battery, 0.0)
+    discharge = np.maximum(-plan.battery, 0.0)
+    supply = plan.solar + discharge * efficiency + plan.grid_import
+    demand = plan.load + charge / efficiency + plan.grid_export
+    assert supply == pytest.approx(demand, abs=1e-9)
+
+
+def test_surplus_solar_is_stored_for_the_peak():
+    solar = [4.0, 4.0, 0.0, 0.0]
+    load = [1.0, 1.0, 2.0, 2.0]
+    plan = run(solar, load, [OFF_PEAK, OFF_PEAK, PEAK, PEAK], soc=10.0, c_rate=1.0)
+    assert plan.battery[:2].sum() > 0 and plan.battery[2:].sum() < 0
+    assert plan.grid_import.sum() == pytest.approx(0.0)
+    assert plan.cost < plan.baseline_cost
+    assert_balanced(plan)
+
+
+def test_energy_balance_with_losses():
+    rng = np.random.default_rng(1)
+    solar, load = rng.uniform(0, 3, 24), rng.uniform(0.5, 2, 24)
+    plan = run(solar, load, tou_tariff(np.arange(24)), efficiency=0.9)
+    assert_balanced(plan, efficiency=0.9)
+    assert plan.cost <= plan.baseline_cost + 1e-9
+    assert np.all((plan.soc >= 0) & (plan.soc <= 100))
+
+
+def test_reserve_is_never_discharged():
+    plan = run([0.0] * 8, [2.0] * 8, [PEAK] * 8, soc=50.0, min_soc=20.0, c_rate=1.0)
+    assert plan.soc.min() == pytest.approx(20.0)
+    assert plan.battery.sum() * STEP == pytest.approx(-3.0)  # 50 % -> 20 % of 10 kWh
+
+
+def test_below_reserve_the_battery_only_charges():
+    idle = run([0.0] * 3, [2.0] * 3, [PEAK] * 3, soc=5.0, min_soc=20.0)
+    assert np.all(idle.battery == 0)
+
+    # Solar lifts it above the reserve; from then on it may only discharge down to it
+    plan = run([3.0, 0.0, 0.0], [1.0, 2.0, 2.0], [OFF_PEAK] * 3, soc=5.0, min_soc=20.0)
+    assert plan.battery[0] > 0
+    assert plan.soc.min() == pytest.approx(20.0)
+
+
+def test_power_limit_is_respected():
+    plan = run([10.0, 0.0, 0.0], [0.0, 10.0, 10.0], [OFF_PEAK, PEAK, PEAK], soc=10.0, c_rate=0.25)
+    assert np.abs(plan.battery).max() <= 2.5 + 1e-9
+
+
+def test_zero_capacity_matches_the_baseline():
+    plan = run([3.0, 0.0, 1.0], [1.0, 2.0, 2.0], [OFF_PEAK, PEAK, PEAK], battery_size=0.0)
+    assert np.all(plan.battery == 0)
+    assert plan.grid_import.sum() * STEP == pytest.approx(plan.baseline_import)
+    assert plan.cost == pytest.approx(plan.baseline_cost)
+
+
+def test_grid_charging_only_when_allowed():
+    solar = [0.0] * 4
+    load = [0.0, 0.0, 2.0, 2.0]
+    tariff = [OFF_PEAK, OFF_PEAK, PEAK, PEAK]
+    solar_only = run(solar, load, tariff, soc=10.0, c_rate=1.0)
+    assert np.all(solar_only.battery == 0)
+    assert solar_only.cost == pytest.approx(solar_only.baseline_cost)
+
+    from_grid = run(solar, load, tariff, soc=10.0, c_rate=1.0, efficiency=0.95, allow_grid_charging=True)
+    assert from_grid.battery[:2].sum() > 0
+    assert from_grid.grid_import[2:].sum() == pytest.approx(0.0, abs=0.05)  # within one SoC level
+    assert from_grid.cost < from_grid.baseline_cost
+    assert from_grid.soc[-1] == pytest.approx(10.0)  # nothing bought just to sit in the battery
+    assert_balanced(from_grid, efficiency=0.95)
+
+
+def test_battery_never_exports():
+    plan = run([0.0] * 3, [0.5] * 3, [PEAK] * 3, soc=100.0, c_rate=1.0, export_rate=20.0)
+    assert plan.grid_export.sum() == 0
+    assert -plan.battery.min() <= 0.5 + 1e-9
+
+
+def test_plan_dispatch_covers_the_horizon_in_steps():
+    start = 1_767_225_600
+    hourly = {'time': start + 3600 * np.arange(49), 'power': np.full(49, 2.0)}
+    plan = plan_dispatch(hourly, consumption_base=1.0, battery_size=10.0, soc=50.0, start_ts=start,
+                         hours=48, step_minutes=15)
+    assert len(plan.time) == 192 and plan.step_hours == 0.25
+    assert plan.time[1] - plan.time[0] == 900
+    assert plan_summary(plan)['horizon_hours'] == 48
+
+
+def test_optimization_endpoint_returns_a_plan(client, add_samples, open_meteo):
+    add_samples(1)
+    body = client.get('/api/optimization').get_json()
+    assert {'current_tip', 'priority', 'battery_tip', 'timeline', 'tips', 'summary', 'schedule'} <= set(body)
+    assert len(body['schedule']['time']) == len(body['schedule']['soc'])
@@ -0,0 +1,42 @@
+from unittest import mock
+
+
+def test_unchanged_history_is_answered_with_304(client, add_samples):
+    add_samples(3)
+    first = client.get('/api/history')
+    assert first.status_code == 200 and first.headers['Cache-Control'] == 'no-cache'
+    etag = first.headers['ETag']
+
+    again = client.get('/api/history', headers={'If-None-Match': etag})
+    assert again.status_code == 304 and again.get_data() == b''
+
+    add_samples(1, step_minutes=0)
+    assert client.get('/api/history', headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_query_string_is_part_of_the_etag(client, add_samples):
+    add_samples(3)
+    rows = client.get('/api/history')
+    columnar = client.get('/api/history?format=columnar', headers={'If-None-Match': rows.headers['ETag']})
+    assert columnar.status_code == 200
+    assert columnar.headers['ETag'] != rows.headers['ETag']
+
+
+def test_open_ended_range_revalidates_as_time_moves(client, add_samples):
+    add_samples(3)
+    url = '/api/history?days=1'
+    with mock.patch('app.time.time', return_value=1_800_000_000.0):
+        first = client.get(url)
+        assert client.get(url, headers={'If-None-Match': first.headers['ETag']}).status_code == 304
+    with mock.patch('app.time.time', return_value=1_800_000_001.0):
+        later = client.get(url, headers={'If-None-Match': first.headers['ETag']})
+    assert later.status_code == 200
+
+
+def test_closed_range_stays_valid(client, add_samples):
+    add_samples(3)
+    url = '/api/history?start=2026-01-01T00:00:00&end=2026-01-02T00:00:00'
+    first = client.get(url)
+    assert first.get_json()['points'] == 3
+    with mock.patch('app.time.time', return_value=1_900_000_000.0):
+        assert client.get(url, headers={'If-None-Match': first.headers['ETag']}).status_code == 304
@@ -0,0 +1,46 @@
+from types import SimpleNamespace
+
+from config_cache import VersionedCache
+
+
+def counting_loader(values):
+    calls = []
+
+    def load():
+        calls.append(1)
+        return SimpleNamespace(version=len(calls), value=values[0])
+    return load, calls
+
+
+def test_snapshot_is_reused_until_a_version_is_published(tmp_path):
+    values = ['a']
+    load, calls = counting_loader(values)
+    cache = VersionedCache(load, str(tmp_path / 'instance' / 'config.version'))
+    first = cache.get()
+    assert cache.get() is first and len(calls) == 1
+
+    values[0] = 'b'
+    cache.publish(2)
+    assert cache.get().value == 'b' and len(calls) == 2
+
+
+def test_other_processes_notice_the_stamp_file(tmp_path):
+    path = str(tmp_path / 'config.version')
+    values = ['a']
+    reader = VersionedCache(counting_loader(values)[0], path)
+    writer = VersionedCache(counting_loader(values)[0], path)
+    assert reader.get().value == 'a'
+
+    values[0] = 'b'
+    writer.publish(2)
+    assert reader.get().value == 'b'
+
+
+def test_config_update_is_visible_on_the_next_read(backend, client):
+    before = client.get('/api/config').get_json()['config']
+    assert client.post('/api/config', json={'solar_capacity': before['solar_capacity'] + 1}).get_json()['success']
+    after = client.get('/api/config').get_json()['config']
+    assert after['solar_capacity'] == before['solar_capacity'] + 1
+    assert after['version'] == before['version'] + 1
+    with backend.app.app_context():
+        assert backend.get_config() is backend.get_config()
@@ -0,0 +1,56 @@
+from sqlalchemy import create_engine, inspect, text
+
+from database import apply_migrations, engine_options
+
+MIGRATIONS = [
+    (1, 'index t.a', ['CREATE INDEX IF NOT EXISTS ix_t_a ON t (a)']),
+    (2, 't.b', ['ALTER TABLE t ADD COLUMN b INTEGER NOT NULL DEFAULT 7']),
+]
+
+
+def file_engine(tmp_path, name='test.db'):
+    uri = f"sqlite:///{tmp_path / name}"
+    return create_engine(uri, **engine_options(uri))
+
+
+def test_file_databases_get_a_pool_and_memory_databases_do_not():
+    assert engine_options('sqlite:///energy.db')['pool_size'] == 5
+    assert engine_options('sqlite://') == {}
+    assert engine_options('sqlite:///:memory:') == {}
+    assert engine_options('postgresql://db/energy') == {}
+
+
+def test_connections_are_tuned(tmp_path):
+    with file_engine(tmp_path).connect() as conn:
+        assert conn.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+        assert conn.execute(text('PRAGMA synchronous')).scalar() == 1  # NORMAL
+        assert conn.execute(text('PRAGMA busy_timeout')).scalar() == 5000
+
+
+def test_pending_migrations_are_applied_once_in_order(tmp_path):
+    engine = file_engine(tmp_path)
+    with engine.begin() as conn:
+        conn.execute(text('CREATE TABLE t (a INTEGER)'))
+        conn.execute(text('INSERT INTO t (a) VALUES (1)'))
+    assert apply_migrations(engine, MIGRATIONS[:1]) == 1
+    assert apply_migrations(engine, MIGRATIONS) == 2
+    assert apply_migrations(engine, MIGRATIONS) == 2  # nothing left to apply
+
+    assert 'ix_t_a' in {index['name'] for index in inspect(engine).get_indexes('t')}
+    with engine.connect() as conn:
+        assert conn.execute(text('SELECT b FROM t')).scalar() == 7
+        assert conn.execute(text('PRAGMA user_version')).scalar() == 2
+
+
+def test_fresh_database_is_stamped_without_replaying(tmp_path):
+    engine = file_engine(tmp_path)
+    assert apply_migrations(engine, MIGRATIONS, fresh=True) == 2
+    with engine.connect() as conn:
+        assert conn.execute(text('PRAGMA user_version')).scalar() == 2
+
+
+def test_backend_schema_indexes_energy_log_timestamp(backend):
+    with backend.app.app_context():
+        indexes = {index['name']: index['column_names'] for index in inspect(backend.db.engine).get_indexes('energy_log')}
+    assert ['timestamp'] in indexes.values()
+    assert indexes['ix_energy_log_ts_solar_cons'] == ['timestamp', 'solar_generation', 'consumption']
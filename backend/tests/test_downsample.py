@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+from downsample import downsample_indices, lttb_indices, minmax_indices
+
+
+def series(n=100):
+    x = np.arange(n, dtype=np.float64)
+    y = np.sin(x / 7.0)
+    y[37] = 5.0   # spike
+    y[71] = -5.0  # dip
+    return x, y
+
+
+@pytest.mark.parametrize('threshold, expected', [(-1, []), (0, []), (1, [0]), (2, [0, 99])])
+def test_lttb_below_three_points_keeps_the_ends(threshold, expected):
+    x, y = series()
+    assert lttb_indices(x, y, threshold).tolist() == expected
+
+
+@pytest.mark.parametrize('threshold', [100, 101, 1000])
+def test_thresholds_at_or_above_the_length_return_everything(threshold):
+    x, y = series()
+    assert lttb_indices(x, y, threshold).tolist() == list(range(100))
+    assert minmax_indices(y, threshold).tolist() == list(range(100))
+
+
+@pytest.mark.parametrize('threshold', [3, 4, 10, 99])
+def test_lttb_returns_exactly_threshold_sorted_points_with_both_ends(threshold):
+    x, y = series()
+    indices = lttb_indices(x, y, threshold)
+    assert len(indices) == threshold
+    assert indices[0] == 0 and indices[-1] == 99
+    assert np.all(np.diff(indices) > 0)
+
+
+def test_lttb_keeps_spikes():
+    x, y = series()
+    indices = lttb_indices(x, y, 12).tolist()
+    assert 37 in indices and 71 in indices
+
+
+@pytest.mark.parametrize('threshold', [1, 2, 3, 10, 99])
+def test_minmax_stays_within_threshold_and_keeps_extremes(threshold):
+    _, y = series()
+    indices = minmax_indices(y, threshold)
+    assert len(indices) <= max(threshold, 2)
+    assert np.all(np.diff(indices) > 0)
+    assert {37, 71} <= set(indices.tolist())
+
+
+def test_minmax_handles_uneven_buckets():
+    y = np.array([3.0, 1.0, 2.0, 9.0, 0.0, 4.0, 5.0])
+    assert minmax_indices(y, 4).tolist() == [0, 1, 3, 4]  # buckets [3, 1, 2] and [9, 0, 4, 5]
+
+
+def test_unknown_method_is_rejected():
+    x, y = series()
+    with pytest.raises(ValueError):
+        downsample_indices(x, y, 10, 'mean')
+
+
+RANGE = 'start=2026-01-01T08:00:00&end=2026-01-01T09:00:00'
+
+
+def test_small_ranges_read_raw_rows(client, add_samples):
+    add_samples(20)
+    body = client.get(f'/api/history?{RANGE}&points=50').get_json()
+    assert (body['resolution'], body['source_rows'], body['points']) == ('raw', 20, 20)
+
+
+def test_dense_ranges_fall_back_to_hourly_rollups(client, add_samples):
+    add_samples(60)  # 60 raw rows > 3 points * oversample
+    body = client.get(f'/api/history?{RANGE}&points=3').get_json()
+    assert body['resolution'] == 'hour'
+    assert body['source_rows'] == 1
+
+
+def test_long_ranges_use_daily_rollups_and_are_downsampled(client, add_samples):
+    add_samples(5 * 24, step_minutes=60)
+    body = client.get('/api/history?start=2026-01-01T00:00:00&end=2026-01-06T00:00:00&points=3&method=minmax').get_json()
+    assert body['resolution'] == 'day'
+    assert body['source_rows'] == 5
+    assert body['points'] <= 3
+
+
+def test_range_rejects_bad_method_and_reversed_dates(client):
+    assert client.get(f'/api/history?{RANGE}&method=mean').status_code == 400
+    assert client.get('/api/history?start=2026-01-02&end=2026-01-01').status_code == 400
@@ -0,0 +1,75 @@
+import itertools
+
+import pytest
+
+from energy_sampler import EnergySampler
+
+
+def make_sampler(flushed, **kwargs):
+    counter = itertools.count(1)
+
+    def sample():
+        n = next(counter)
+        return {'n': n}, {'temperature': 20.0}, 0.5
+
+    return EnergySampler(sample, flushed.extend, **kwargs)
+
+
+def test_sample_now_queues_rows_for_the_next_flush():
+    flushed = []
+    sampler = make_sampler(flushed, flush_batch=2)
+    sampler.sample_now()
+    assert not sampler.flush_due()
+    sampler.sample_now()
+    assert sampler.flush_due()
+    assert sampler.flush() == 2
+    assert [row['n'] for row in flushed] == [1, 2]
+    assert sampler.stats()['written'] == 2
+
+
+def test_current_outside_the_sampler_thread_is_never_persisted(monkeypatch):
+    flushed = []
+    sampler = make_sampler(flushed, interval=60)
+    clock = [1000.0]
+    monkeypatch.setattr('energy_sampler.time.time', lambda: clock[0])
+
+    first = sampler.current()
+    assert sampler.current() is first  # reused within the interval
+    clock[0] += 60
+    second = sampler.current()
+    assert second.seq == first.seq + 1
+    assert sampler.flush() == 0
+    assert flushed == []
+
+
+@pytest.mark.parametrize('persist', [True, False])
+def test_sample_now_publishes_either_way(persist):
+    sampler = make_sampler([])
+    sample = sampler.sample_now(persist=persist)
+    assert sampler.latest() is sample
+    assert sampler.stats()['pending'] == int(persist)
+
+
+def test_failed_flush_requeues_and_drops_the_oldest_rows_when_full():
+    written = []
+    failing = [True]
+
+    def flush(rows):
+        if failing[0]:
+            # Rows sampled while the write is in progress
+            sampler.sample_now()
+            sampler.sample_now()
+            raise RuntimeError('database is locked')
+        written.extend(rows)
+
+    counter = itertools.count(1)
+    sampler = EnergySampler(lambda: ({'n': next(counter)}, {}, 0.0), flush, max_pending=4)
+    for _ in range(4):
+        sampler.sample_now()
+    assert sampler.flush() == 0
+    assert sampler.stats()['flush_errors'] == 1
+    assert sampler.stats()['pending'] == 4
+
+    failing[0] = False
+    assert sampler.flush() == 4
+    assert [row['n'] for row in written] == [3, 4, 5, 6]
@@ -0,0 +1,68 @@
+import threading
+
+from event_hub import EventHub, format_event
+
+
+def make_hub(state, **kwargs):
+    hub = EventHub(heartbeat=0.05, **kwargs)
+    builds = []
+
+    def payload():
+        builds.append(state['version'])
+        return {'value': state['version']}
+
+    hub.register('energy', lambda: state['version'], payload)
+    return hub, builds
+
+
+def test_format_event():
+    assert format_event('energy', '{"a":1}', 7) == b'id: 7\nevent: energy\ndata: {"a":1}\n\n'
+
+
+def test_payload_is_built_only_when_the_version_changes():
+    state = {'version': 1}
+    hub, builds = make_hub(state)
+    hub.poll_once()
+    hub.poll_once()
+    state['version'] = 2
+    hub.poll_once()
+    assert builds == [1, 2]
+    assert hub.stats()['published'] == 2
+
+
+def test_subscriber_gets_the_current_message_then_changes():
+    state = {'version': 1}
+    hub, _ = make_hub(state)
+    hub.poll_once()
+    stream = hub.subscribe(['energy', 'unknown'])
+    assert next(stream).startswith(b'retry: ')
+    assert b'data: {"value":1}' in next(stream)
+
+    state['version'] = 2
+    threading.Timer(0.01, hub.poll_once).start()
+    assert b'data: {"value":2}' in next(stream)
+    assert hub.stats()['subscribers'] == 1
+    stream.close()
+    assert hub.stats()['subscribers'] == 0
+
+
+def test_idle_subscribers_get_heartbeats():
+    hub, _ = make_hub({'version': 1})
+    hub.poll_once()
+    stream = hub.subscribe(['energy'])
+    next(stream), next(stream)
+    assert next(stream) == b': keepalive\n\n'
+    stream.close()
+
+
+def test_failing_topic_does_not_stop_the_others():
+    hub, _ = make_hub({'version': 1})
+    hub.register('broken', lambda: 1, lambda: 1 / 0)
+    hub.poll_once()
+    assert hub.stats()['errors'] == 1 and hub.stats()['published'] == 1
+
+
+def test_stream_endpoint_rejects_unknown_topics(client):
+    response = client.get('/api/stream?topics=energy,nope')
+    assert response.status_code == 400
+    assert 'nope' in response.get_json()['error']
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from fleet_simulation import SUMMARY_FIELDS, clamped_scan, make_fleet, random_fleet, run_fleet, simulate, summarize, time_grid
+
+T0 = 1_767_225_600  # 2026-01-01T00:00:00Z
+
+
+def sequential_scan(start, deltas, lo=0.0, hi=100.0):
+    out = np.empty_like(deltas)
+    for row in range(deltas.shape[0]):
+        level = start[row]
+        for i, delta in enumerate(deltas[row]):
+            level = min(max(level + delta, lo), hi)
+            out[row, i] = level
+    return out
+
+
+@pytest.mark.parametrize('steps', [1, 2, 3, 7, 64, 100, 257])
+def test_clamped_scan_matches_a_sequential_loop(steps):
+    rng = np.random.default_rng(steps)
+    deltas = rng.normal(0, 30, (5, steps))
+    start = rng.uniform(0, 100, 5)
+    assert clamped_scan(start, deltas) == pytest.approx(sequential_scan(start, deltas))
+
+
+def test_clamped_scan_with_custom_bounds_and_saturation():
+    deltas = np.array([[5.0] * 10 + [-5.0] * 10])
+    expected = sequential_scan(np.array([18.0]), deltas, lo=10.0, hi=30.0)
+    assert clamped_scan(np.array([18.0]), deltas, lo=10.0, hi=30.0) == pytest.approx(expected)
+    assert expected.max() == 30.0 and expected.min() == 10.0
+
+
+def test_clamped_scan_edge_shapes():
+    assert clamped_scan(np.array([50.0, 60.0]), np.empty((2, 0))).shape == (2, 0)
+    assert clamped_scan(50.0, np.array([60.0, -200.0, 10.0])).tolist() == [100.0, 0.0, 10.0]
+
+
+def test_make_fleet_broadcasts_scalars():
+    fleet = make_fleet(5.0, 0.85, [2.0, 3.0, 4.0], 10.0, 19.0, 75.0)
+    assert len(fleet) == 3
+    assert fleet.solar_capacity.tolist() == [5.0] * 3
+    assert fleet.utc_offset.tolist() == [5.0] * 3
+    assert len(fleet.chunk(1, 3)) == 2
+
+
+def test_simulate_physics_and_energy_balance():
+    fleet = make_fleet([4.0, 8.0, 12.0, 6.0], 0.85, [2.0, 3.0, 5.0, 4.0], [5.0, 10.0, 20.0, 8.0],
+                       [19.0, 28.6, 12.9, -33.9], [72.9, 77.2, 77.6, 151.2], utc_offset=[5, 5, 5, 10])
+    times = time_grid(T0, days=3, resolution_minutes=15)
+    result = simulate(fleet, times, seed=2)
+    assert result['solar'].shape == (4, len(times)) and result['step_hours'] == 0.25
+    assert np.all((result['battery'] >= 0) & (result['battery'] <= 100))
+    assert np.all(result['solar'] >= 0) and (result['solar'] == 0).any()
+    # Weather is drawn per local clock hour, so the four quarter-hours of an hour agree
+    assert np.all(result['weather'].reshape(4, -1, 4) == result['weather'].reshape(4, -1, 4)[..., :1])
+
+    summary = summarize(fleet, result)
+    stored = (result['battery'][:, -1] - 50.0) / 100 * fleet.battery_size
+    net = summary['solar_kwh'] - summary['consumption_kwh']
+    assert net == pytest.approx(summary['grid_export_kwh'] - summary['grid_import_kwh'] + stored)
+
+
+def test_same_seed_gives_the_same_simulation():
+    fleet = random_fleet(3, seed=1)
+    times = time_grid(T0, days=1)
+    first, second = simulate(fleet, times, seed=7), simulate(fleet, times, seed=7)
+    assert all(np.array_equal(first[name], second[name]) for name in ('solar', 'consumption', 'battery'))
+
+
+def test_run_fleet_results_do_not_depend_on_workers():
+    fleet = random_fleet(6, seed=3)
+    times = time_grid(T0, days=2)
+    single, series, stats = run_fleet(fleet, times, seed=11, workers=1, chunk_sites=2, keep_series=True)
+    pooled, _, pooled_stats = run_fleet(fleet, times, seed=11, workers=2, chunk_sites=2)
+    for name in SUMMARY_FIELDS:
+        assert np.array_equal(single[name], pooled[name])
+    assert series['battery'].shape == (6, 48)
+    assert (stats['chunks'], stats['workers'], pooled_stats['workers']) == (3, 1, 2)
+    assert stats['site_hours'] == 6 * 48
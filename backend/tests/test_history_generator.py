@@ -0,0 +1,55 @@
+from datetime import datetime
+
+import numpy as np
+
+from history_generator import HISTORY_COLUMNS, generate_history, history_dicts, history_rows
+
+END = datetime(2026, 6, 1, 12, 0)
+
+
+def make(**kwargs):
+    options = dict({'days': 2, 'resolution_minutes': 30, 'seed': 7}, **kwargs)
+    return generate_history(10, 0.85, 5, 10, end=END, **options)
+
+
+def test_shape_and_spacing():
+    history = make()
+    assert set(history) == set(HISTORY_COLUMNS)
+    assert all(len(history[name]) == 96 for name in HISTORY_COLUMNS)
+    steps = np.diff(history['timestamp']).astype('timedelta64[m]').astype(int)
+    assert set(steps.tolist()) == {30}
+    assert history['timestamp'][0] == np.datetime64('2026-05-30T12:00')
+
+
+def test_same_seed_same_history():
+    first, second = make(), make()
+    for name in HISTORY_COLUMNS:
+        assert np.array_equal(first[name], second[name])
+    assert not np.array_equal(first['consumption'], make(seed=8)['consumption'])
+
+
+def test_values_stay_physical():
+    history = make(days=7, resolution_minutes=15)
+    assert history['solar_generation'].min() >= 0 and history['solar_generation'].max() <= 10
+    assert history['battery_level'].min() >= 0 and history['battery_level'].max() <= 100
+    assert history['consumption'].min() > 0
+
+
+def test_rows_and_dicts_round_trip_the_columns():
+    history = make(days=1, resolution_minutes=60)
+    rows = history_rows(history)
+    assert len(rows) == 24 and len(rows[0]) == len(HISTORY_COLUMNS)
+    assert rows[0][0] == '2026-05-31 12:00:00.000000'
+    dicts = history_dicts(history)
+    assert dicts[0]['timestamp'] == datetime(2026, 5, 31, 12, 0)
+    assert dicts[-1]['weather_desc'] == history['weather_desc'][-1]
+
+
+def test_seeding_bulk_inserts_readable_rows(backend, client):
+    with backend.app.app_context():
+        backend.seed_history_data(days=1, resolution_minutes=60, seed=3)
+        assert backend.EnergyLog.query.count() == 24
+        assert backend.EnergyRollupHourly.query.count() == 24
+        newest = backend.EnergyLog.query.order_by(backend.EnergyLog.timestamp.desc()).first()
+    assert isinstance(newest.timestamp, datetime)
+    assert client.get('/api/history').status_code == 200
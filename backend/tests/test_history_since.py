@@ -0,0 +1,63 @@
+from datetime import datetime
+
+
+def since(client, cursor, **params):
+    query = ''.join(f'&{key}={value}' for key, value in params.items())
+    response = client.get(f'/api/history?since={cursor}{query}')
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_empty_table_returns_an_empty_delta(client):
+    body = since(client, 0)
+    assert (body['cursor'], body['reset'], body['history']) == (0, False, [])
+
+
+def test_cursor_past_an_empty_table_resets(client):
+    body = since(client, 7)
+    assert (body['cursor'], body['reset'], body['history']) == (0, True, [])
+
+
+def test_first_rows_after_an_empty_table_are_appended(client, add_samples):
+    cursor = since(client, 0)['cursor']
+    add_samples(2)
+    body = since(client, cursor)
+    assert not body['reset']
+    assert [row['solar_generation'] for row in body['history']] == [0, 1]
+
+
+def test_only_rows_after_the_cursor_are_returned(client, add_samples):
+    add_samples(4)
+    snapshot = client.get('/api/history?since=0').get_json()
+    add_samples(2, start=datetime(2026, 1, 1, 8, 4))
+    body = since(client, snapshot['cursor'], format='columnar')
+    assert not body['reset']
+    assert body['cursor'] == snapshot['cursor'] + 2
+    assert len(body['history']['timestamp']) == 2
+    assert since(client, body['cursor'])['history'] == []
+
+
+def test_iso_cursor_maps_to_the_last_row_at_or_before_it(client, add_samples):
+    add_samples(5)  # 08:00 .. 08:04
+    body = since(client, '2026-01-01T08:02:30')
+    assert [row['timestamp'] for row in body['history']] == ['08:03:00', '08:04:00']
+    assert len(since(client, '2025-12-31')['history']) == 5
+
+
+def test_more_new_rows_than_the_buffer_resets(client, add_samples):
+    add_samples(60)
+    body = since(client, 0)
+    assert body['reset'] and len(body['history']) == 50
+    assert body['history'][-1]['solar_generation'] == 59
+
+
+def test_cursor_beyond_the_newest_row_resets_after_a_reseed(client, add_samples):
+    add_samples(3)
+    body = since(client, 1000)
+    assert body['reset'] and len(body['history']) == 3
+
+
+def test_bad_cursor_is_rejected(client):
+    response = client.get('/api/history?since=yesterday')
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
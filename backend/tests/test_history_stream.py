@@ -0,0 +1,33 @@
+def test_stream_messages_chain_by_cursor(backend, client, add_samples):
+    backend._history_stream['cursor'] = None
+    add_samples(3)
+    with backend.app.app_context():
+        first = backend.history_stream_payload()
+        add_samples(2)
+        second = backend.history_stream_payload()
+        third = backend.history_stream_payload()
+
+    assert first['reset'] and first['since'] is None
+    assert len(first['history']['timestamp']) == 3
+    assert not second['reset']
+    assert second['since'] == first['cursor']
+    assert len(second['history']['timestamp']) == 2
+    assert third['since'] == third['cursor'] == second['cursor']
+    assert third['history']['timestamp'] == []
+
+
+def test_client_catch_up_request_returns_the_missed_rows(backend, client, add_samples):
+    backend._history_stream['cursor'] = None
+    add_samples(3)
+    with backend.app.app_context():
+        first = backend.history_stream_payload()
+        add_samples(2)
+        backend.history_stream_payload()  # missed by the client
+        add_samples(1)
+        third = backend.history_stream_payload()
+    assert third['since'] != first['cursor']
+
+    delta = client.get(f"/api/history?since={first['cursor']}&format=columnar").get_json()
+    assert not delta['reset']
+    assert delta['cursor'] == third['cursor']
+    assert len(delta['history']['timestamp']) == 3
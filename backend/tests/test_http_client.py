@@ -0,0 +1,42 @@
+from unittest import mock
+
+import pytest
+
+import http_client
+
+
+@pytest.fixture(autouse=True)
+def fresh_session():
+    http_client.close_session()
+    yield
+    http_client.close_session()
+
+
+def test_one_pooled_session_per_process():
+    session = http_client.get_session()
+    assert http_client.get_session() is session
+    adapter = session.get_adapter('https://api.open-meteo.com')
+    assert adapter._pool_maxsize == http_client.HTTP_POOL_MAXSIZE
+    assert session.headers['Connection'] == 'keep-alive'
+
+
+def test_only_idempotent_requests_are_retried_on_throttling_and_server_errors():
+    retry = http_client.get_session().get_adapter('https://api.open-meteo.com').max_retries
+    assert retry.total == http_client.HTTP_RETRIES
+    assert set(retry.allowed_methods) == {'GET', 'HEAD'}
+    assert {429, 503} <= set(retry.status_forcelist)
+    assert retry.is_retry('GET', 503) and not retry.is_retry('POST', 503)
+
+
+def test_http_get_applies_connect_and_read_timeouts():
+    session = http_client.get_session()
+    with mock.patch.object(session, 'get') as get:
+        http_client.http_get('https://example.test', params={'q': 1})
+    get.assert_called_once_with('https://example.test', params={'q': 1},
+                                timeout=(http_client.HTTP_CONNECT_TIMEOUT, http_client.HTTP_READ_TIMEOUT))
+
+
+def test_close_session_starts_a_new_pool():
+    session = http_client.get_session()
+    http_client.close_session()
+    assert http_client.get_session() is not session
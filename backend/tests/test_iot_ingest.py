@@ -0,0 +1,90 @@
+import struct
+
+import numpy as np
+import pytest
+
+from iot_ingest import FRAME_HEADER, MAX_BATCH, parse_frame, parse_json, valid_device
+
+
+def frame(samples, device=b'esp32-01', base_ts=1000, magic=b'SV', version=1, count=None):
+    header = FRAME_HEADER.pack(magic, version, device, base_ts, len(samples) if count is None else count)
+    return header + b''.join(struct.pack('<HH', delta, mv) for delta, mv in samples)
+
+
+def test_binary_frame_is_decoded():
+    batch = parse_frame(frame([(999, 12100), (250, 12200), (250, 0)]))
+    assert batch.device == 'esp32-01'
+    assert batch.timestamps.tolist() == [1000, 1250, 1500]  # the first delta is ignored
+    assert np.allclose(batch.voltages, [12.1, 12.2, 0.0])
+    assert len(batch) == 3
+
+
+def test_blank_frame_device_is_the_default_device():
+    assert parse_frame(frame([(0, 5000)], device=b'')).device == 'default'
+
+
+@pytest.mark.parametrize('payload, message', [
+    (b'SV\x01', 'too short'),
+    (frame([(0, 1)], magic=b'XX'), 'unsupported'),
+    (frame([(0, 1)], version=2), 'unsupported'),
+    (frame([(0, 1)], count=2), 'does not match'),
+    (frame([(0, 1)]) + b'\0', 'does not match'),
+    (frame([]), 'empty batch'),
+    (frame([(0, 1)], device=b'../../etc'), 'invalid device id'),
+    (frame([(0, 1)], device=b'\xff\xfe'), 'invalid device id'),
+])
+def test_malformed_frames_are_rejected(payload, message):
+    with pytest.raises(ValueError, match=message):
+        parse_frame(payload)
+
+
+def test_json_single_batch_and_list_forms():
+    single = parse_json({'voltage': 12.5, 'timestamp': 10})
+    assert (single.device, single.voltages.tolist()) == ('default', [12.5])
+    batch = parse_json({'device': 'roof', 'readings': [{'voltage': 1, 'timestamp': 1}, {'voltage': 2, 'timestamp': 2}]})
+    assert (batch.device, batch.timestamps.tolist()) == ('roof', [1, 2])
+    assert len(parse_json([{'voltage': 1, 'timestamp': 1}])) == 1
+
+
+@pytest.mark.parametrize('data', [
+    'text', {'readings': 'x'}, {'readings': [{'voltage': 'high'}]}, {'readings': [1, 2]},
+    {'readings': [{'voltage': 1, 'timestamp': 5}, {'voltage': 1, 'timestamp': 4}]},
+    {'readings': [{'voltage': float('nan'), 'timestamp': 1}]},
+    {'voltage': 150, 'timestamp': 1}, {'voltage': -1, 'timestamp': 1},
+    {'readings': [{'voltage': 1, 'timestamp': i} for i in range(MAX_BATCH + 1)]},
+    {'device': '..', 'voltage': 1},
+])
+def test_invalid_json_is_rejected(data):
+    with pytest.raises(ValueError):
+        parse_json(data)
+
+
+@pytest.mark.parametrize('device, ok', [
+    ('esp32-01', True), ('A_b-9', True), ('x' * 64, True),
+    ('', False), ('.', False), ('..', False), ('-x', False), ('a/b', False), ('a.b', False), ('x' * 65, False),
+])
+def test_device_ids(device, ok):
+    assert valid_device(device) is ok
+
+
+def test_solar_endpoint_accepts_json_and_binary_batches(client):
+    response = client.post('/api/solar', json={'device': 'roof', 'readings': [{'voltage': 12, 'timestamp': 0}]})
+    assert response.get_json() == {'success': True, 'device': 'roof', 'accepted': 1}
+    response = client.post('/api/solar', data=frame([(0, 13000), (100, 13100)], device=b'roof'),
+                           content_type='application/octet-stream')
+    assert response.get_json()['accepted'] == 2
+    assert client.get('/api/solar?device=roof').get_json()['voltage'] == 13.1
+    assert client.post('/api/solar', data=b'junk', content_type='application/octet-stream').status_code == 400
+    assert client.get('/api/solar?device=..').status_code == 400
+
+
+def test_solar_endpoint_reports_a_buffer_filled_to_capacity(backend, client):
+    capacity = backend.iot_buffers.capacity
+    for offset in range(0, capacity, 30):  # the firmware's 30-sample uploads
+        readings = [{'voltage': 12 + i / 1000, 'timestamp': i} for i in range(offset, offset + 30)]
+        assert client.post('/api/solar', json={'device': 'full', 'readings': readings}).status_code == 200
+    body = client.get('/api/solar?device=full&points=%d' % capacity).get_json()
+    assert body['voltage'] == pytest.approx(12 + (capacity - 1) / 1000)
+    assert body['status'] == 'Charging'
+    assert len(body['history']) == capacity
+
@@ -0,0 +1,88 @@
+import gzip
+from datetime import datetime
+
+import numpy as np
+import pytest
+from flask import Flask, jsonify, request
+
+import json_response
+from json_response import FastJSONProvider, columnar, compress_response, install_compression, negotiate_encoding, wants_columnar
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    install_compression(app, min_size=64)
+
+    @app.route('/big')
+    def big():
+        return jsonify({'values': list(range(200))})
+
+    @app.route('/small')
+    def small():
+        return jsonify({'ok': True})
+
+    @app.route('/text')
+    def text():
+        return 'x' * 500, 200, {'Content-Type': 'text/html'}
+
+    return app
+
+
+def test_columnar_transposes_rows_in_field_order():
+    rows = [(1, 'a', 0.5), (2, 'b', 1.5)]
+    assert columnar(rows, ('id', 'name', 'value')) == {'id': [1, 2], 'name': ['a', 'b'], 'value': [0.5, 1.5]}
+
+
+def test_columnar_of_no_rows_keeps_every_field():
+    assert columnar([], ('id', 'name')) == {'id': [], 'name': []}
+
+
+def test_wants_columnar_only_for_the_exact_format():
+    assert wants_columnar({'format': 'columnar'})
+    assert not wants_columnar({'format': 'rows'})
+    assert not wants_columnar({})
+
+
+def test_provider_serializes_numpy_and_datetimes(app):
+    with app.app_context():
+        body = app.json.loads(app.json.dumps({'a': np.arange(3), 'b': np.float64(1.5)}))
+        assert body == {'a': [0, 1, 2], 'b': 1.5}
+        stamp = app.json.loads(app.json.dumps({'t': datetime(2026, 1, 1, 8)}))['t']
+        assert stamp == 'Thu, 01 Jan 2026 08:00:00 GMT'
+
+
+def test_large_json_is_gzipped_for_clients_that_accept_it(app):
+    response = app.test_client().get('/big', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert app.json.loads(gzip.decompress(response.get_data())) == {'values': list(range(200))}
+
+
+def test_small_or_unaccepted_responses_are_left_alone(app):
+    client = app.test_client()
+    assert 'Content-Encoding' not in client.get('/small', headers={'Accept-Encoding': 'gzip'}).headers
+    assert 'Content-Encoding' not in client.get('/big').headers
+    assert 'Content-Encoding' not in client.get('/text', headers={'Accept-Encoding': 'gzip'}).headers
+
+
+def test_error_responses_are_not_compressed(app):
+    response = app.test_client().get('/missing', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 404 and 'Content-Encoding' not in response.headers
+
+
+def test_brotli_is_preferred_only_when_installed(monkeypatch):
+    accepts = {'br': 1, 'gzip': 1}
+    monkeypatch.setattr(json_response, 'brotli', None)
+    assert negotiate_encoding(accepts) == 'gzip'
+    monkeypatch.setattr(json_response, 'brotli', object())
+    assert negotiate_encoding(accepts) == 'br'
+    assert negotiate_encoding({'br': 0, 'gzip': 0}) is None
+
+
+def test_already_encoded_responses_are_not_compressed_twice(app):
+    with app.test_request_context(headers={'Accept-Encoding': 'gzip'}):
+        response = app.response_class(b'{}' * 100, mimetype='application/json')
+        response.headers['Content-Encoding'] = 'identity'
+        assert compress_response(request, response, min_size=1).get_data() == b'{}' * 100
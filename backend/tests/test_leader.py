@@ -0,0 +1,56 @@
+import os
+import subprocess
+import sys
+
+from leader import LeaderLock
+
+
+def test_only_one_holder_leads(tmp_path):
+    path = str(tmp_path / 'instance' / 'background.lock')
+    first = LeaderLock(path)
+    second = LeaderLock(path, retry_seconds=0)
+    assert first.acquire()
+    assert not second.acquire()
+    assert first.acquire()  # stays leader
+    assert open(path).read().strip() == str(os.getpid())
+
+
+def test_follower_takes_over_after_release(tmp_path):
+    path = str(tmp_path / 'background.lock')
+    first = LeaderLock(path)
+    second = LeaderLock(path, retry_seconds=0)
+    assert first.acquire()
+    assert not second.acquire()
+    first.release()
+    assert not first.is_leader()
+    assert second.acquire()
+
+
+def test_follower_waits_retry_seconds_between_attempts(tmp_path):
+    path = str(tmp_path / 'background.lock')
+    first = LeaderLock(path)
+    second = LeaderLock(path, retry_seconds=3600)
+    assert first.acquire()
+    assert not second.acquire()
+    first.release()
+    assert not second.acquire()  # not retried yet
+
+
+def test_lock_is_released_when_the_leader_process_exits(tmp_path):
+    path = str(tmp_path / 'background.lock')
+    services = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'services')
+    code = f"import sys; sys.path.insert(0, {services!r}); from leader import LeaderLock; print(LeaderLock({path!r}).acquire())"
+    assert subprocess.run([sys.executable, '-c', code], capture_output=True, text=True).stdout.strip() == 'True'
+    assert LeaderLock(path).acquire()
+
+
+def test_backend_workers_only_start_in_the_leader(backend, tmp_path, monkeypatch):
+    path = str(tmp_path / 'background.lock')
+    holder = LeaderLock(path)
+    assert holder.acquire()  # another worker leads
+    monkeypatch.setattr(backend, 'background_leader', LeaderLock(path))
+    assert backend.start_background_workers() is False
+    assert not backend.energy_sampler.is_running()
+    assert not backend.site_sampler.is_running()
+    assert not backend.weather_poller.is_running()
+    holder.release()
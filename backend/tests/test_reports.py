@@ -0,0 +1,37 @@
+from datetime import datetime
+
+import pytest
+
+RANGE = 'start=2026-01-01&end=2026-01-04'
+
+
+def test_monthly_reports_one_row_per_day(client, add_samples):
+    # 4 samples a day for 3 days: solar 0..11, consumption 2
+    add_samples(12, start=datetime(2026, 1, 1), step_minutes=360)
+    days = client.get(f'/api/monthly?{RANGE}').get_json()
+    assert [d['date'] for d in days] == ['2026-01-01', '2026-01-02', '2026-01-03']
+    assert [d['solar'] for d in days] == [1.5 * 24, 5.5 * 24, 9.5 * 24]
+    assert days[0]['consumption'] == 48.0
+    assert days[2]['peak_generation'] == 11.0
+    assert (days[0]['min_temperature'], days[0]['max_temperature']) == (25.0, 27.0)
+
+
+def test_monthly_range_is_half_open(client, add_samples):
+    add_samples(12, start=datetime(2026, 1, 1), step_minutes=360)
+    days = client.get('/api/monthly?start=2026-01-02&end=2026-01-03').get_json()
+    assert [d['date'] for d in days] == ['2026-01-02']
+
+
+def test_monthly_columnar_format(client, add_samples):
+    add_samples(8, start=datetime(2026, 1, 1), step_minutes=360)
+    columns = client.get(f'/api/monthly?{RANGE}&format=columnar').get_json()
+    assert columns['date'] == ['2026-01-01', '2026-01-02']
+    assert len(columns['solar']) == 2
+
+
+@pytest.mark.parametrize('query', ['days=0', 'days=abc', 'start=2026-01-05&end=2026-01-01',
+                                   'start=2020-01-01&end=2026-01-01', 'start=not-a-date'])
+def test_monthly_rejects_bad_ranges(client, query):
+    response = client.get(f'/api/monthly?{query}')
+    assert response.status_code == 400
+    assert not response.get_json()['success']
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from ring_buffer import DeviceRingBuffer, RingBufferRegistry
+
+
+def contents(buffer, n=None):
+    timestamps, voltages = buffer.window(n)
+    return timestamps.tolist(), voltages.tolist()
+
+
+def test_empty_buffer():
+    buffer = DeviceRingBuffer(4)
+    assert len(buffer) == 0 and buffer.latest() is None
+    assert contents(buffer) == ([], [])
+
+
+def test_appends_wrap_and_keep_the_newest_samples():
+    buffer = DeviceRingBuffer(3)
+    for i in range(5):
+        buffer.append(i, i / 10)
+    assert len(buffer) == 3
+    assert contents(buffer) == ([2, 3, 4], [0.2, 0.3, 0.4])
+    assert buffer.latest() == (4, 0.4)
+    assert contents(buffer, 2) == ([3, 4], [0.3, 0.4])
+
+
+@pytest.mark.parametrize('batches', [[5], [2, 2], [3, 4], [1, 9], [4, 4, 4]])
+def test_batched_extend_matches_single_appends(batches):
+    batched, single = DeviceRingBuffer(4), DeviceRingBuffer(4)
+    start = 0
+    for size in batches:
+        ts = np.arange(start, start + size)
+        batched.extend(ts, ts * 1.5)
+        for t in ts.tolist():
+            single.append(t, t * 1.5)
+        start += size
+    assert contents(batched) == contents(single)
+    assert batched.latest() == single.latest()
+
+
+def test_segments_are_views_split_at_the_wrap():
+    buffer = DeviceRingBuffer(4)
+    buffer.extend([0, 1], [0.0, 1.0])
+    buffer.extend([2, 3, 4, 5], [2.0, 3.0, 4.0, 5.0])
+    parts = buffer.segments()
+    assert [p[0].tolist() for p in parts] == [[2, 3], [4, 5]]
+    assert all(np.shares_memory(p[0], buffer.timestamps) for p in parts)
+
+
+
+def test_exactly_full_buffer_is_one_segment():
+    buffer = DeviceRingBuffer(4)
+    buffer.extend([0, 1, 2, 3], [0.0, 1.0, 2.0, 3.0])
+    parts = buffer.segments()
+    assert [p[0].tolist() for p in parts] == [[0, 1, 2, 3]]
+    assert contents(buffer, 2) == ([2, 3], [2.0, 3.0])
+    assert buffer.latest() == (3, 3.0)
+
+
+@pytest.mark.parametrize('batches', [[2, 2], [3, 5], [1, 1, 1, 1], [6, 2]])
+def test_wrap_ending_at_slot_zero_keeps_the_newest_samples(batches):
+    buffer = DeviceRingBuffer(4)
+    ts = 0
+    for size in batches:
+        buffer.extend(range(ts, ts + size), [float(t) for t in range(ts, ts + size)])
+        ts += size
+    parts = buffer.segments()
+    assert all(len(p[1]) for p in parts)
+    assert contents(buffer) == (list(range(ts - 4, ts)), [float(t) for t in range(ts - 4, ts)])
+    assert contents(buffer, 3)[0] == list(range(ts - 3, ts))
+
+def test_registry_creates_buffers_and_tracks_the_last_device():
+    registry = RingBufferRegistry(capacity=2)
+    registry.extend('a', [1], [1.0])
+    registry.extend('b', [2, 3, 4], [2.0, 3.0, 4.0])
+    assert registry.seq == 2 and registry.last_device == 'b'
+    assert sorted(registry.devices()) == ['a', 'b']
+    assert contents(registry.get('b')) == ([3, 4], [3.0, 4.0])
+    assert registry.get('missing') is None
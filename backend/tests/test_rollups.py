@@ -0,0 +1,52 @@
+from datetime import datetime, timedelta
+
+from rollups import aggregate_rows, hour_bucket
+
+T0 = datetime(2026, 1, 1, 10, 15)
+
+
+def sample(minutes, generation, battery=50.0):
+    return {'timestamp': T0 + timedelta(minutes=minutes), 'total_generation': generation,
+            'consumption': 1.0, 'temperature': 20.0, 'battery_level': battery}
+
+
+def rollup_rows(backend, model):
+    columns = [c.name for c in model.__table__.columns]
+    with backend.app.app_context():
+        return [tuple(getattr(r, c) for c in columns) for r in model.query.order_by(model.bucket).all()]
+
+
+def test_aggregate_rows_folds_samples_into_buckets():
+    hours = aggregate_rows([sample(0, 2.0, 40.0), sample(30, 4.0, 45.0), sample(50, 3.0, 41.0)], hour_bucket)
+    assert len(hours) == 2
+    first, second = sorted(hours, key=lambda agg: agg['bucket'])
+    assert first['bucket'] == datetime(2026, 1, 1, 10)
+    assert (first['sample_count'], first['generation_sum']) == (2, 6.0)
+    assert (first['generation_min'], first['generation_max']) == (2.0, 4.0)
+    assert (first['last_timestamp'], first['last_battery_level']) == (T0 + timedelta(minutes=30), 45.0)
+    assert second['sample_count'] == 1
+
+
+def test_incremental_upserts_match_a_full_rebuild(backend, client, add_samples):
+    start = datetime(2026, 1, 1, 22, 30)
+    add_samples(5, start=start, step_minutes=20)
+    add_samples(7, start=start + timedelta(minutes=100), step_minutes=20)  # crosses midnight
+    hourly = rollup_rows(backend, backend.EnergyRollupHourly)
+    daily = rollup_rows(backend, backend.EnergyRollupDaily)
+    assert sum(row[1] for row in daily) == 12
+
+    with backend.app.app_context():
+        backend.rebuild_rollups()
+    assert rollup_rows(backend, backend.EnergyRollupHourly) == hourly
+    assert rollup_rows(backend, backend.EnergyRollupDaily) == daily
+
+
+def test_late_batch_does_not_replace_the_newest_battery_level(backend, client):
+    backend.write_samples([dict(sample(40, 1.0, 80.0), efficiency=0, solar_generation=1.0, weather_desc='Clear')])
+    backend.write_samples([dict(sample(10, 5.0, 20.0), efficiency=0, solar_generation=5.0, weather_desc='Clear')])
+    with backend.app.app_context():
+        hour = backend.EnergyRollupHourly.query.one()
+    assert hour.sample_count == 2
+    assert (hour.generation_min, hour.generation_max) == (1.0, 5.0)
+    assert hour.last_battery_level == 80.0
+    assert hour.last_timestamp == T0 + timedelta(minutes=40)
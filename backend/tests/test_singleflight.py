@@ -0,0 +1,86 @@
+import threading
+import time
+
+import weather_service
+from singleflight import SingleFlight
+
+
+def run_concurrently(n, fn):
+    results, errors = [], []
+
+    def call():
+        try:
+            results.append(fn())
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(n)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+def blocking(calls, release, outcome):
+    def fn():
+        calls.append(1)
+        release.wait(5)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+    return fn
+
+
+def wait_for(flight, coalesced):
+    for _ in range(500):
+        if flight.stats()['coalesced'] >= coalesced:
+            return
+        time.sleep(0.01)
+
+
+def test_concurrent_callers_share_one_call():
+    flight, calls, release = SingleFlight(), [], threading.Event()
+    threads, results, errors = run_concurrently(5, lambda: flight.do('k', blocking(calls, release, 42)))
+    wait_for(flight, 4)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert calls == [1] and results == [42] * 5 and not errors
+    assert flight.stats() == {'executed': 1, 'coalesced': 4, 'in_flight': 0}
+
+
+def test_waiters_share_the_exception_and_the_next_call_starts_fresh():
+    flight, calls, release = SingleFlight(), [], threading.Event()
+    threads, results, errors = run_concurrently(3, lambda: flight.do('k', blocking(calls, release, ValueError('boom'))))
+    wait_for(flight, 2)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert len(errors) == 3 and not results
+    assert flight.do('k', lambda: 'ok') == 'ok'
+    assert flight.stats()['executed'] == 2
+
+
+def test_different_keys_run_independently():
+    flight = SingleFlight()
+    assert flight.do('a', lambda: 1) == 1
+    assert flight.do('b', lambda: 2) == 2
+    assert flight.stats()['coalesced'] == 0
+
+
+def test_concurrent_cold_weather_requests_make_one_upstream_call_each(open_meteo, monkeypatch):
+    release = threading.Event()
+    fake = open_meteo
+
+    def slow(url, params=None, timeout=None):
+        release.wait(5)
+        return fake(url, params, timeout)
+
+    monkeypatch.setattr(weather_service, 'http_get', slow)
+    threads, results, errors = run_concurrently(6, lambda: weather_service.get_weather('Pune'))
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert not errors and all(r['success'] for r in results)
+    assert (fake.count('geocoding'), fake.count('forecast')) == (1, 1)
+
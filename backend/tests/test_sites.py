@@ -0,0 +1,98 @@
+from datetime import datetime, timezone
+
+import pytest
+
+import weather_service
+from sites import SITE_DEFAULTS, parse_site, site_reading
+
+SITE = {'name': 'Roof', 'city': 'Mumbai', 'latitude': 19.08, 'longitude': 72.88, 'solar_capacity': 10.0,
+        'battery_size': 10.0, 'panel_efficiency': 0.8, 'consumption_base': 2.0}
+CLEAR = {'temperature': 30.0, 'weather': 'Clear', 'clouds': 0, 'latitude': 19.08, 'longitude': 72.88}
+NOON = datetime(2026, 1, 1, 6, 30, tzinfo=timezone.utc).timestamp()      # around local noon in Mumbai
+MIDNIGHT = datetime(2026, 1, 1, 18, 30, tzinfo=timezone.utc).timestamp()
+
+
+def test_parse_site_fills_defaults_and_city():
+    fields = parse_site({'name': ' Roof ', 'solar_capacity': '7.5'})
+    assert fields == dict(SITE_DEFAULTS, name='Roof', city='Roof', solar_capacity=7.5)
+
+
+@pytest.mark.parametrize('data, error', [
+    ([], 'expected a JSON object'),
+    ({}, 'name is required'),
+    ({'name': '  '}, 'name must not be empty'),
+    ({'name': 'a', 'latitude': 91, 'longitude': 0}, 'latitude is out of range'),
+    ({'name': 'a', 'latitude': 10}, 'latitude and longitude must be given together'),
+    ({'name': 'a', 'battery_size': 0}, 'battery_size is out of range'),
+    ({'name': 'a', 'panel_efficiency': 1.5}, 'panel_efficiency is out of range'),
+    ({'name': 'a', 'solar_capacity': 'lots'}, 'solar_capacity must be a number'),
+])
+def test_parse_site_rejects_invalid_fields(data, error):
+    with pytest.raises(ValueError, match=error):
+        parse_site(data)
+
+
+def test_partial_parse_returns_only_given_fields():
+    assert parse_site({'battery_size': 5, 'solar_capacity': None}, partial=True) == {'battery_size': 5.0}
+    assert parse_site({'solar_capacity': 0}, partial=True) == {'solar_capacity': 0.0}
+
+
+def test_site_reading_by_day_and_night():
+    day = site_reading(SITE, CLEAR, 50.0, step_hours=1.0, now=NOON)
+    assert day['solar_generation'] > day['consumption'] > 0
+    assert day['battery_level'] > 50.0
+
+    night = site_reading(SITE, CLEAR, 50.0, step_hours=1.0, now=MIDNIGHT)
+    assert night['solar_generation'] == 0
+    assert night['battery_level'] == round(50.0 - night['consumption'] * 10, 1)
+
+
+def test_site_reading_clamps_the_battery_and_can_skip_simulation():
+    assert site_reading(SITE, CLEAR, 99.0, step_hours=10.0, now=NOON)['battery_level'] == 100.0
+    assert site_reading(SITE, CLEAR, 1.0, step_hours=10.0, now=MIDNIGHT)['battery_level'] == 0.0
+    weather_only = site_reading(SITE, CLEAR, 50.0, step_hours=1.0, now=NOON, simulate=False)
+    assert (weather_only['solar_generation'], weather_only['battery_level']) == (0, 0)
+    assert weather_only['temperature'] == 30.0
+
+
+def test_refresh_batches_many_locations(open_meteo, monkeypatch):
+    monkeypatch.setattr(weather_service, 'WEATHER_BATCH_SIZE', 10)
+    locations = [(10.0 + i * 0.1, 70.0) for i in range(25)]
+    assert weather_service.refresh_locations(locations) == 3
+    assert open_meteo.count('forecast') == 3
+    assert weather_service.refresh_locations(locations) == 0  # all fresh
+    weather, success = weather_service.get_location_weather(*locations[-1], name='x')
+    assert success and weather['temperature'] == 30.0
+
+
+def test_site_crud(client, open_meteo):
+    created = client.post('/api/sites', json={'name': 'Office', 'city': 'Pune', 'battery_size': 5})
+    assert created.status_code == 201
+    site = created.get_json()['site']
+    assert (site['latitude'], site['longitude']) == (18.52, 73.86)
+    assert site['reading'] is None
+
+    updated = client.put(f"/api/sites/{site['id']}", json={'battery_size': 8})
+    assert updated.get_json()['site']['battery_size'] == 8.0
+    assert client.put(f"/api/sites/{site['id']}", json={'panel_efficiency': 2}).status_code == 400
+    assert [s['name'] for s in client.get('/api/sites').get_json()['sites']] == ['Office']
+
+    assert client.delete(f"/api/sites/{site['id']}").get_json()['success']
+    assert client.get(f"/api/sites/{site['id']}").status_code == 404
+
+
+def test_unknown_city_is_rejected(client, open_meteo):
+    response = client.post('/api/sites', json={'name': 'Nowhere', 'city': 'Atlantis'})
+    assert response.status_code == 400
+    assert 'not found' in response.get_json()['error']
+
+
+def test_site_weather_and_prediction_use_the_batched_cache(client, open_meteo):
+    site = client.post('/api/sites', json={'name': 'Roof', 'latitude': 19.08, 'longitude': 72.88}).get_json()['site']
+    weather = client.get(f"/api/sites/{site['id']}/weather").get_json()
+    assert weather['success'] and weather['weather']['temperature'] == 30.0
+    rows = client.get(f"/api/sites/{site['id']}/prediction").get_json()
+    assert len(rows) == 24 and 'radiation' in rows[0]
+    assert open_meteo.count('forecast') == 1
+    assert client.get(f"/api/sites/{site['id']}/history").get_json() == \
+        {'success': True, 'site_id': site['id'], 'cursor': 0, 'history': []}
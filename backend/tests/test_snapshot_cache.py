@@ -0,0 +1,117 @@
+import gzip
+import json
+import threading
+from datetime import datetime
+
+from flask import Flask
+
+from snapshot_cache import SnapshotCache, snapshot_response
+
+
+class Source:
+    def __init__(self, size=10):
+        self.version = 1
+        self.size = size
+        self.calls = 0
+
+    def build(self):
+        self.calls += 1
+        return {'version': self.version, 'values': list(range(self.size))}
+
+
+def test_snapshot_is_rebuilt_only_when_the_version_changes():
+    source = Source()
+    cache = SnapshotCache(lambda: source.version, source.build, json.dumps)
+    first = cache.get()
+    assert cache.get() is first
+    assert (source.calls, cache.builds, cache.hits) == (1, 1, 1)
+
+    source.version = 2
+    second = cache.get()
+    assert second is not first and json.loads(second.body)['version'] == 2
+    assert second.etag != first.etag
+    assert source.calls == 2
+
+
+def test_invalidate_forces_a_rebuild():
+    source = Source()
+    cache = SnapshotCache(lambda: source.version, source.build, json.dumps)
+    cache.get()
+    cache.invalidate()
+    cache.get()
+    assert source.calls == 2
+
+
+def test_large_snapshots_are_precompressed_once():
+    source = Source(size=500)
+    cache = SnapshotCache(lambda: source.version, source.build, json.dumps, min_compress_bytes=100)
+    snapshot = cache.get()
+    assert gzip.decompress(snapshot.encoded['gzip']) == snapshot.body
+
+
+def test_small_snapshots_are_not_compressed():
+    cache = SnapshotCache(lambda: 1, Source(size=5).build, json.dumps, min_compress_bytes=100)
+    assert cache.get().encoded == {}
+
+
+def test_concurrent_misses_build_once():
+    source = Source()
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow_build():
+        started.set()
+        release.wait(5)
+        return source.build()
+
+    cache = SnapshotCache(lambda: source.version, slow_build, json.dumps)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get())) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    started.wait(5)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert source.calls == 1
+    assert len({id(snapshot) for snapshot in results}) == 1
+
+
+def test_response_serves_the_encoding_the_client_accepts():
+    source = Source(size=500)
+    snapshot = SnapshotCache(lambda: 1, source.build, json.dumps, min_compress_bytes=100).get()
+    app = Flask(__name__)
+    with app.test_request_context(headers={'Accept-Encoding': 'gzip'}):
+        gzipped = snapshot_response(snapshot)
+    with app.test_request_context():
+        plain = snapshot_response(snapshot)
+    with app.test_request_context(headers={'If-None-Match': f'W/"{snapshot.etag}"'}):
+        unchanged = snapshot_response(snapshot)
+
+    assert gzipped.headers['Content-Encoding'] == 'gzip'
+    assert gzipped.get_data() == snapshot.encoded['gzip']
+    assert 'Content-Encoding' not in plain.headers and plain.get_data() == snapshot.body
+    assert gzipped.headers['ETag'] == plain.headers['ETag'] == f'W/"{snapshot.etag}"'
+    assert unchanged.status_code == 304
+
+
+def test_dashboard_snapshot_follows_new_rows(client, add_samples):
+    add_samples(3)
+    first = client.get('/api/dashboard')
+    body = first.get_json()
+    assert body['history']['reset'] and len(body['history']['history']['timestamp']) == 3
+    assert client.get('/api/dashboard', headers={'If-None-Match': first.headers['ETag']}).status_code == 304
+
+    add_samples(1, start=datetime(2026, 1, 1, 8, 3))
+    changed = client.get('/api/dashboard', headers={'If-None-Match': first.headers['ETag']})
+    assert changed.status_code == 200
+    assert changed.get_json()['history']['cursor'] == body['history']['cursor'] + 1
+
+
+def test_dashboard_polls_revalidate_across_origins(client, add_samples):
+    add_samples(2)
+    origin = {'Origin': 'http://localhost:3000'}
+    first = client.get('/api/dashboard', headers=origin)
+    assert 'ETag' in first.headers['Access-Control-Expose-Headers']
+    again = client.get('/api/dashboard', headers=dict(origin, **{'If-None-Match': first.headers['ETag']}))
+    assert again.status_code == 304 and again.get_data() == b''
@@ -0,0 +1,59 @@
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from solar_geometry import clear_sky_ghi, cloudy_sky_ghi, irradiance, solar_position, solar_zenith, sun_times
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc).timestamp()
+
+
+def test_london_midsummer_sunrise_and_sunset():
+    sunrise, noon, sunset = sun_times(utc(2026, 6, 21, 12), 51.5074, -0.1278)
+    # NOAA: 03:43 and 20:21 UTC (04:43 / 21:21 BST), noon 13:02 BST
+    assert abs(sunrise - utc(2026, 6, 21, 3, 43)) < 120
+    assert abs(sunset - utc(2026, 6, 21, 20, 21)) < 120
+    assert abs(noon - utc(2026, 6, 21, 12, 2)) < 120
+
+
+def test_noon_zenith_and_azimuth_at_the_solstice():
+    _, noon, _ = sun_times(utc(2026, 6, 21, 12), 40.0, 0.0)
+    zenith, azimuth = solar_position(noon, 40.0, 0.0)
+    assert zenith == pytest.approx(40.0 - 23.44, abs=0.1)
+    assert azimuth == pytest.approx(180.0, abs=0.5)
+    assert solar_zenith(noon, 40.0, 0.0) == pytest.approx(zenith)
+
+
+def test_night_has_the_sun_below_the_horizon():
+    zenith, _ = solar_position(utc(2026, 6, 21, 0), 51.5074, -0.1278)
+    assert zenith > 90.0
+    assert irradiance(utc(2026, 6, 21, 0), 51.5074, -0.1278) == 0.0
+
+
+def test_polar_day_and_night():
+    sunrise, noon, sunset = sun_times(utc(2026, 6, 21, 12), 80.0, 0.0)
+    assert sunset - sunrise == pytest.approx(86400.0)
+    sunrise, noon, sunset = sun_times(utc(2026, 12, 21, 12), 80.0, 0.0)
+    assert sunrise == sunset == noon
+
+
+def test_arrays_broadcast_like_scalars():
+    times = utc(2026, 3, 20) + 3600.0 * np.arange(24)
+    zeniths, azimuths = solar_position(times, 19.076, 72.8777)
+    assert zeniths.shape == azimuths.shape == (24,)
+    assert zeniths[7] == pytest.approx(solar_position(times[7], 19.076, 72.8777)[0])
+
+    sites = np.array([[0.0], [45.0], [-45.0]])
+    assert solar_zenith(times[None, :], sites, 0.0).shape == (3, 24)
+
+
+def test_clear_sky_ghi_and_cloud_attenuation():
+    ghi = clear_sky_ghi(np.array([0.0, 60.0, 90.0, 120.0]))
+    assert ghi[0] == pytest.approx(1098.0 * np.exp(-0.059))
+    assert ghi[0] > ghi[1] > 0.0
+    assert ghi[2] == pytest.approx(0.0, abs=1e-9) and ghi[3] == 0.0
+    assert cloudy_sky_ghi(1000.0, 0.0) == 1000.0
+    assert cloudy_sky_ghi(1000.0, 100.0) == pytest.approx(250.0)
+    assert cloudy_sky_ghi(1000.0, 150.0) == pytest.approx(250.0)
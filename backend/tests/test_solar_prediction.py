@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from solar_prediction import MAX_HOURS, MIN_HOURS, fallback_prediction, parse_hourly, predict, prediction_rows, pv_output
+
+T0 = 1_767_225_600  # 2026-01-01T00:00:00Z
+MUMBAI = (19.076, 72.8777)
+
+
+def hourly(hours=48, radiation=500.0):
+    return {
+        'time': [T0 + 3600 * i for i in range(hours)],
+        'temperature_2m': [20.0] * hours,
+        'cloud_cover': [0.0] * hours,
+        'shortwave_radiation': [radiation] * hours
+    }
+
+
+def test_pv_output_at_standard_test_conditions():
+    # Cell temperature is 25 C when the air is 31.25 C cooler at 1000 W/m2
+    assert pv_output(np.array([1000.0]), np.array([-6.25]), 5.0, 0.2) == pytest.approx([1.0])
+
+
+def test_pv_output_derates_hot_cells_and_clips():
+    hot, cool = pv_output(np.array([800.0, 800.0]), np.array([40.0, 10.0]), 5.0, 0.2)
+    assert hot < cool
+    assert pv_output(np.array([0.0, -50.0]), np.array([25.0, 25.0]), 5.0, 0.2).tolist() == [0.0, 0.0]
+    assert pv_output(np.array([2000.0]), np.array([-40.0]), 5.0, 1.0).tolist() == [5.0]
+
+
+def test_predict_aligns_hours_to_the_following_sample():
+    data = hourly()
+    data['shortwave_radiation'][3] = 900.0  # mean over 02:00-03:00
+    forecast = parse_hourly(data, fetched_at=T0)
+    result = predict(forecast, 5.0, 0.2, T0 + 2 * 3600 + 1200, hours=24)
+    assert result['time'][0] == T0 + 2 * 3600
+    assert result['irradiance'][0] == 900.0
+    assert len(result['power']) == 24
+
+
+def test_predict_clamps_hours_and_stops_at_the_end_of_the_forecast():
+    forecast = parse_hourly(hourly(hours=400), fetched_at=T0)
+    assert len(predict(forecast, 5.0, 0.2, T0, hours=1)['time']) == MIN_HOURS
+    assert len(predict(forecast, 5.0, 0.2, T0, hours=1000)['time']) == MAX_HOURS
+    short = parse_hourly(hourly(hours=30), fetched_at=T0)
+    assert len(predict(short, 5.0, 0.2, T0, hours=48)['time']) == 29
+
+
+def test_missing_values_are_interpolated_or_estimated():
+    data = hourly()
+    data['temperature_2m'][5] = None
+    data['shortwave_radiation'][5] = None
+    forecast = parse_hourly(data, fetched_at=T0)
+    assert forecast.temperature[5] == 20.0 and forecast.shortwave_radiation[5] == 500.0
+
+    # With coordinates the gap comes from the sun's position: 04:30 UTC is late morning in Mumbai
+    estimated = parse_hourly(data, fetched_at=T0, latitude=MUMBAI[0], longitude=MUMBAI[1])
+    assert 0.0 < estimated.shortwave_radiation[5] != 500.0
+
+
+def test_fallback_is_zero_at_night_and_positive_by_day():
+    result = fallback_prediction(5.0, 0.2, T0, *MUMBAI, hours=24)
+    assert len(result['time']) == 24
+    assert result['power'][18] == 0.0  # 18:00 UTC, night in India
+    assert result['power'][6] > 0.0    # 06:00 UTC, around local noon
+    assert result['power'].max() <= 5.0
+
+
+def test_prediction_rows_include_weather_only_from_a_forecast():
+    forecast = parse_hourly(hourly(), fetched_at=T0)
+    rows = prediction_rows(predict(forecast, 5.0, 0.2, T0, hours=24))
+    assert len(rows) == 24
+    assert set(rows[0]) == {'hour', 'time', 'predicted_solar', 'radiation', 'temperature', 'cloud_cover'}
+    fallback_rows = prediction_rows(fallback_prediction(5.0, 0.2, T0, *MUMBAI), include_weather=False)
+    assert set(fallback_rows[0]) == {'hour', 'time', 'predicted_solar'}
+
+
+def test_prediction_endpoint_falls_back_without_a_forecast(client, open_meteo):
+    response = client.get('/api/prediction?hours=30')
+    assert response.status_code == 200
+    rows = response.get_json()
+    assert len(rows) == 30
+    assert 'radiation' not in rows[0]
+    assert open_meteo.calls == []
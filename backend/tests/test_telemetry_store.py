@@ -0,0 +1,112 @@
+import os
+
+import numpy as np
+import pytest
+
+from telemetry_store import TelemetryStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return TelemetryStore(str(tmp_path / 'telemetry'), segment_records=4, retention_days=1)
+
+
+@pytest.mark.parametrize('device', ['..', '.', '', 'a/b', '../x', '-lead', 'x' * 65, 'dev ice'])
+def test_rejects_ids_that_are_not_plain_names(store, tmp_path, device):
+    with pytest.raises(ValueError):
+        store.append(device, [1], [1.0])
+    assert sorted(os.listdir(tmp_path)) == ['telemetry']
+    assert os.listdir(tmp_path / 'telemetry') == []
+
+
+def test_distinct_ids_never_share_a_log(store):
+    store.append('a_b', [1], [1.0])
+    with pytest.raises(ValueError):
+        store.append('a/b', [2], [2.0])
+    store.append('a-b', [3], [3.0])
+    assert store.devices() == ['a-b', 'a_b']
+    assert store.tail('a_b', 10)[1].tolist() == [1.0]
+    assert store.tail('a-b', 10)[1].tolist() == [3.0]
+
+
+DAY_MS = 86400 * 1000
+
+
+def test_enforce_retention_expires_a_device_that_never_rotates(store):
+    store.append('quiet', [1000, 2000], [1.0, 2.0])
+    store.enforce_retention(2000 + DAY_MS - 1)
+    assert store.tail('quiet', 10)[1].tolist() == [1.0, 2.0]
+
+    store.enforce_retention(2000 + DAY_MS + 1)
+    assert store.tail('quiet', 10)[1].size == 0
+    assert store.last_timestamp('quiet') is None
+
+    store.append('quiet', [3 * DAY_MS], [3.0])
+    assert store.tail('quiet', 10)[1].tolist() == [3.0]
+
+
+def test_rotation_expires_old_segments_but_keeps_the_active_one(store):
+    store.append('busy', np.arange(4), np.ones(4))
+    store.append('busy', [DAY_MS + 10], [2.0])  # rotates
+    timestamps, voltages = store.read_range_arrays('busy', 0, 2 * DAY_MS)
+    assert timestamps.tolist() == [DAY_MS + 10]
+    assert voltages.tolist() == [2.0]
+
+
+def test_appends_rotate_into_numbered_segments(store, tmp_path):
+    store.append('roof', np.arange(10), np.arange(10.0))
+    names = sorted(os.listdir(tmp_path / 'telemetry' / 'roof'))
+    assert [n for n in names if n.endswith('.seg')] == ['0000000001.seg', '0000000002.seg', '0000000003.seg']
+    assert store.tail('roof', 5)[0].tolist() == [5, 6, 7, 8, 9]
+    assert store.last_timestamp('roof') == 9
+
+
+def test_range_reads_are_half_open_and_span_segments(store):
+    store.append('roof', np.arange(0, 100, 10), np.arange(10.0))
+    timestamps, voltages = store.read_range_arrays('roof', 25, 75)
+    assert timestamps.tolist() == [30, 40, 50, 60, 70]
+    assert voltages.tolist() == [3.0, 4.0, 5.0, 6.0, 7.0]
+    assert store.read_range_arrays('roof', 30, 31)[0].tolist() == [30]
+    assert store.read_range_arrays('roof', 1000, 2000)[0].size == 0
+
+
+def test_single_segment_range_is_a_zero_copy_view(tmp_path):
+    store = TelemetryStore(str(tmp_path), segment_records=1024)
+    store.append('roof', np.arange(100), np.arange(100.0))
+    views = store.read_range('roof', 10, 20)
+    assert len(views) == 1 and views[0]['ts'].tolist() == list(range(10, 20))
+    assert views[0].base is not None
+
+
+def test_sparse_index_finds_records_in_large_segments(tmp_path):
+    store = TelemetryStore(str(tmp_path), segment_records=10000)
+    timestamps = np.arange(0, 50000, 5)
+    store.append('roof', timestamps, np.ones(len(timestamps)))
+    assert store.read_range_arrays('roof', 20483, 20501)[0].tolist() == [20485, 20490, 20495, 20500]
+
+
+def test_a_second_store_on_the_same_directory_sees_new_segments(store, tmp_path):
+    other = TelemetryStore(str(tmp_path / 'telemetry'), segment_records=4)
+    store.append('roof', [1, 2], [1.0, 2.0])
+    assert other.tail('roof', 10)[0].tolist() == [1, 2]
+    store.append('roof', [3, 4, 5, 6], [3.0, 4.0, 5.0, 6.0])
+    assert other.tail('roof', 10)[0].tolist() == [1, 2, 3, 4, 5, 6]
+    other.append('roof', [7], [7.0])
+    assert store.tail('roof', 2)[0].tolist() == [6, 7]
+
+
+def test_segment_names_are_not_reused_after_everything_expired(store, tmp_path):
+    other = TelemetryStore(str(tmp_path / 'telemetry'), segment_records=4, retention_days=1)
+    store.append('quiet', [1000], [1.0])
+    assert other.tail('quiet', 10)[1].tolist() == [1.0]  # other maps 0000000001.seg
+
+    store.enforce_retention(1000 + DAY_MS + 1)
+    store.append('quiet', [2 * DAY_MS], [2.0])
+    names = sorted(n for n in os.listdir(tmp_path / 'telemetry' / 'quiet') if n.endswith('.seg'))
+    assert names == ['0000000002.seg']
+
+    # The other process drops its mapping of the deleted file instead of reading or writing it
+    assert other.tail('quiet', 10)[1].tolist() == [2.0]
+    other.append('quiet', [2 * DAY_MS + 1], [3.0])
+    assert store.tail('quiet', 10)[1].tolist() == [2.0, 3.0]
+    assert TelemetryStore(str(tmp_path / 'telemetry')).tail('quiet', 10)[1].tolist() == [2.0, 3.0]
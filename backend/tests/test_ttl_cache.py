@@ -0,0 +1,47 @@
+from unittest import mock
+
+from ttl_cache import TTLCache
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1  # 'b' is now the least recently used
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    assert cache.stats()['evictions'] == 1
+
+
+def test_entries_expire_after_their_ttl():
+    cache = TTLCache(ttl=10)
+    with mock.patch('ttl_cache.time.time', return_value=1000.0):
+        cache.set('short', 1, ttl=1)
+        cache.set('long', 2)
+    with mock.patch('ttl_cache.time.time', return_value=1005.0):
+        assert cache.get('short', 'gone') == 'gone'
+        assert cache.get('long') == 2
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['size']) == (1, 1, 1)
+
+
+def test_persisted_entries_survive_a_restart_in_lru_order(tmp_path):
+    path = str(tmp_path / 'cache.json')
+    cache = TTLCache(maxsize=2, persist_path=path)
+    cache.set('a', {'lat': 1})
+    cache.set('b', {'lat': 2})
+    cache.get('a')
+    cache.set('expired', 0, ttl=-1)
+
+    restored = TTLCache(maxsize=2, persist_path=path)
+    assert restored.get('expired') is None
+    assert restored.get('a') == {'lat': 1}
+    restored.set('c', 3)  # evicts 'b', the least recently used before the restart
+    assert restored.get('b') is None
+
+
+def test_unreadable_persist_file_starts_empty(tmp_path):
+    path = tmp_path / 'cache.json'
+    path.write_text('not json')
+    assert TTLCache(persist_path=str(path)).stats()['size'] == 0
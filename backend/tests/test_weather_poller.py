@@ -0,0 +1,67 @@
+import threading
+import time
+
+from weather_poller import WeatherPoller
+
+
+def response(city, temperature=25.0):
+    return {'success': True, 'data': {'city': city, 'temperature': temperature}}
+
+
+def test_fetch_publishes_a_city_that_was_not_polled_yet():
+    poller = WeatherPoller(lambda: ['Pune'], fetch_fn=response)
+    assert poller.get('Pune') is None
+    snapshot = poller.fetch('Pune')
+    assert snapshot.success and snapshot.weather['city'] == 'Pune'
+    assert poller.get('Pune') is snapshot
+
+
+def test_concurrent_fetches_share_one_upstream_call():
+    calls = []
+    release = threading.Event()
+
+    def slow_fetch(city):
+        calls.append(city)
+        release.wait(5)
+        return response(city)
+
+    poller = WeatherPoller(lambda: [], fetch_fn=slow_fetch)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(poller.fetch('Pune'))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    while not calls:
+        time.sleep(0.01)
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert calls == ['Pune']
+    assert len(results) == 8 and all(r.success for r in results)
+
+
+def test_failed_fetch_serves_fallback_weather_without_raising():
+    def failing_fetch(city):
+        raise RuntimeError('upstream down')
+
+    poller = WeatherPoller(lambda: ['Pune'], fetch_fn=failing_fetch)
+    snapshot = poller.fetch('Pune')
+    assert not snapshot.success
+    assert snapshot.error == 'upstream down'
+    assert 'temperature' in snapshot.weather
+
+
+def test_failed_poll_keeps_the_previous_snapshot():
+    results = iter([response('Pune', 30.0), RuntimeError('upstream down')])
+
+    def fetch(city):
+        result = next(results)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    poller = WeatherPoller(lambda: ['Pune'], fetch_fn=fetch)
+    poller.poll_once()
+    poller.poll_once()
+    assert poller.get('Pune').success
+    assert poller.get('Pune').weather['temperature'] == 30.0
@@ -0,0 +1,82 @@
+import time
+
+import weather_service
+from weather_service import get_forecast_cache_stats, get_lat_lon, get_weather, known_coordinates
+
+
+def test_geocoding_is_cached_per_normalized_city(open_meteo):
+    assert get_lat_lon('Pune') == (18.52, 73.86, 'Pune', 'India')
+    assert get_lat_lon('  pune ') == (18.52, 73.86, 'Pune', 'India')
+    assert open_meteo.count('geocoding') == 1
+    assert known_coordinates('PUNE') == (18.52, 73.86)
+
+
+def test_unknown_cities_are_cached_too(open_meteo):
+    assert get_lat_lon('Atlantis')[0] is None
+    assert get_lat_lon('Atlantis')[0] is None
+    assert open_meteo.count('geocoding') == 1
+
+
+def test_network_errors_are_not_cached(open_meteo):
+    open_meteo.fail = True
+    assert get_lat_lon('Pune')[0] is None
+    open_meteo.fail = False
+    assert get_lat_lon('Pune')[0] == 18.52
+    assert weather_service.get_geocode_cache_stats()['size'] == 1
+
+
+def wait_for_refreshes():
+    for _ in range(500):
+        with weather_service._forecast_lock:
+            if not weather_service._refreshing:
+                return
+        time.sleep(0.01)
+    raise AssertionError('background refresh did not finish')
+
+
+def age_forecasts(seconds):
+    with weather_service._forecast_lock:
+        for entry in weather_service._forecast_cache.values():
+            entry['fetched_at'] -= seconds
+
+
+def test_fresh_forecast_is_served_from_the_cache(open_meteo):
+    first = get_weather('Pune')
+    second = get_weather('Pune')
+    assert first['success'] and second['data'] == first['data']
+    assert second['data']['city'] == 'Pune'
+    assert open_meteo.count('forecast') == 1
+    stats = get_forecast_cache_stats()
+    assert (stats['misses'], stats['fresh_hits']) == (1, 1)
+
+
+def test_stale_forecast_is_served_while_one_refresh_runs(open_meteo):
+    get_weather('Pune')
+    age_forecasts(weather_service.FORECAST_FRESH_SECONDS + 1)
+    open_meteo.temperature = 35.0
+
+    stale = get_weather('Pune')
+    assert stale['data']['temperature'] == 30.0
+    wait_for_refreshes()
+    assert get_weather('Pune')['data']['temperature'] == 35.0
+    assert open_meteo.count('forecast') == 2
+    assert get_forecast_cache_stats()['stale_hits'] == 1
+
+
+def test_failed_refresh_keeps_serving_the_stale_forecast(open_meteo):
+    get_weather('Pune')
+    age_forecasts(weather_service.FORECAST_FRESH_SECONDS + 1)
+    open_meteo.fail = True
+
+    assert get_weather('Pune')['success']
+    wait_for_refreshes()
+    assert get_weather('Pune')['data']['temperature'] == 30.0
+    assert get_forecast_cache_stats()['refresh_errors'] >= 1
+
+
+def test_cold_miss_without_network_returns_fallback(open_meteo):
+    get_lat_lon('Pune')
+    open_meteo.fail = True
+    result = get_weather('Pune')
+    assert not result['success']
+    assert 'temperature' in result['data']
@@ -1,7 +1,6 @@
 #include <WiFi.h>
 #include <WiFiClientSecure.h>
 #include <HTTPClient.h>
-#include <ArduinoJson.h>
 
 // --- Configuration ---
 const char* ssid = "YOUR_WIFI_SSID";
@@ -19,6 +18,28 @@ const float R2 = 7500.0;  // 7.5k
 const float refVoltage = 3.3;
 const float adcResolution = 4095.0;
 
+// Batching: sample every SAMPLE_INTERVAL_MS, upload once BATCH_SIZE samples are buffered
+const char* deviceId = "esp32-01";           // up to 16 characters
+const unsigned long SAMPLE_INTERVAL_MS = 1000;
+const int BATCH_SIZE = 30;
+
+// Binary frame (see backend services/iot_ingest.py), little-endian:
+//   "SV" | version u8 | device 16 bytes | base_ts u64 (ms) | count u16 | count x (delta_ms u16, millivolts u16)
+const uint8_t FRAME_VERSION = 1;
+const int FRAME_HEADER_SIZE = 2 + 1 + 16 + 8 + 2;
+const int FRAME_SAMPLE_SIZE = 4;
+
+unsigned long sampleTimes[BATCH_SIZE];
+uint16_t sampleMillivolts[BATCH_SIZE];
+int sampleCount = 0;
+unsigned long lastSampleAt = 0;
+
+uint8_t frame[FRAME_HEADER_SIZE + BATCH_SIZE * FRAME_SAMPLE_SIZE];
+
+// Kept open between uploads so each batch reuses the TLS connection
+WiFiClientSecure client;
+HTTPClient http;
+
 void setup() {
   Serial.begin(115200);
   
@@ -30,53 +51,101 @@ void setup() {
     Serial.print(".");
   }
   Serial.println("\nConnected to WiFi");
+
+  client.setInsecure(); // Use setInsecure for simpler testing (skips cert verification)
+  http.setReuse(true);  // HTTP keep-alive
+}
+
+float readSolarVoltage() {
+  // 1. Read Analog Voltage
+  int rawADC = analogRead(voltagePin);
+  float pinVoltage = (rawADC / adcResolution) * refVoltage;
+  
+  // 2. Calculate Actual Solar Voltage (based on divider)
+  // Actual = PinVal * (R1 + R2) / R2
+  return pinVoltage * ((R1 + R2) / R2);
+}
+
+void putU16(uint8_t* out, uint16_t value) {
+  out[0] = value & 0xFF;
+  out[1] = (value >> 8) & 0xFF;
+}
+
+void putU64(uint8_t* out, uint64_t value) {
+  for (int i = 0; i < 8; i++) {
+    out[i] = (value >> (8 * i)) & 0xFF;
+  }
+}
+
+int buildFrame() {
+  memset(frame, 0, FRAME_HEADER_SIZE);
+  frame[0] = 'S';
+  frame[1] = 'V';
+  frame[2] = FRAME_VERSION;
+  strncpy((char*)&frame[3], deviceId, 16);
+  putU64(&frame[19], sampleTimes[0]);
+  putU16(&frame[27], sampleCount);
+
+  uint8_t* out = &frame[FRAME_HEADER_SIZE];
+  for (int i = 0; i < sampleCount; i++) {
+    unsigned long delta = i == 0 ? 0 : sampleTimes[i] - sampleTimes[i - 1];
+    putU16(out, delta > 65535 ? 65535 : delta);
+    putU16(out + 2, sampleMillivolts[i]);
+    out += FRAME_SAMPLE_SIZE;
+  }
+  return FRAME_HEADER_SIZE + sampleCount * FRAME_SAMPLE_SIZE;
+}
+
+bool uploadBatch() {
+  int length = buildFrame();
+
+  http.begin(client, serverUrl);
+  http.addHeader("Content-Type", "application/octet-stream");
+  
+  Serial.printf("Sending %d samples (%d bytes)\n", sampleCount, length);
+  
+  int httpResponseCode = http.POST(frame, length);
+  
+  if (httpResponseCode > 0) {
+    String response = http.getString();
+    Serial.println("HTTP Response code: " + String(httpResponseCode));
+    Serial.println("Response: " + response);
+  } else {
+    Serial.print("Error code: ");
+    Serial.println(httpResponseCode);
+  }
+  
+  http.end();
+  return httpResponseCode >= 200 && httpResponseCode < 300;
 }
 
 void loop() {
+  unsigned long now = millis();
+  if (now - lastSampleAt < SAMPLE_INTERVAL_MS) {
+    return;
+  }
+  lastSampleAt = now;
+
+  // Buffer the sample; if an upload keeps failing, drop the oldest sample
+  if (sampleCount == BATCH_SIZE) {
+    memmove(sampleTimes, sampleTimes + 1, (BATCH_SIZE - 1) * sizeof(sampleTimes[0]));
+    memmove(sampleMillivolts, sampleMillivolts + 1, (BATCH_SIZE - 1) * sizeof(sampleMillivolts[0]));
+    sampleCount--;
+  }
+  float voltage = readSolarVoltage();
+  sampleTimes[sampleCount] = now;
+  sampleMillivolts[sampleCount] = (uint16_t)constrain(voltage * 1000.0, 0, 65535);
+  sampleCount++;
+
+  if (sampleCount < BATCH_SIZE) {
+    return;
+  }
+
   if (WiFi.status() == WL_CONNECTED) {
-    // 1. Read Analog Voltage
-    int rawADC = analogRead(voltagePin);
-    float pinVoltage = (rawADC / adcResolution) * refVoltage;
-    
-    // 2. Calculate Actual Solar Voltage (based on divider)
-    // Actual = PinVal * (R1 + R2) / R2
-    float actualVoltage = pinVoltage * ((R1 + R2) / R2);
-    
-    // 3. Prepare JSON
-    StaticJsonDocument<200> doc;
-    doc["voltage"] = actualVoltage;
-    doc["timestamp"] = millis();
-    
-    String jsonString;
-    serializeJson(doc, jsonString);
-    
-    // 4. Send HTTPS POST
-    WiFiClientSecure client;
-    client.setInsecure(); // Use setInsecure for simpler testing (skips cert verification)
-    
-    HTTPClient http;
-    http.begin(client, serverUrl);
-    http.addHeader("Content-Type", "application/json");
-    
-    Serial.print("Sending Data: ");
-    Serial.println(jsonString);
-    
-    int httpResponseCode = http.POST(jsonString);
-    
-    if (httpResponseCode > 0) {
-      String response = http.getString();
-      Serial.println("HTTP Response code: " + String(httpResponseCode));
-      Serial.println("Response: " + response);
-    } else {
-      Serial.print("Error code: ");
-      Serial.println(httpResponseCode);
+    if (uploadBatch()) {
+      sampleCount = 0;
     }
-    
-    http.end();
   } else {
     Serial.println("WiFi Disconnected");
   }
-  
-  // Send data every 5 seconds
-  delay(5000);
 }
@@ -1,7 +1,11 @@
 // API Configuration
 // In production on Vercel, use relative URLs (same domain)
 // In development, use localhost
-const API_BASE_URL = process.env.REACT_APP_API_URL || 
+//
+// Read endpoints send an ETag with Cache-Control: no-cache, so the browser's
+// HTTP cache revalidates them with If-None-Match on its own and hands axios
+// the cached body when the server answers 304.
+const API_BASE_URL = process.env.REACT_APP_API_URL ||
   (process.env.NODE_ENV === 'production' ? '' : 'http://localhost:5000');
 
 export default API_BASE_URL;
@@ -0,0 +1,61 @@
+/**
+ * useLiveData - Live updates from the backend's Server-Sent Events stream
+ * Subscribes to /api/stream for the given topics and calls onMessage(topic, data)
+ * whenever the server publishes a change. Falls back to calling poll() every
+ * pollInterval ms while the stream is unavailable (unsupported browser, the
+ * serverless deployment without /api/stream, or a dropped connection).
+ */
+
+import { useEffect, useRef } from 'react';
+import API_BASE_URL from '../config/api';
+
+const useLiveData = (topics, { onMessage, poll, pollInterval = 3000 }) => {
+  // Keep the latest callbacks without reconnecting on every render
+  const onMessageRef = useRef(onMessage);
+  const pollRef = useRef(poll);
+  onMessageRef.current = onMessage;
+  pollRef.current = poll;
+  const topicKey = topics.join(',');
+
+  useEffect(() => {
+    let source = null;
+    let timer = null;
+
+    const startPolling = () => {
+      if (timer || !pollRef.current) return;
+      pollRef.current();
+      timer = setInterval(() => pollRef.current(), pollInterval);
+    };
+    const stopPolling = () => {
+      clearInterval(timer);
+      timer = null;
+    };
+
+    if (typeof window.EventSource === 'undefined') {
+      startPolling();
+      return stopPolling;
+    }
+
+    source = new EventSource(`${API_BASE_URL}/api/stream?topics=${topicKey}`);
+    topicKey.split(',').forEach(topic => {
+      source.addEventListener(topic, event => {
+        try {
+          onMessageRef.current(topic, JSON.parse(event.data));
+        } catch (error) {
+          console.error(`Error handling ${topic} event:`, error);
+        }
+      });
+    });
+    source.onopen = stopPolling;
+    // The browser retries dropped connections on its own; poll until it is back.
+    // A CLOSED source (e.g. 404 on serverless) stays on polling for good.
+    source.onerror = startPolling;
+
+    return () => {
+      source.close();
+      stopPolling();
+    };
+  }, [topicKey, pollInterval]);
+};
+
+export default useLiveData;
@@ -34,7 +34,8 @@ ChartJS.register(
 const Analytics = () => {
   const navigate = useNavigate();
   const [predictions, setPredictions] = useState([]);
-  const [monthlyData, setMonthlyData] = useState([]);
+  // Columnar daily report: { day: [...], solar: [...], consumption: [...], ... }
+  const [monthlyData, setMonthlyData] = useState({ day: [], solar: [], consumption: [] });
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
@@ -45,7 +46,7 @@ const Analytics = () => {
     try {
       const [predResponse, monthlyResponse] = await Promise.all([
         axios.get(`${API_BASE_URL}/api/prediction`),
-        axios.get(`${API_BASE_URL}/api/monthly`)
+        axios.get(`${API_BASE_URL}/api/monthly?format=columnar`)
       ]);
       
       setPredictions(predResponse.data);
@@ -77,16 +78,16 @@ const Analytics = () => {
 
   // Monthly Chart Data
   const monthlyChartData = {
-    labels: monthlyData.map(d => `Day ${d.day}`),
+    labels: monthlyData.day.map(day => `Day ${day}`),
     datasets: [
       {
         label: 'Solar (V)',
-        data: monthlyData.map(d => d.solar),
+        data: monthlyData.solar,
         backgroundColor: 'rgba(251, 191, 36, 0.8)'
       },
       {
         label: 'Consumption (V)',
-        data: monthlyData.map(d => d.consumption),
+        data: monthlyData.consumption,
         backgroundColor: 'rgba(239, 68, 68, 0.8)'
       }
     ]
@@ -122,9 +123,9 @@ const Analytics = () => {
   };
 
   // Calculate statistics
-  const totalSolar = monthlyData.reduce((sum, d) => sum + d.solar, 0);
-  const totalConsumption = monthlyData.reduce((sum, d) => sum + d.consumption, 0);
-  const avgDaily = monthlyData.length ? totalSolar / monthlyData.length : 0;
+  const totalSolar = monthlyData.solar.reduce((sum, v) => sum + v, 0);
+  const totalConsumption = monthlyData.consumption.reduce((sum, v) => sum + v, 0);
+  const avgDaily = monthlyData.day.length ? totalSolar / monthlyData.day.length : 0;
 
   if (loading) {
     return (
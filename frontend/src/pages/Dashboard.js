@@ -3,10 +3,11 @@
  * Clean, light-themed energy monitoring interface
  */
 
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import axios from 'axios';
 import { Bar } from 'react-chartjs-2';
 import API_BASE_URL from '../config/api';
+import useLiveData from '../hooks/useLiveData';
 import {
   Chart as ChartJS,
   CategoryScale,
@@ -19,25 +20,76 @@ import {
 
 ChartJS.register(CategoryScale, LinearScale, BarElement, Title, Tooltip, Legend);
 
+const HISTORY_ROWS = 50;
+
+// Append columnar rows to the buffer, keeping the newest HISTORY_ROWS
+const appendColumns = (buffer, rows) => {
+  const merged = {};
+  Object.keys(rows).forEach(key => {
+    merged[key] = (buffer[key] || []).concat(rows[key]).slice(-HISTORY_ROWS);
+  });
+  return merged;
+};
+
 const Dashboard = () => {
   const [energyData, setEnergyData] = useState(null);
-  const [history, setHistory] = useState([]);
+  // Columnar history: { timestamp: [...], total_generation: [...], ... }
+  const [history, setHistory] = useState({ timestamp: [], total_generation: [] });
+  // Id of the newest history row in the buffer (null before the first load)
+  const cursorRef = useRef(null);
+  // ETag of the last dashboard snapshot applied
+  const etagRef = useRef(null);
   const [loading, setLoading] = useState(true);
 
+  // A history update is a full buffer (reset) or the rows after cursor `since`;
+  // rows that do not follow our cursor are rejected (returns false)
+  const applyHistory = delta => {
+    if (!delta.reset && delta.since !== cursorRef.current) return false;
+    cursorRef.current = delta.cursor;
+    setHistory(buffer => (delta.reset ? delta.history : appendColumns(buffer, delta.history)));
+    return true;
+  };
+
+  // One snapshot of the whole page, shared by the server across clients. Polls
+  // send back its ETag and get an empty 304 while nothing has changed.
+  const fetchDashboard = async () => {
+    const headers = etagRef.current ? { 'If-None-Match': etagRef.current } : {};
+    const response = await axios.get(`${API_BASE_URL}/api/dashboard`, {
+      headers,
+      validateStatus: status => (status >= 200 && status < 300) || status === 304
+    });
+    if (response.status === 304) return;
+    etagRef.current = response.headers.etag || null;
+    setEnergyData(response.data.energy);
+    applyHistory(response.data.history);
+    setLoading(false);
+  };
+
+  // Only the rows added after our cursor (catching up on missed stream messages)
+  const fetchHistory = async () => {
+    const since = cursorRef.current;
+    const response = await axios.get(`${API_BASE_URL}/api/history`, { params: { since, format: 'columnar' } });
+    applyHistory({ ...response.data, since });
+  };
+
+  // Polling fallback: one conditional request per tick
   const fetchData = async () => {
     try {
-      const [energyRes, historyRes] = await Promise.all([
-        axios.get(`${API_BASE_URL}/api/energy`),
-        axios.get(`${API_BASE_URL}/api/history`)
-      ]);
-      setEnergyData(energyRes.data);
-      setHistory(historyRes.data);
-      setLoading(false);
+      await fetchDashboard();
     } catch (error) {
       console.error('Error fetching data:', error);
     }
   };
 
+  // A streamed delta that does not follow our cursor (just connected, or a message was missed)
+  const catchUp = async () => {
+    try {
+      await (cursorRef.current === null ? fetchDashboard() : fetchHistory());
+    } catch (error) {
+      console.error('Error fetching history:', error);
+    }
+  };
+
   // Time State
   const [currentTime, setCurrentTime] = useState(new Date());
 
@@ -46,11 +98,19 @@ const Dashboard = () => {
     return () => clearInterval(timer);
   }, []);
 
-  useEffect(() => {
-    fetchData();
-    const interval = setInterval(fetchData, 3000);
-    return () => clearInterval(interval);
-  }, []);
+  // Pushed by the server on every new sample; polls every 3 s if streaming is unavailable
+  useLiveData(['energy', 'history'], {
+    onMessage: (topic, data) => {
+      if (topic === 'energy') {
+        setEnergyData(data);
+        setLoading(false);
+      } else if (!applyHistory(data)) {
+        catchUp();
+      }
+    },
+    poll: fetchData,
+    pollInterval: 3000
+  });
 
   if (loading || !energyData) {
     return (
@@ -81,11 +141,11 @@ const Dashboard = () => {
 
   // Prepare chart data for energy production
   const chartData = {
-    labels: history.length > 0 ? history.slice(-15).map(h => h.timestamp) : ['00:00'],
+    labels: history.timestamp.length > 0 ? history.timestamp.slice(-15) : ['00:00'],
     datasets: [
       {
         label: 'Solar',
-        data: history.length > 0 ? history.slice(-15).map(h => h.total_generation) : [0],
+        data: history.total_generation.length > 0 ? history.total_generation.slice(-15) : [0],
         backgroundColor: '#f97316',
         borderRadius: 4,
         barThickness: 12
@@ -229,8 +289,8 @@ const Dashboard = () => {
               <div className="text-5xl font-bold mb-2">{energyData.total_generation}</div>
               <div className="text-sm text-gray-400">V</div>
               <div className="flex items-center gap-4 mt-2 text-xs">
-                <span className="text-red-400">Min {history.length ? Math.min(...history.map(h => h.total_generation || 0)).toFixed(1) : '0'}</span>
-                <span className="text-green-400">Max {history.length ? Math.max(...history.map(h => h.total_generation || 0)).toFixed(1) : '0'}</span>
+                <span className="text-red-400">Min {history.total_generation.length ? Math.min(...history.total_generation.map(v => v || 0)).toFixed(1) : '0'}</span>
+                <span className="text-green-400">Max {history.total_generation.length ? Math.max(...history.total_generation.map(v => v || 0)).toFixed(1) : '0'}</span>
               </div>
             </div>
 
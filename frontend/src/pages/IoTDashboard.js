@@ -3,10 +3,11 @@
  * Real-time voltage monitoring from ESP32
  */
 
-import React, { useState, useEffect } from 'react';
+import React, { useState } from 'react';
 import axios from 'axios';
 import { Line } from 'react-chartjs-2';
 import API_BASE_URL from '../config/api';
+import useLiveData from '../hooks/useLiveData';
 import {
   Chart as ChartJS,
   CategoryScale,
@@ -48,11 +49,14 @@ const IoTDashboard = () => {
     }
   };
 
-  useEffect(() => {
-    fetchIoTData();
-    const interval = setInterval(fetchIoTData, 3000);
-    return () => clearInterval(interval);
-  }, []);
+  useLiveData(['iot'], {
+    onMessage: (topic, payload) => {
+      setData(payload);
+      setLoading(false);
+    },
+    poll: fetchIoTData,
+    pollInterval: 3000
+  });
 
   const chartData = {
     labels: data.history.map(h => h.time),
@@ -3,29 +3,33 @@
  * Smart recommendations and timeline visualization
  */
 
-import React, { useState, useEffect } from 'react';
+import React, { useState } from 'react';
 import axios from 'axios';
 import API_BASE_URL from '../config/api';
+import useLiveData from '../hooks/useLiveData';
 
 const Optimization = () => {
   const [optimization, setOptimization] = useState(null);
   const [loading, setLoading] = useState(true);
 
-  useEffect(() => {
-    const fetchOptimization = async () => {
-      try {
-        const response = await axios.get(`${API_BASE_URL}/api/optimization`);
-        setOptimization(response.data);
-        setLoading(false);
-      } catch (error) {
-        console.error('Error fetching optimization:', error);
-      }
-    };
+  const fetchOptimization = async () => {
+    try {
+      const response = await axios.get(`${API_BASE_URL}/api/optimization`);
+      setOptimization(response.data);
+      setLoading(false);
+    } catch (error) {
+      console.error('Error fetching optimization:', error);
+    }
+  };
 
-    fetchOptimization();
-    const interval = setInterval(fetchOptimization, 10000);
-    return () => clearInterval(interval);
-  }, []);
+  useLiveData(['optimization'], {
+    onMessage: (topic, data) => {
+      setOptimization(data);
+      setLoading(false);
+    },
+    poll: fetchOptimization,
+    pollInterval: 10000
+  });
 
   if (loading || !optimization) {
     return (
@@ -75,6 +79,22 @@ const Optimization = () => {
           <h3 className="text-xl font-semibold text-white">Battery Optimization</h3>
         </div>
         <p className="text-gray-300">{optimization.battery_tip}</p>
+        {optimization.summary && (
+          <div className="grid grid-cols-3 gap-4 mt-4">
+            <div className="bg-gray-800/50 rounded-xl p-4 border border-gray-700">
+              <div className="text-xs text-gray-500 mb-1">Grid import without battery</div>
+              <div className="text-lg font-semibold text-white">{optimization.summary.baseline_import_kwh} kWh</div>
+            </div>
+            <div className="bg-gray-800/50 rounded-xl p-4 border border-gray-700">
+              <div className="text-xs text-gray-500 mb-1">With optimized schedule</div>
+              <div className="text-lg font-semibold text-green-400">{optimization.summary.grid_import_kwh} kWh</div>
+            </div>
+            <div className="bg-gray-800/50 rounded-xl p-4 border border-gray-700">
+              <div className="text-xs text-gray-500 mb-1">Savings (next {optimization.summary.horizon_hours} h)</div>
+              <div className="text-lg font-semibold text-orange-400">₹{optimization.summary.savings}</div>
+            </div>
+          </div>
+        )}
       </div>
 
       {/* Timeline Visualization */}
@@ -8,13 +8,14 @@ import axios from 'axios';
 import API_BASE_URL from '../config/api';
 
 const Reports = () => {
-  const [monthlyData, setMonthlyData] = useState([]);
+  // Columnar daily report: { day: [...], solar: [...], total: [...], consumption: [...] }
+  const [monthlyData, setMonthlyData] = useState({ day: [], solar: [], total: [], consumption: [] });
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
     const fetchMonthly = async () => {
       try {
-        const response = await axios.get(`${API_BASE_URL}/api/monthly`);
+        const response = await axios.get(`${API_BASE_URL}/api/monthly?format=columnar`);
         setMonthlyData(response.data);
         setLoading(false);
       } catch (error) {
@@ -40,7 +41,7 @@ const Reports = () => {
     );
   }
 
-  const totalSolar = monthlyData.reduce((sum, d) => sum + d.solar, 0);
+  const totalSolar = monthlyData.solar.reduce((sum, v) => sum + v, 0);
   const totalGeneration = totalSolar;
   const savings = totalGeneration * 8;
   const co2Saved = totalGeneration * 0.92;
@@ -104,13 +105,13 @@ const Reports = () => {
               </tr>
             </thead>
             <tbody>
-              {monthlyData.map((day) => (
-                <tr key={day.day} className="border-b border-gray-800/50 hover:bg-gray-800/30 transition-colors">
-                  <td className="py-3 px-4 text-white">Day {day.day}</td>
-                  <td className="py-3 px-4 text-right text-yellow-400">{day.solar.toFixed(2)}</td>
-                  <td className="py-3 px-4 text-right text-green-400 font-semibold">{day.total.toFixed(2)}</td>
-                  <td className="py-3 px-4 text-right text-red-400">{day.consumption.toFixed(2)}</td>
-                  <td className="py-3 px-4 text-right text-purple-400">₹{(day.total * 8).toFixed(2)}</td>
+              {monthlyData.day.map((day, i) => (
+                <tr key={i} className="border-b border-gray-800/50 hover:bg-gray-800/30 transition-colors">
+                  <td className="py-3 px-4 text-white">Day {day}</td>
+                  <td className="py-3 px-4 text-right text-yellow-400">{monthlyData.solar[i].toFixed(2)}</td>
+                  <td className="py-3 px-4 text-right text-green-400 font-semibold">{monthlyData.total[i].toFixed(2)}</td>
+                  <td className="py-3 px-4 text-right text-red-400">{monthlyData.consumption[i].toFixed(2)}</td>
+                  <td className="py-3 px-4 text-right text-purple-400">₹{(monthlyData.total[i] * 8).toFixed(2)}</td>
                 </tr>
               ))}
             </tbody>